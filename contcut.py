@@ -1,10 +1,18 @@
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 import tkinter.simpledialog as simpledialog
 from tkinter import filedialog
-import json
+import numpy as np
 import networkx as nx
-from networkx.algorithms.dag import topological_sort
+from cpm import CPMEngine, IncrementalCPM, DynamicTopo, CycleError, LongestPaths, format_paths
+from crashing import Cancelled, cached_curve, time_cost_curve, format_plan
+from cpm_io import load_network, capacities as parse_capacities
+from rcpsp import RULES, SCHEMES, schedule, format_schedule
+from levelling import OBJECTIVES, level, format_levelling
+from multimode import solve as solve_modes, format_solution
+from portfolio import run_portfolio, format_portfolio
+from pert import three_point, monte_carlo, summarize, format_report
 
 
 class NetworkAnalyzer:
@@ -27,6 +35,16 @@ class NetworkAnalyzer:
         # } }
         self.data = {}
         self.graph = nx.DiGraph()
+        # Топологический порядок, поддерживаемый при правке связей (проверка циклов без полного обхода)
+        self.topo = DynamicTopo()
+        # Скомпилированная структура сети для расчёта КП (сбрасывается при изменении связей)
+        self.cpm = CPMEngine(self.topo)
+        # Последний расчёт КП по нормальным длительностям — для живого пересчёта после правки длительности
+        self.live = None
+        # Мощности ресурсов проекта {ресурс: единиц} — для расписания с ограниченными ресурсами
+        self.capacities = {}
+        # Фоновое построение кривой «время — стоимость» (None — не идёт)
+        self.curve_job = None
 
         self.setup_ui()
 
@@ -43,10 +61,42 @@ class NetworkAnalyzer:
         ttk.Button(top, text="Загрузить JSON", command=self.load_json).grid(row=0, column=5, padx=10)
         ttk.Button(top, text="Рассчитать критический путь", command=self.calculate_cp).grid(row=0, column=6, padx=10)
         ttk.Button(top, text="Оптимизировать по стоимости", command=self.optimize_cost, style="Accent.TButton").grid(row=0, column=7, padx=20)
+        ttk.Button(top, text="Точная оптимизация", command=self.optimize_exact).grid(row=0, column=8, padx=5)
+        ttk.Button(top, text="Кривая время—стоимость", command=self.show_curve).grid(row=0, column=9, padx=5)
+        ttk.Button(top, text="Монте-Карло (PERT)", command=self.simulate_pert).grid(row=0, column=10, padx=5)
+        ttk.Button(top, text="Чувствительность ±Δ", command=self.sensitivity).grid(row=0, column=11, padx=5)
+        ttk.Button(top, text="Расписание с ресурсами", command=self.schedule_resources).grid(row=0, column=12, padx=5)
+        ttk.Button(top, text="Выравнивание ресурсов", command=self.level_resources).grid(row=0, column=13, padx=5)
+        ttk.Button(top, text="Дискретные режимы", command=self.optimize_modes).grid(row=0, column=14, padx=5)
+        ttk.Button(top, text="Портфель проектов", command=self.analyse_portfolio).grid(row=0, column=15, padx=5)
 
         ttk.Label(top, text="Целевая длительность:").grid(row=1, column=0, padx=5, sticky="e")
         self.target_entry = ttk.Entry(top, width=10)
         self.target_entry.grid(row=1, column=1, padx=5, sticky="w")
+        ttk.Label(top, text="Выборок:").grid(row=1, column=2, padx=5, sticky="e")
+        self.samples_entry = ttk.Entry(top, width=10)
+        self.samples_entry.insert(0, "10000")
+        self.samples_entry.grid(row=1, column=3, padx=5, sticky="w")
+        ttk.Label(top, text="Δ, дней:").grid(row=1, column=4, padx=5, sticky="e")
+        self.delta_entry = ttk.Entry(top, width=8)
+        self.delta_entry.insert(0, "1")
+        self.delta_entry.grid(row=1, column=5, padx=5, sticky="w")
+        ttk.Label(top, text="Правило:").grid(row=1, column=6, padx=5, sticky="e")
+        self.rule_box = ttk.Combobox(top, values=RULES, width=7, state="readonly")
+        self.rule_box.set(RULES[0])
+        self.rule_box.grid(row=1, column=7, padx=5, sticky="w")
+        ttk.Label(top, text="Схема:").grid(row=1, column=8, padx=5, sticky="e")
+        self.scheme_box = ttk.Combobox(top, values=SCHEMES, width=9, state="readonly")
+        self.scheme_box.set(SCHEMES[0])
+        self.scheme_box.grid(row=1, column=9, padx=5, sticky="w")
+        ttk.Label(top, text="Критерий:").grid(row=1, column=10, padx=5, sticky="e")
+        self.objective_box = ttk.Combobox(top, values=OBJECTIVES, width=9, state="readonly")
+        self.objective_box.set(OBJECTIVES[0])
+        self.objective_box.grid(row=1, column=11, padx=5, sticky="w")
+        ttk.Label(top, text="Путей:").grid(row=1, column=12, padx=5, sticky="e")
+        self.paths_entry = ttk.Entry(top, width=6)
+        self.paths_entry.insert(0, "5")
+        self.paths_entry.grid(row=1, column=13, padx=5, sticky="w")
 
         # Таблица
         table_frame = ttk.Frame(self.root)
@@ -73,7 +123,11 @@ class NetworkAnalyzer:
         result_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
         self.result_text = tk.Text(result_frame, height=20, font=("Consolas", 10))
-        self.result_text.pack(fill="both", expand=True, padx=5, pady=5)
+        self.result_text.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+
+        # Кривая «длительность — минимальные доп. затраты»
+        self.curve_canvas = tk.Canvas(result_frame, width=420, height=300, bg="white")
+        self.curve_canvas.pack(side="right", fill="y", padx=5, pady=5)
 
         # Контекстное меню
         self.menu = tk.Menu(self.root, tearoff=0)
@@ -133,18 +187,13 @@ class NetworkAnalyzer:
             'max_crash_days': float(crash_days),
             'slope': float(slope)
         }
+        # новая работа ещё не имеет последователей, поэтому цикла не создаёт
+        self.topo.add_node(name, preds)
         self.graph.add_node(name)
         for p in preds:
             self.graph.add_edge(p, name)
 
-        if not nx.is_directed_acyclic_graph(self.graph):
-            messagebox.showerror("Ошибка", "Создаётся цикл! Добавление отменено.")
-            # удалить добавленное
-            self.activities.remove(name)
-            self.data.pop(name, None)
-            self.graph.remove_node(name)
-            return
-
+        self.cpm.invalidate()
         self.act_entry.delete(0, tk.END)
         self.update_table()
 
@@ -215,6 +264,9 @@ class NetworkAnalyzer:
                 self.data[item]['slope'] = (self.data[item]['cost_crash'] - self.data[item]['cost_normal']) / crash_days if crash_days > 0 else float('inf')
 
                 self.update_table()
+                # живой пересчёт КП, если он уже был рассчитан
+                if key == 'duration' and self.live is not None and self.live.valid:
+                    self.calculate_cp(changed=item)
             except Exception:
                 # тихо игнорируем неверный ввод
                 pass
@@ -247,6 +299,8 @@ class NetworkAnalyzer:
         self.data.pop(act, None)
         if self.graph.has_node(act):
             self.graph.remove_node(act)
+        if act in self.topo.ord:
+            self.topo.remove_node(act)
 
         # убираем из предшественников у остальных
         for a in list(self.activities):
@@ -256,6 +310,7 @@ class NetworkAnalyzer:
                 if self.graph.has_edge(act, a):
                     self.graph.remove_edge(act, a)
 
+        self.cpm.invalidate()
         self.update_table()
 
     def change_predecessors(self):
@@ -270,50 +325,42 @@ class NetworkAnalyzer:
             return
         new_preds = [p.strip() for p in new.split(",") if p.strip() in self.activities]
 
-        # Сохраним старые значения на случай отката
-        old_preds = list(self.data[act]['predecessors'])
-        old_edges = []
-        for p in old_preds:
-            if self.graph.has_edge(p, act):
-                old_edges.append((p, act))
+        # Проверка на цикл: затрагивает только работы между концами новых связей
+        try:
+            self.topo.set_predecessors(act, new_preds)
+        except CycleError as e:
+            messagebox.showerror("Ошибка", f"Цикл! Изменение предшественников отменено.\n{e}")
+            return
 
-        # Удаляем старые рёбра
-        for p in old_preds:
+        for p in self.data[act]['predecessors']:
             if self.graph.has_edge(p, act):
                 self.graph.remove_edge(p, act)
-
-        # Применяем новые предшественники
         self.data[act]['predecessors'] = new_preds
         for p in new_preds:
             self.graph.add_edge(p, act)
 
-        # Проверка на цикл
-        if not nx.is_directed_acyclic_graph(self.graph):
-            messagebox.showerror("Ошибка", "Цикл! Изменение предшественников откатывается.")
-            # Откат
-            for p in new_preds:
-                if self.graph.has_edge(p, act):
-                    self.graph.remove_edge(p, act)
-            self.data[act]['predecessors'] = old_preds
-            for (p, a) in old_edges:
-                self.graph.add_edge(p, a)
-            return
-
+        self.cpm.invalidate()
         self.update_table()
 
-    def calculate_cp(self):
+    def calculate_cp(self, changed=None):
         """
         Рассчитывает критический путь на основании текущих данных self.data (использует нормальные длительности).
         Выводит результат в self.result_text и устанавливает target_entry равной длительности проекта.
+        changed — работа, у которой изменилась только длительность: тогда предыдущий расчёт
+        обновляется инкрементно, а не пересчитывается целиком.
         """
         if not self.activities:
             messagebox.showinfo("Инфо", "Нет работ для расчёта")
             return
 
-        # times: используем текущие нормальные длительности
-        times = {a: self.data[a]['duration'] for a in self.activities}
+        if changed is not None and self.live is not None and self.live.valid:
+            self.live.set_duration(self.cpm.index[changed], self.data[changed]['duration'])
+        else:
+            # используем текущие нормальные длительности
+            self.cpm.sync(self.activities, self.data)
+            self.live = IncrementalCPM(self.cpm, self.cpm.durations(self.data))
 
-        project_duration, critical, es, ef, ls, lf = self.calculate_critical_path(times)
+        project_duration, critical, es, ef, ls, lf = self.live.as_path()
 
         # Резервы
         total_float = {}
@@ -331,7 +378,15 @@ class NetworkAnalyzer:
         self.result_text.insert(tk.END, "РАСЧЁТ КРИТИЧЕСКОГО ПУТИ\n")
         self.result_text.insert(tk.END, f"{'='*60}\n")
         self.result_text.insert(tk.END, f"Длительность проекта: {project_duration:.2f} дней\n")
-        self.result_text.insert(tk.END, f"Критический путь ({len(critical)} работ): {' → '.join(critical)}\n\n")
+        self.result_text.insert(tk.END, f"Критические работы ({len(critical)}): {', '.join(critical)}\n")
+        # Критических цепочек может быть несколько, поэтому выводятся сами пути, включая почти критические
+        try:
+            k = max(1, int(self.paths_entry.get()))
+        except ValueError:
+            k = 5
+        paths = LongestPaths(self.cpm, self.live.d).take(k)
+        self.result_text.insert(tk.END, f"Самые длинные пути ({len(paths)}):\n")
+        self.result_text.insert(tk.END, format_paths(self.cpm.names, paths, project_duration) + "\n\n")
 
         self.result_text.insert(tk.END, f"{'Работа':<12} {'ES':>6} {'EF':>6} {'LS':>6} {'LF':>6} {'Общ.рез.':>10} {'Своб.рез.':>10}\n")
         self.result_text.insert(tk.END, "-"*80 + "\n")
@@ -348,41 +403,45 @@ class NetworkAnalyzer:
         # Для внешнего использования возвращаем данные
         return project_duration, critical, es, ef, ls, lf
 
+    def sensitivity(self):
+        """
+        Таблица «что если» по кэшированным ES и хвостам (IncrementalCPM.what_if): срок проекта
+        после удлинения/сокращения каждой работы на Δ — без изменения данных и пересчёта КП.
+        """
+        if not self.activities:
+            messagebox.showinfo("Инфо", "Нет работ для расчёта")
+            return
+        try:
+            delta = float(self.delta_entry.get())
+            if delta < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Ошибка", "Введите неотрицательное Δ")
+            return
+
+        if self.live is None or not self.live.valid:
+            self.cpm.sync(self.activities, self.data)
+            self.live = IncrementalCPM(self.cpm, self.cpm.durations(self.data))
+        table = self.live.what_if(delta)
+        duration = self.live.duration
+
+        self.result_text.insert(tk.END, f"\n\nЧУВСТВИТЕЛЬНОСТЬ: СРОК ПРОЕКТА ПРИ ИЗМЕНЕНИИ ДЛИТЕЛЬНОСТИ НА ±{delta:g}\n")
+        self.result_text.insert(tk.END, "="*60 + "\n")
+        self.result_text.insert(tk.END, f"Текущая длительность проекта: {duration:.2f} дней\n")
+        self.result_text.insert(tk.END, f"{'Работа':<12} {'Длит.':>7} {'Общ.рез.':>9} {'+Δ':>9} {'-Δ':>9} {'Макс. выигрыш':>14}\n")
+        self.result_text.insert(tk.END, "-"*66 + "\n")
+        for act in self.activities:
+            i = self.cpm.index[act]
+            self.result_text.insert(tk.END,
+                                    f"{act:<12} {self.live.d[i]:>7.2f} {table['float'][i]:>9.2f} "
+                                    f"{table['plus'][i]:>9.2f} {table['minus'][i]:>9.2f} {table['gain'][i]:>14.2f}\n")
+
     def calculate_critical_path(self, times):
         """
         Универсальный расчёт КП для данного словаря times: {act: duration}.
         Возвращает: project_duration, critical_list (по порядку топологической сортировки), ES, EF, LS, LF
         """
-        # Прямой проход (ES, EF)
-        es = {}
-        ef = {}
-        for act in topological_sort(self.graph):
-            preds = self.data[act]['predecessors']
-            if not preds:
-                es[act] = 0.0
-            else:
-                es[act] = max([ef.get(p, 0.0) for p in preds])
-            dur = float(times.get(act, self.data[act]['duration']))
-            ef[act] = es[act] + dur
-
-        project_duration = max(ef.values()) if ef else 0.0
-
-        # Обратный проход (LS, LF)
-        lf = {}
-        ls = {}
-        for act in reversed(list(topological_sort(self.graph))):
-            succs = list(self.graph.successors(act))
-            if not succs:
-                lf[act] = project_duration
-            else:
-                lf[act] = min([ls.get(s, project_duration) for s in succs])
-            dur = float(times.get(act, self.data[act]['duration']))
-            ls[act] = lf[act] - dur
-
-        # Критичность: EF == LF (с погрешностью)
-        critical = [act for act in self.activities if abs(ef[act] - lf[act]) < 1e-6]
-
-        return project_duration, critical, es, ef, ls, lf
+        return self.cpm.calc_path(self.activities, self.data, times)
 
     def optimize_cost(self):
         """
@@ -401,11 +460,14 @@ class NetworkAnalyzer:
             messagebox.showerror("Ошибка", "Введите корректную целевую длительность")
             return
 
-        # Начальные durations — копия нормальных длительностей
-        current_duration = {a: float(self.data[a]['duration']) for a in self.activities}
+        # Начальные durations — копия нормальных длительностей; КП после каждого шага
+        # пересчитывается инкрементно (только конусы ускоренной работы)
+        self.cpm.sync(self.activities, self.data)
+        names = self.cpm.names
+        inc = IncrementalCPM(self.cpm, self.cpm.durations(self.data))
 
         # Исходная длительность проекта:
-        initial_proj_duration, _, _, _, _, _ = self.calculate_critical_path(current_duration)
+        initial_proj_duration = inc.duration
         initial_cost = sum(self.data[a]['cost_normal'] for a in self.activities)
 
         if target >= initial_proj_duration - 1e-9:
@@ -422,31 +484,31 @@ class NetworkAnalyzer:
 
         while current_project_duration > target + 1e-9 and it < max_iterations:
             it += 1
-            # ← ВОТ ЭТА СТРОКА САМАЯ ВАЖНАЯ:
-            current_project_duration, cp, es, ef, ls, lf = self.calculate_critical_path(current_duration)
-            if not cp:
+            cp = inc.critical()
+            if not len(cp):
                 break
 
             # Найти на критическом пути работу с минимальным slope и с запасом для уменьшения
-            best_act = None
+            best_i = None
             best_slope = float('inf')
-            for act in cp:
-                max_reduce = current_duration[act] - self.data[act]['crash_duration']
+            for i in cp:
+                max_reduce = inc.d[i] - self.data[names[i]]['crash_duration']
                 if max_reduce > 1e-9:
-                    slope = self.data[act]['slope']
+                    slope = self.data[names[i]]['slope']
                     # Дополнительная проверка: slope может быть inf (нельзя ускорять экономически)
                     if slope < best_slope:
                         best_slope = slope
-                        best_act = act
+                        best_i = i
 
-            if best_act is None:
+            if best_i is None:
                 # Невозможно дальше ускорять
                 break
+            best_act = names[best_i]
 
             # Сколько нужно сократить до target
             need = current_project_duration - target
             # Сколько можно сократить у выбранной работы
-            possible_reduce = current_duration[best_act] - self.data[best_act]['crash_duration']
+            possible_reduce = inc.d[best_i] - self.data[best_act]['crash_duration']
             # Сделаем шаг: 1.0 день или остаток need или possible_reduce — что меньше
             step = min(1.0, possible_reduce, need)
             # Для случаев, когда need < 1 и possible_reduce >= need, сократим на need (дробный шаг)
@@ -454,10 +516,10 @@ class NetworkAnalyzer:
             if step <= 0:
                 break
 
-            current_duration[best_act] -= step
+            inc.set_duration(best_i, inc.d[best_i] - step)
             cost_increase = step * best_slope
             total_cost += cost_increase
-            current_project_duration -= step
+            current_project_duration = inc.duration
             steps.append(f"Ускорить {best_act} на {step:.2f} дн. (цена {best_slope:.2f}/день, +{cost_increase:.2f} у.е.)")
 
         # Вывод результата
@@ -478,64 +540,340 @@ class NetworkAnalyzer:
             self.result_text.insert(tk.END, "Шаги оптимизации отсутствуют — ускорение невозможно.\n")
 
         # Финальный критический путь по обновлённым durations
-        final_proj_duration, final_cp, _, _, _, _ = self.calculate_critical_path(current_duration)
+        final_proj_duration, final_cp, _, _, _, _ = inc.as_path()
+        self.result_text.insert(tk.END, f"\nФинальный критический путь: {' → '.join(final_cp)} = {final_proj_duration:.2f} дней\n")
+
+    def optimize_exact(self):
+        """
+        Точная минимальная стоимость ускорения до целевой длительности: ответ берётся
+        из кривой «время — стоимость» (crashing.time_cost_curve), которая строится один раз
+        на состояние сети и кэшируется. В отличие от optimize_cost, сокращает сразу
+        все параллельные критические пути.
+        """
+        if not self.activities:
+            messagebox.showinfo("Инфо", "Нет работ для оптимизации")
+            return
+        try:
+            target = float(self.target_entry.get())
+        except Exception:
+            messagebox.showerror("Ошибка", "Введите корректную целевую длительность")
+            return
+
+        self.get_curve(lambda curve, data: self.show_plan(curve, data, target))
+
+    def show_plan(self, curve, data, target):
+        result = curve.plan(target)
+        self.draw_curve(curve, target)
+
+        self.result_text.insert(tk.END, "\n\nТОЧНАЯ ОПТИМИЗАЦИЯ ПО СТОИМОСТИ\n")
+        self.result_text.insert(tk.END, "="*60 + "\n")
+        self.result_text.insert(tk.END, format_plan(curve.engine, data, result) + "\n")
+        crashed = dict(zip(curve.engine.names, result["durations"].tolist()))
+        final_proj_duration, final_cp, _, _, _, _ = curve.engine.calc_path(curve.engine.names, data, crashed)
         self.result_text.insert(tk.END, f"\nФинальный критический путь: {' → '.join(final_cp)} = {final_proj_duration:.2f} дней\n")
 
+    def get_curve(self, done):
+        """
+        Кривая «время — стоимость» для текущего состояния сети; done(curve, data) вызывается, когда
+        она готова (data — данные работ, по которым она построена).
+        Построенная кривая берётся из кэша сразу. Иначе она строится в фоновом потоке по снимку сети
+        (правки во время расчёта его не затрагивают), а окно показывает прогресс и позволяет отменить расчёт.
+        """
+        if self.curve_job is not None:
+            messagebox.showinfo("Инфо", "Кривая уже строится")
+            return
+        try:
+            self.cpm.sync(self.activities, self.data)
+            curve = cached_curve(self.cpm, self.data)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+        if curve is not None:
+            done(curve, self.data)
+            return
+
+        activities = list(self.activities)
+        data = {a: dict(self.data[a], predecessors=list(self.data[a]['predecessors'])) for a in activities}
+        engine = CPMEngine()
+        engine.sync(activities, data)
+        job = self.curve_job = {"progress": 0.0, "cancel": False, "curve": None, "error": None}
+
+        def progress(fraction):
+            job["progress"] = fraction
+            return job["cancel"]
+
+        def work():
+            try:
+                job["curve"] = time_cost_curve(engine, data, progress=progress)
+            except Cancelled:
+                pass
+            except ImportError:
+                job["error"] = "Для точной оптимизации нужен пакет scipy"
+            except Exception as e:
+                job["error"] = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+
+        window = tk.Toplevel(self.root)
+        window.title("Кривая время — стоимость")
+        window.transient(self.root)
+        ttk.Label(window, text=f"Построение кривой ({len(activities)} работ)...").pack(padx=15, pady=(15, 5))
+        bar = ttk.Progressbar(window, length=300, maximum=100)
+        bar.pack(padx=15, pady=5)
+        cancel = lambda: job.update(cancel=True)
+        ttk.Button(window, text="Отмена", command=cancel).pack(pady=(5, 15))
+        window.protocol("WM_DELETE_WINDOW", cancel)
+
+        thread = threading.Thread(target=work, daemon=True)
+        thread.start()
+        self.root.after(100, self.poll_curve, thread, window, bar, lambda curve: done(curve, data))
+
+    def poll_curve(self, thread, window, bar, done):
+        """Опрос фонового построения кривой: обновляет прогресс, по завершении закрывает окно и вызывает done."""
+        job = self.curve_job
+        if thread.is_alive():
+            bar["value"] = 100 * job["progress"]
+            self.root.after(100, self.poll_curve, thread, window, bar, done)
+            return
+        window.destroy()
+        self.curve_job = None
+        if job["error"]:
+            messagebox.showerror("Ошибка", job["error"])
+        elif job["curve"] is not None:
+            done(job["curve"])
+
+    def show_curve(self):
+        if not self.activities:
+            messagebox.showinfo("Инфо", "Нет работ для оптимизации")
+            return
+        try:
+            target = float(self.target_entry.get())
+        except ValueError:
+            target = None
+        self.get_curve(lambda curve, data: self.list_curve(curve, target))
+
+    def list_curve(self, curve, target):
+        self.draw_curve(curve, target)
+        self.result_text.insert(tk.END, "\n\nКРИВАЯ ВРЕМЯ — СТОИМОСТЬ\n")
+        self.result_text.insert(tk.END, "="*60 + "\n")
+        self.result_text.insert(tk.END, f"{'Длительность':>14} {'Доп. затраты':>14}\n")
+        for T, c in zip(curve.durations, curve.costs):
+            self.result_text.insert(tk.END, f"{T:>14.2f} {c:>14.2f}\n")
+
+    def draw_curve(self, curve, target=None):
+        """Ломаная по точкам излома кривой; target — отметка на кривой (если в её пределах)."""
+        c = self.curve_canvas
+        c.delete("all")
+        w = int(c.cget("width"))
+        h = int(c.cget("height"))
+        left, right, top, bottom = 60, 15, 15, 35
+        t_lo, t_hi = curve.min_duration, curve.durations[0]
+        c_hi = curve.costs[-1]
+        span_t = (t_hi - t_lo) or 1.0
+        span_c = c_hi or 1.0
+        sx = lambda t: left + (t - t_lo) / span_t * (w - left - right)
+        sy = lambda v: h - bottom - v / span_c * (h - top - bottom)
+
+        c.create_line(left, h - bottom, w - right, h - bottom)
+        c.create_line(left, top, left, h - bottom)
+        c.create_text((left + w - right) / 2, h - 8, text="Длительность проекта, дней")
+        c.create_text(left - 5, top, text=f"{c_hi:.0f}", anchor="e")
+        c.create_text(left - 5, h - bottom, text="0", anchor="e")
+        c.create_text(left, h - bottom + 12, text=f"{t_lo:.1f}")
+        c.create_text(w - right, h - bottom + 12, text=f"{t_hi:.1f}", anchor="e")
+
+        points = [xy for T, v in zip(curve.durations, curve.costs) for xy in (sx(T), sy(v))]
+        if len(points) >= 4:
+            c.create_line(*points, fill="#0078D7", width=2)
+        for T, v in zip(curve.durations, curve.costs):
+            x, y = sx(T), sy(v)
+            c.create_oval(x - 3, y - 3, x + 3, y + 3, fill="#0078D7", outline="")
+
+        if target is not None and t_lo - 1e-9 <= target <= t_hi + 1e-9:
+            cost = curve.plan(target)["extra_cost"]
+            x, y = sx(target), sy(cost)
+            c.create_line(x, h - bottom, x, y, fill="red", dash=(3, 3))
+            c.create_oval(x - 4, y - 4, x + 4, y + 4, outline="red", width=2)
+            c.create_text(x, y - 10, text=f"{target:.1f}: {cost:.0f}", fill="red")
+
+    def simulate_pert(self):
+        """
+        Стохастический расчёт (pert.py): длительности по трёхточечным оценкам,
+        распределение срока завершения, вероятность уложиться в целевую длительность
+        и индексы критичности работ.
+        """
+        if not self.activities:
+            messagebox.showinfo("Инфо", "Нет работ для расчета")
+            return
+        try:
+            samples = int(self.samples_entry.get())
+            if samples <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Ошибка", "Введите положительное число выборок")
+            return
+        try:
+            target = float(self.target_entry.get())
+        except ValueError:
+            target = None
+
+        try:
+            self.cpm.sync(self.activities, self.data)
+            params = three_point(self.cpm, self.data)
+            durations, critical = monte_carlo(self.cpm, params, samples)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+
+        deterministic = self.cpm.passes(self.cpm.durations(self.data))[0]
+        self.result_text.insert(tk.END, "\n\nМОНТЕ-КАРЛО (PERT)\n")
+        self.result_text.insert(tk.END, "="*60 + "\n")
+        self.result_text.insert(tk.END, format_report(self.cpm, summarize(durations, critical, target), deterministic) + "\n")
+
+    def schedule_resources(self):
+        """
+        Расписание с ограниченными ресурсами (rcpsp.py): потребности работ берутся из поля
+        resources, мощности — из файла сети или вводятся здесь.
+        """
+        if not self.activities:
+            messagebox.showinfo("Инфо", "Нет работ для расчета")
+            return
+        current = "; ".join(f"{r}={c:g}" for r, c in sorted(self.capacities.items()))
+        spec = simpledialog.askstring("Ресурсы", "Мощности ресурсов (например: crew=5; crane=2):",
+                                      initialvalue=current)
+        if spec is None:
+            return
+        try:
+            self.capacities = parse_capacities(spec)
+            self.cpm.sync(self.activities, self.data)
+            result = schedule(self.cpm, self.data, self.capacities, self.rule_box.get(), self.scheme_box.get())
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+
+        self.result_text.insert(tk.END, "\n\nРАСПИСАНИЕ С ОГРАНИЧЕННЫМИ РЕСУРСАМИ\n")
+        self.result_text.insert(tk.END, "="*60 + "\n")
+        self.result_text.insert(tk.END, format_schedule(self.cpm, result) + "\n")
+
+    def optimize_modes(self):
+        """
+        Выбор дискретных режимов работ (multimode.py): режимы — из поля modes, иначе нормальный
+        и ускоренный. Если задана целевая длительность — минимальная стоимость при этом сроке,
+        иначе запрашивается бюджет и ищется минимальный срок.
+        """
+        if not self.activities:
+            messagebox.showinfo("Инфо", "Нет работ для расчета")
+            return
+        deadline = budget = None
+        try:
+            deadline = float(self.target_entry.get())
+        except ValueError:
+            budget = simpledialog.askfloat("Бюджет", "Целевая длительность не задана.\nБюджет (суммарная стоимость):",
+                                           minvalue=0.0)
+            if budget is None:
+                return
+        try:
+            self.cpm.sync(self.activities, self.data)
+            result = solve_modes(self.cpm, self.data, deadline, budget)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+
+        self.result_text.insert(tk.END, "\n\nДИСКРЕТНЫЕ РЕЖИМЫ РАБОТ\n")
+        self.result_text.insert(tk.END, "="*60 + "\n")
+        self.result_text.insert(tk.END, format_solution(self.cpm, result) + "\n")
+
+    def level_resources(self):
+        """
+        Выравнивание ресурсов (levelling.py): некритические работы сдвигаются в пределах
+        полного резерва так, чтобы уменьшить Σu² или пики загрузки; срок проекта не меняется.
+        """
+        if not self.activities:
+            messagebox.showinfo("Инфо", "Нет работ для расчета")
+            return
+        try:
+            self.cpm.sync(self.activities, self.data)
+            result = level(self.cpm, self.data, self.objective_box.get(), budget=2.0)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+
+        self.draw_histograms(result)
+        self.result_text.insert(tk.END, "\n\nВЫРАВНИВАНИЕ РЕСУРСОВ\n")
+        self.result_text.insert(tk.END, "="*60 + "\n")
+        self.result_text.insert(tk.END, format_levelling(self.cpm, result) + "\n")
+
+    def draw_histograms(self, result, panels=4):
+        """Гистограммы загрузки по ресурсам (не больше panels): до — серым, после — синим; столбец — максимум по слотам."""
+        c = self.curve_canvas
+        c.delete("all")
+        w = int(c.cget("width"))
+        h = int(c.cget("height"))
+        left, right, top, bottom = 40, 10, 10, 25
+        names = result["resources"][:panels]
+        band = (h - top - bottom) / len(names)
+        slots = result["before"].shape[1]
+        columns = min(slots, w - left - right)
+        dx = (w - left - right) / columns
+        for r, name in enumerate(names):
+            before = [b.max() for b in np.array_split(result["before"][r], columns)]
+            after = [a.max() for a in np.array_split(result["after"][r], columns)]
+            y0 = top + (r + 1) * band - 4
+            scale = max(max(before), max(after)) or 1.0
+            sy = lambda u: y0 - u / scale * (band - 16)
+            c.create_line(left, y0, w - right, y0)
+            c.create_text(left - 4, sy(scale), text=f"{scale:g}", anchor="e")
+            c.create_text(w - right, y0 - band + 14, text=name, anchor="ne")
+            for hist, color, width in ((before, "#BBBBBB", 3), (after, "#0078D7", 1)):
+                points = []
+                for i, u in enumerate(hist):
+                    points += [left + i * dx, sy(u), left + (i + 1) * dx, sy(u)]
+                c.create_line(*points, fill=color, width=width)
+        c.create_text((left + w - right) / 2, h - 8,
+                      text=f"Время, 0–{slots * result['step']:g} дней; серый — до, синий — после")
+
+    def analyse_portfolio(self):
+        """
+        Портфель (portfolio.py): выбранные файлы проектов считаются в пуле процессов, неизменённые —
+        из кэша. Целевая длительность, если задана, — срок для проектов без своего ключа deadline.
+        """
+        paths = filedialog.askopenfilenames(filetypes=[("Сеть", "*.json *.jsonl *.csv")])
+        if not paths:
+            return
+        deadline = None
+        if self.target_entry.get().strip():
+            try:
+                deadline = float(self.target_entry.get())
+            except ValueError:
+                messagebox.showerror("Ошибка", "Целевая длительность должна быть числом")
+                return
+        try:
+            results, summary = run_portfolio(list(paths), deadline)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+
+        self.result_text.insert(tk.END, "\n\nПОРТФЕЛЬ ПРОЕКТОВ\n")
+        self.result_text.insert(tk.END, "="*60 + "\n")
+        self.result_text.insert(tk.END, format_portfolio(results, summary) + "\n")
+
     def load_json(self):
-        path = filedialog.askopenfilename(filetypes=[("JSON", "*.json")])
+        path = filedialog.askopenfilename(filetypes=[("Сеть", "*.json *.jsonl *.csv"), ("JSON", "*.json"),
+                                                     ("JSON Lines", "*.jsonl"), ("CSV", "*.csv")])
         if not path:
             return
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                d = json.load(f)
-
-            # Проверяем структуру
-            activities = d.get('activities') if isinstance(d, dict) else None
-            data = d.get('data') if isinstance(d, dict) else None
-            if not isinstance(activities, list) or not isinstance(data, dict):
-                raise ValueError("Некорректный формат JSON. Требуются ключи 'activities' (list) и 'data' (dict).")
-
-            # Очистка текущих данных
-            self.activities = []
-            self.data = {}
+            # Разбор и проверка столбцами (cpm_io), затем проверка на цикл с порядком работ
+            net = load_network(path, strict=True)
+            activities, data = net.to_data()
+            self.topo.build(activities, {a: data[a]['predecessors'] for a in activities})
+
+            self.activities = activities
+            self.data = data
+            self.capacities = net.capacities
             self.graph.clear()
-
-            a_set = set(activities)
-            # Сначала добавим все узлы
-            for act in activities:
-                self.activities.append(act)
-                info = data.get(act)
-                if not info:
-                    raise ValueError(f"Нет данных для работы {act} в 'data'.")
-                # Приведение типов и валидация
-                preds = info.get('predecessors', [])
-                dur = float(info.get('duration'))
-                crash_dur = float(info.get('crash_duration'))
-                cost_n = float(info.get('cost_normal'))
-                cost_c = float(info.get('cost_crash'))
-                if crash_dur >= dur:
-                    raise ValueError(f"Для работы {act}: crash_duration должен быть меньше duration.")
-                crash_days = dur - crash_dur
-                slope = (cost_c - cost_n) / crash_days if crash_days > 0 else float('inf')
-                self.data[act] = {
-                    'predecessors': [p for p in preds if p in a_set],
-                    'duration': dur,
-                    'crash_duration': crash_dur,
-                    'cost_normal': cost_n,
-                    'cost_crash': cost_c,
-                    'max_crash_days': crash_days,
-                    'slope': slope
-                }
-                self.graph.add_node(act)
-
-            # Добавим рёбра
-            for act, info in self.data.items():
-                for p in info['predecessors']:
-                    if p in a_set:
-                        self.graph.add_edge(p, act)
-
-            if not nx.is_directed_acyclic_graph(self.graph):
-                raise ValueError("Загруженный граф содержит цикл.")
+            self.graph.add_nodes_from(activities)
+            self.graph.add_edges_from(zip((activities[i] for i in net.src.tolist()),
+                                          (activities[i] for i in net.dst.tolist())))
+            self.cpm.invalidate()
 
             self.update_table()
             messagebox.showinfo("OK", "Загружено")
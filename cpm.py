@@ -0,0 +1,637 @@
+import heapq
+import itertools
+import numpy as np
+
+# Общее ядро метода критического пути для contcut.py и itercut.py.
+#
+# Структура сети (работы и предшественники) компилируется один раз в массивы:
+# индексы работ, топологический порядок, уровни (длина самого длинного пути от начала
+# в рёбрах) и CSR-списки предшественников/последователей. Прямой и обратный проходы
+# идут по уровням векторно (np.maximum.reduceat / np.minimum.reduceat), так что изменение
+# длительностей не требует перекомпиляции. После изменения структуры сети
+# (добавление/удаление работы, правка предшественников, загрузка) нужно вызвать invalidate().
+#
+# IncrementalCPM держит результат расчёта и после изменения длительности одной работы
+# пересчитывает ES/EF только в её нисходящем конусе, а «хвосты» (LS/LF) — только в восходящем,
+# останавливаясь там, где значения не изменились.
+#
+# По тем же ES и хвостам таблица «что если» (IncrementalCPM.what_if) сразу для всех работ
+# даёт срок проекта после изменения длительности одной работы на ±Δ: удлинение даёт
+# max(T, ES + q + Δ), сокращение — max(самый длинный путь в обход работы, ES + q - Δ).
+# Пути в обход ищутся по топологическим позициям: путь, не проходящий через v, либо
+# целиком лежит до/после позиции v, либо «перепрыгивает» её по связи u → w.
+#
+# LongestPaths перечисляет пути от начальных работ к конечным по убыванию длины (по Эппштейну):
+# путь задаётся последовательностью «отклонений» — связей u → w в обход лучшего последователя u,
+# каждое стоит LS[w] - LF[u]. Кучи отклонений вдоль лучших цепочек строятся лениво и
+# персистентно (левацкие кучи с общими хвостами), так что k-й путь получается за O(log)
+# операций с очередью, без обхода экспоненциального множества путей.
+#
+# DynamicTopo поддерживает топологический порядок при правке связей (Pearce–Kelly):
+# новая связь u → w проверяется поиском только в «затронутой» области позиций [ord(w), ord(u)],
+# при цикле сразу известен путь, замыкающий его, а CPMEngine берёт готовый порядок
+# вместо повторной сортировки.
+
+# Необязательные поля работы, которые загрузчики сохраняют как есть: трёхточечная оценка
+# для стохастического режима (pert.py), потребности в ресурсах {ресурс: единиц} (rcpsp.py)
+# и дискретные режимы выполнения [[длительность, стоимость], ...] (multimode.py)
+THREE_POINT = ("optimistic", "most_likely", "pessimistic", "distribution")
+EXTRA_FIELDS = THREE_POINT + ("resources", "modes")
+
+
+def gather(ptr, idx, nodes):
+    """Соседи узлов nodes подряд и начала их сегментов (для reduceat)."""
+    first = ptr[nodes]
+    count = ptr[nodes + 1] - first
+    seg = np.zeros(len(nodes), dtype=np.int64)
+    seg[1:] = np.cumsum(count)[:-1]
+    pos = np.repeat(first - seg, count) + np.arange(int(count.sum()))
+    return idx[pos], seg
+
+
+class CycleError(ValueError):
+    """Связь замыкает цикл; path — работы цикла по порядку (первая повторена в конце)."""
+
+    def __init__(self, path):
+        self.path = list(path)
+        super().__init__("Цикл: " + " → ".join(map(str, self.path)))
+
+
+class DynamicTopo:
+    """
+    Граф работ с поддерживаемым топологическим порядком. ord — позиция работы,
+    slots — работы по позициям (None на месте удалённых, уплотняются при order()).
+    """
+
+    def __init__(self):
+        self.ord = {}
+        self.slots = []
+        self.succs = {}
+        self.preds = {}
+
+    def build(self, nodes, predecessors):
+        """Полное построение (алгоритм Кана). При цикле — CycleError, состояние не меняется."""
+        nodes = list(nodes)
+        known = set(nodes)
+        preds = {v: set(p for p in predecessors.get(v, ()) if p in known) for v in nodes}
+        succs = {v: set() for v in nodes}
+        for v, ps in preds.items():
+            for p in ps:
+                succs[p].add(v)
+        indeg = {v: len(ps) for v, ps in preds.items()}
+        order = [v for v in nodes if indeg[v] == 0]
+        for v in order:
+            for w in succs[v]:
+                indeg[w] -= 1
+                if indeg[w] == 0:
+                    order.append(w)
+        if len(order) < len(nodes):
+            # У каждой оставшейся работы есть оставшийся предшественник — идём по ним до повтора
+            v = next(v for v in nodes if indeg[v] > 0)
+            seen = {}
+            walk = []
+            while v not in seen:
+                seen[v] = len(walk)
+                walk.append(v)
+                v = next(p for p in preds[v] if indeg[p] > 0)
+            cycle = walk[seen[v]:][::-1]
+            raise CycleError(cycle + cycle[:1])
+        self.preds, self.succs = preds, succs
+        self.slots = order
+        self.ord = {v: k for k, v in enumerate(order)}
+
+    def order(self):
+        """Работы в топологическом порядке."""
+        if len(self.slots) > 2 * len(self.ord):
+            self.slots = [v for v in self.slots if v is not None]
+            self.ord = {v: k for k, v in enumerate(self.slots)}
+        return [v for v in self.slots if v is not None]
+
+    def add_node(self, v, preds=()):
+        """Новая работа встаёт в конец порядка — её связи от предшественников цикла не дают."""
+        self.ord[v] = len(self.slots)
+        self.slots.append(v)
+        self.succs[v] = set()
+        self.preds[v] = set(preds)
+        for p in self.preds[v]:
+            self.succs[p].add(v)
+
+    def remove_node(self, v):
+        for p in self.preds.pop(v):
+            self.succs[p].discard(v)
+        for w in self.succs.pop(v):
+            self.preds[w].discard(v)
+        self.slots[self.ord.pop(v)] = None
+
+    def remove_edge(self, u, w):
+        self.succs[u].discard(w)
+        self.preds[w].discard(u)
+
+    def add_edge(self, u, w):
+        """Связь u → w. Если она замыкает цикл — CycleError с путём u → w → … → u, граф не меняется."""
+        if w in self.succs[u]:
+            return
+        if u == w:
+            raise CycleError([u, u])
+        lb, ub = self.ord[w], self.ord[u]
+        if lb < ub:
+            # Вперёд от w в пределах позиций ≤ ord(u): встретили u — цикл
+            parent = {w: None}
+            stack = [w]
+            while stack:
+                x = stack.pop()
+                for y in self.succs[x]:
+                    if y == u:
+                        path = [u, x]
+                        while parent[x] is not None:
+                            x = parent[x]
+                            path.append(x)
+                        path.reverse()
+                        raise CycleError([u] + path)
+                    if y not in parent and self.ord[y] < ub:
+                        parent[y] = x
+                        stack.append(y)
+            forward = list(parent)
+
+            # Назад от u в пределах позиций ≥ ord(w)
+            back = {u}
+            stack = [u]
+            while stack:
+                x = stack.pop()
+                for y in self.preds[x]:
+                    if y not in back and self.ord[y] > lb:
+                        back.add(y)
+                        stack.append(y)
+
+            # Предки u, затем потомки w — на те же позиции, с сохранением относительного порядка
+            moved = sorted(back, key=self.ord.get) + sorted(forward, key=self.ord.get)
+            for v, k in zip(moved, sorted(self.ord[v] for v in moved)):
+                self.ord[v] = k
+                self.slots[k] = v
+        self.succs[u].add(w)
+        self.preds[w].add(u)
+
+    def set_predecessors(self, v, preds):
+        """Заменить предшественников v. При цикле — CycleError, прежние связи восстанавливаются."""
+        old = set(self.preds[v])
+        new = list(dict.fromkeys(preds))
+        dropped = old - set(new)
+        for p in dropped:
+            self.remove_edge(p, v)
+        added = []
+        try:
+            for p in new:
+                if p not in old:
+                    self.add_edge(p, v)
+                    added.append(p)
+        except CycleError:
+            for p in added:
+                self.remove_edge(p, v)
+            for p in dropped:
+                self.add_edge(p, v)
+            raise
+
+
+class CPMEngine:
+    def __init__(self, topo=None):
+        self.topo = topo   # DynamicTopo: если задан, его порядок используется вместо сортировки
+        self.names = []
+        self.index = {}
+        self._preds = self._succs = None
+        self.compiled = False
+        self.version = 0   # растёт при каждой компиляции; по нему IncrementalCPM узнаёт об устаревании
+
+    def invalidate(self):
+        """Сбросить скомпилированную структуру (вызывать при изменении состава работ или связей)."""
+        self.compiled = False
+
+    def compile(self, names, predecessors):
+        """
+        names — работы в порядке отображения, predecessors — {работа: [предшественники]}.
+        Строит топологический порядок (Кан, либо готовый из self.topo), уровни и CSR-массивы.
+        Цикл — ValueError.
+        """
+        names = list(names)
+        index = {a: i for i, a in enumerate(names)}
+        pairs = [(index[p], v) for v, a in enumerate(names) for p in predecessors[a] if p in index]
+        src = np.fromiter((p for p, _ in pairs), dtype=np.int64, count=len(pairs))
+        dst = np.fromiter((v for _, v in pairs), dtype=np.int64, count=len(pairs))
+        self.compile_edges(names, src, dst, index)
+
+    def compile_edges(self, names, src, dst, index=None):
+        """
+        Компиляция по массивам связей src[k] → dst[k] (индексы в names) — без словарей работ,
+        для больших сетей (cpm_io). Порядок и уровни — векторный Кан по фронтам: фронт d —
+        работы, у которых последний предшественник оказался во фронте d - 1.
+        """
+        self.names = list(names)
+        self.index = index if index is not None else {a: i for i, a in enumerate(self.names)}
+        n = len(self.names)
+        src = np.asarray(src, dtype=np.int64)
+        dst = np.asarray(dst, dtype=np.int64)
+        by_dst = np.argsort(dst, kind="stable")
+        by_src = np.argsort(src, kind="stable")
+        self.pred_ptr = np.concatenate([[0], np.cumsum(np.bincount(dst, minlength=n))]).astype(np.int64)
+        self.pred_idx = src[by_dst]
+        self.succ_ptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))]).astype(np.int64)
+        self.succ_idx = dst[by_src]
+        self._preds = self._succs = None
+
+        if self.topo is not None:
+            order = np.fromiter((self.index[a] for a in self.topo.order() if a in self.index), dtype=np.int64)
+            if len(order) < n:
+                raise ValueError("Порядок работ не согласован с сетью")
+            level = [0] * n
+            succs = self.succs
+            for v in order.tolist():
+                for w in succs[v]:
+                    if level[v] + 1 > level[w]:
+                        level[w] = level[v] + 1
+            level = np.array(level, dtype=np.int64)
+        else:
+            indeg = np.diff(self.pred_ptr)
+            level = np.zeros(n, dtype=np.int64)
+            fronts = []
+            front = np.flatnonzero(indeg == 0)
+            depth = 0
+            while len(front):
+                level[front] = depth
+                fronts.append(front)
+                nxt, _ = gather(self.succ_ptr, self.succ_idx, front)
+                cand, count = np.unique(nxt, return_counts=True)
+                indeg[cand] -= count
+                front = cand[indeg[cand] == 0]
+                depth += 1
+            order = np.concatenate(fronts) if fronts else np.zeros(0, dtype=np.int64)
+            if len(order) < n:
+                raise CycleError(self._cycle(indeg))
+
+        self.pos = np.empty(n, dtype=np.int64)   # позиция работы в топологическом порядке
+        self.pos[order] = np.arange(n)
+        self.order = order
+        self.level = level
+
+        # Для каждого уровня: узлы, и для прохода — соседи подряд с началами сегментов
+        self.levels = []
+        if n:
+            by_level = np.argsort(self.level, kind="stable")
+            bounds = np.searchsorted(self.level[by_level], np.arange(int(self.level.max()) + 2))
+            has_succ = self.succ_ptr[1:] > self.succ_ptr[:-1]
+            for lo, hi in zip(bounds[:-1], bounds[1:]):
+                nodes = by_level[lo:hi]
+                inner = nodes[has_succ[nodes]]
+                self.levels.append((nodes,
+                                    gather(self.pred_ptr, self.pred_idx, nodes),
+                                    inner,
+                                    gather(self.succ_ptr, self.succ_idx, inner)))
+        self.sinks = np.flatnonzero(self.succ_ptr[1:] == self.succ_ptr[:-1])
+        self.compiled = True
+        self.version += 1
+
+    def _cycle(self, indeg):
+        """Работы цикла по оставшимся после Кана (у каждой есть оставшийся предшественник)."""
+        v = int(np.flatnonzero(indeg > 0)[0])
+        seen = {}
+        walk = []
+        while v not in seen:
+            seen[v] = len(walk)
+            walk.append(v)
+            ps = self.pred_idx[self.pred_ptr[v]:self.pred_ptr[v + 1]]
+            v = int(ps[indeg[ps] > 0][0])
+        cycle = [self.names[v] for v in walk[seen[v]:][::-1]]
+        return cycle + cycle[:1]
+
+    @property
+    def preds(self):
+        """Списки предшественников по индексам (строятся из CSR при первом обращении)."""
+        if self._preds is None:
+            self._preds = [x.tolist() for x in np.split(self.pred_idx, self.pred_ptr[1:-1])]
+        return self._preds
+
+    @property
+    def succs(self):
+        if self._succs is None:
+            self._succs = [x.tolist() for x in np.split(self.succ_idx, self.succ_ptr[1:-1])]
+        return self._succs
+
+    def sync(self, activities, data):
+        """Перекомпилировать, если структура была сброшена invalidate()."""
+        if not self.compiled:
+            self.compile(activities, {a: data[a]['predecessors'] for a in activities})
+
+    def durations(self, data, times=None):
+        """Вектор длительностей в порядке self.names (times переопределяет data[a]['duration'])."""
+        times = times or {}
+        return np.fromiter((float(times.get(a, data[a]['duration'])) for a in self.names),
+                           dtype=float, count=len(self.names))
+
+    def passes(self, d):
+        """Прямой и обратный проходы для вектора длительностей d. Возвращает (длительность, ES, EF, LS, LF)."""
+        n = len(self.names)
+        es = np.zeros(n)
+        ef = np.zeros(n)
+        for nodes, (src, seg), _, _ in self.levels:
+            if len(src):
+                es[nodes] = np.maximum.reduceat(ef[src], seg)
+            ef[nodes] = es[nodes] + d[nodes]
+        duration = float(ef.max()) if n else 0.0
+
+        lf = np.full(n, duration)
+        ls = np.zeros(n)
+        for nodes, _, inner, (dst, seg) in reversed(self.levels):
+            if len(inner):
+                lf[inner] = np.minimum.reduceat(ls[dst], seg)
+            ls[nodes] = lf[nodes] - d[nodes]
+        return duration, es, ef, ls, lf
+
+    def calc_path(self, activities, data, times=None):
+        """
+        Совместимая с прежними calc_path / calculate_critical_path обёртка:
+        duration, critical_list (в порядке activities), ES, EF, LS, LF — словари по работам.
+        """
+        self.sync(activities, data)
+        return self.as_path(*self.passes(self.durations(data, times)))
+
+    def as_path(self, duration, es, ef, ls, lf):
+        """Результат проходов в виде (duration, critical_list, ES, EF, LS, LF) со словарями по работам."""
+        names = self.names
+        critical = [names[i] for i in np.flatnonzero(np.abs(ef - lf) < 1e-6)]
+        as_dict = (lambda arr: dict(zip(names, arr.tolist())))
+        return duration, critical, as_dict(es), as_dict(ef), as_dict(ls), as_dict(lf)
+
+
+def cover_max(n, lo, hi, values):
+    """
+    Для каждой позиции p = 0..n-1 — максимум values[k] по интервалам [lo[k], hi[k]), содержащим p
+    (-inf, если таких нет). Отрезки раскладываются по дереву отрезков сразу для всех
+    интервалов, затем максимумы спускаются к листьям: O((n + K) log n) векторных операций.
+    """
+    size = 1
+    while size < n:
+        size *= 2
+    tree = np.full(2 * size, -np.inf)
+    l, r, v = lo + size, hi + size, np.asarray(values, dtype=float)
+    keep = l < r
+    l, r, v = l[keep], r[keep], v[keep]
+    while len(l):
+        odd = (l & 1).astype(bool)
+        np.maximum.at(tree, l[odd], v[odd])
+        l = l + odd
+        odd = (r & 1).astype(bool)
+        r = r - odd
+        np.maximum.at(tree, r[odd], v[odd])
+        l, r = l >> 1, r >> 1
+        keep = l < r
+        l, r, v = l[keep], r[keep], v[keep]
+    start = 1
+    while start < size:
+        parent = tree[start:2 * start]
+        np.maximum(tree[2 * start:4 * start:2], parent, out=tree[2 * start:4 * start:2])
+        np.maximum(tree[2 * start + 1:4 * start:2], parent, out=tree[2 * start + 1:4 * start:2])
+        start *= 2
+    return tree[size:size + n]
+
+
+class IncrementalCPM:
+    """
+    Результат КП для вектора длительностей d с пересчётом после изменения одной длительности.
+    Вместо LS/LF хранится хвост q[v] — самый длинный путь от начала v до конца проекта
+    (включая d[v]): он зависит только от последователей, поэтому при изменении d[i] меняется
+    лишь у i и его предков. LS = T - q, LF = LS + d, где T — длительность проекта.
+    """
+
+    def __init__(self, engine, d):
+        self.engine = engine
+        self.version = engine.version
+        self.d = np.array(d, dtype=float)
+        duration, self.es, self.ef, ls, _ = engine.passes(self.d)
+        self.q = duration - ls
+        self.touched = 0      # сколько работ пересчитано последним set_duration
+
+    @property
+    def valid(self):
+        """Структура сети не менялась с момента создания."""
+        return self.engine.compiled and self.engine.version == self.version
+
+    @property
+    def duration(self):
+        return float(self.ef.max()) if len(self.ef) else 0.0
+
+    def set_duration(self, i, value):
+        """Изменить длительность работы с индексом i и пересчитать затронутые конусы."""
+        eng = self.engine
+        es, ef, q, d = self.es, self.ef, self.q, self.d
+        d[i] = value
+        touched = 1
+
+        # Вниз по сети: ES/EF, очередь по топологической позиции
+        ef[i] = es[i] + value
+        heap = [(eng.pos[w], w) for w in eng.succs[i]]
+        heapq.heapify(heap)
+        queued = set(eng.succs[i])
+        while heap:
+            _, v = heapq.heappop(heap)
+            queued.discard(v)
+            new_es = max(ef[p] for p in eng.preds[v])
+            if new_es == es[v]:
+                continue
+            touched += 1
+            es[v] = new_es
+            ef[v] = new_es + d[v]
+            for w in eng.succs[v]:
+                if w not in queued:
+                    queued.add(w)
+                    heapq.heappush(heap, (eng.pos[w], w))
+
+        # Вверх по сети: хвосты q, очередь по убыванию топологической позиции
+        heap = [(-eng.pos[i], i)]
+        queued = {i}
+        while heap:
+            _, v = heapq.heappop(heap)
+            queued.discard(v)
+            new_q = d[v] + max((q[w] for w in eng.succs[v]), default=0.0)
+            if new_q == q[v] and v != i:
+                continue
+            if v != i:
+                touched += 1
+            q[v] = new_q
+            for p in eng.preds[v]:
+                if p not in queued:
+                    queued.add(p)
+                    heapq.heappush(heap, (-eng.pos[p], p))
+        self.touched = touched
+
+    def result(self):
+        """(длительность, ES, EF, LS, LF) — массивы по индексам работ."""
+        duration = self.duration
+        ls = duration - self.q
+        return duration, self.es.copy(), self.ef.copy(), ls, ls + self.d
+
+    def critical(self):
+        """Индексы критических работ (нулевой полный резерв)."""
+        return np.flatnonzero(np.abs(self.es + self.q - self.duration) < 1e-6)
+
+    def as_path(self):
+        return self.engine.as_path(*self.result())
+
+    def bypass(self):
+        """Для каждой работы — длина самого длинного пути, не проходящего через неё."""
+        eng = self.engine
+        n = len(self.d)
+        pos = np.array(eng.pos, dtype=np.int64)
+        # Связи u → w, «перепрыгивающие» позиции строго между u и w
+        u = np.repeat(np.arange(n), np.diff(eng.succ_ptr))
+        w = eng.succ_idx
+        best = cover_max(n, pos[u] + 1, pos[w], self.ef[u] + self.q[w])
+
+        # Пути целиком до позиции v (заканчиваются в конечной работе) и целиком после неё
+        ends = np.full(n, -np.inf)
+        ends[pos[eng.sinks]] = self.ef[eng.sinks]
+        sources = np.flatnonzero(eng.pred_ptr[1:] == eng.pred_ptr[:-1])
+        starts = np.full(n, -np.inf)
+        starts[pos[sources]] = self.q[sources]
+        before = np.concatenate([[-np.inf], np.maximum.accumulate(ends)[:-1]])
+        after = np.concatenate([np.maximum.accumulate(starts[::-1])[::-1][1:], [-np.inf]])
+        best = np.maximum(best, np.maximum(before, after))
+        return np.maximum(best, 0.0)[pos]
+
+    def what_if(self, delta):
+        """
+        Срок проекта после изменения длительности каждой работы на +delta и на -delta
+        (не ниже нуля), сразу для всех работ. Возвращает словарь массивов по индексам работ:
+        "plus", "minus", "float" — полный резерв (на сколько работу можно удлинить без сдвига
+        срока), "gain" — на сколько её сокращение (вплоть до нуля) может уменьшить срок проекта.
+        """
+        T = self.duration
+        through = self.es + self.q
+        bypass = self.bypass()
+        cut = np.minimum(delta, self.d)
+        return {
+            "plus": np.maximum(T, through + delta),
+            "minus": np.maximum(bypass, through - cut),
+            "float": T - through,
+            "gain": np.clip(np.minimum(through, T) - bypass, 0.0, self.d),
+        }
+
+
+def merge(a, b):
+    """Слияние персистентных левацких куч (ключ, элемент, левая, правая, ранг) без изменения исходных."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    if b[0] < a[0]:
+        a, b = b, a
+    key, item, left, right, _ = a
+    right = merge(right, b)
+    if left is None or left[4] < right[4]:
+        left, right = right, left
+    return (key, item, left, right, (right[4] if right is not None else 0) + 1)
+
+
+class LongestPaths:
+    """
+    Пути от начальных работ к конечным по убыванию длины (сумма d по работам пути).
+    Итерация лениво выдаёт (длина, [индексы работ]); take(k) — первые k путей.
+    """
+
+    def __init__(self, engine, d):
+        self.engine = engine
+        n = len(engine.names)
+        self.duration, _, _, ls, lf = engine.passes(np.asarray(d, dtype=float))
+        # Последователи каждой работы по возрастанию LS: первый — лучший, остальные — отклонения.
+        # Работа n — фиктивное начало, её «последователи» — начальные работы.
+        src = np.repeat(np.arange(n), np.diff(engine.succ_ptr))
+        dst = engine.succ_idx
+        order = np.lexsort((dst, ls[dst], src))
+        starts = np.flatnonzero(engine.pred_ptr[1:] == engine.pred_ptr[:-1])
+        starts = starts[np.lexsort((starts, ls[starts]))]
+        self.n = n
+        self.next = np.concatenate([dst[order], starts]).tolist()
+        self.src = np.concatenate([src[order], np.full(len(starts), n)]).tolist()
+        self.delta = np.maximum(np.concatenate([(ls[dst] - lf[src])[order], ls[starts]]), 0.0).tolist()
+        self.ptr = np.append(engine.succ_ptr, engine.succ_ptr[-1] + len(starts)).tolist()
+        self.heaps = {}
+
+    def best(self, v):
+        """Лучший последователь v или -1 у конечной работы."""
+        return self.next[self.ptr[v]] if self.ptr[v] < self.ptr[v + 1] else -1
+
+    def heap(self, v):
+        """
+        Куча H(v) работ на лучшей цепочке от v, у которых есть отклонения, по цене первого
+        отклонения. Строится лениво: до первой уже построенной кучи на цепочке.
+        """
+        chain = []
+        while v >= 0 and v not in self.heaps:
+            chain.append(v)
+            v = self.best(v)
+        h = self.heaps[v] if v >= 0 else None
+        ptr, delta = self.ptr, self.delta
+        for x in reversed(chain):
+            if ptr[x + 1] - ptr[x] >= 2:
+                h = merge(h, (delta[ptr[x] + 1], x, None, None, 1))
+            self.heaps[x] = h
+        return h
+
+    def path(self, seq):
+        """Работы пути по цепочке отклонений seq = (предыдущие, связь) от фиктивного начала."""
+        edges = []
+        while seq is not None:
+            seq, e = seq
+            edges.append(e)
+        nodes = []
+        v = self.n
+        for e in reversed(edges):
+            while v != self.src[e]:
+                v = self.best(v)
+                nodes.append(v)
+            v = self.next[e]
+            nodes.append(v)
+        v = self.best(v)
+        while v >= 0:
+            nodes.append(v)
+            v = self.best(v)
+        return nodes
+
+    def __iter__(self):
+        if not self.n:
+            return
+        T = self.duration
+        ptr, delta, nxt = self.ptr, self.delta, self.next
+        yield T, self.path(None)
+        # Состояние очереди: (потеря длины, №, узел кучи работы x, связь-отклонение e из x, предыдущие)
+        counter = itertools.count()
+        queue = []
+        root = self.heap(self.n)
+        if root is not None:
+            queue.append((root[0], next(counter), root, ptr[root[1]] + 1, None))
+        while queue:
+            cost, _, h, e, prefix = heapq.heappop(queue)
+            seq = (prefix, e)
+            yield T - cost, self.path(seq)
+            x = h[1]
+            # Следующее по цене отклонение из той же работы
+            if e + 1 < ptr[x + 1]:
+                heapq.heappush(queue, (cost - delta[e] + delta[e + 1], next(counter), h, e + 1, prefix))
+            # Дети в куче — только от первого отклонения работы, иначе пути повторялись бы
+            if e == ptr[x] + 1:
+                for c in h[2:4]:
+                    if c is not None:
+                        heapq.heappush(queue, (cost - delta[e] + c[0], next(counter), c, ptr[c[1]] + 1, prefix))
+            # Ещё одно отклонение дальше по пути
+            g = self.heap(nxt[e])
+            if g is not None:
+                heapq.heappush(queue, (cost + g[0], next(counter), g, ptr[g[1]] + 1, seq))
+
+    def take(self, k):
+        return list(itertools.islice(self, k))
+
+
+def format_paths(names, paths, duration):
+    """Строки «№. длина, резерв: A → B → C» для путей из LongestPaths."""
+    lines = []
+    for i, (length, nodes) in enumerate(paths, 1):
+        lines.append(f"{i:>3}. {length:.2f} дней, резерв {duration - length:.2f}: "
+                     + " → ".join(names[v] for v in nodes))
+    return "\n".join(lines)
@@ -0,0 +1,329 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+from itertools import repeat
+import numpy as np
+
+from cpm import CPMEngine, EXTRA_FIELDS, LongestPaths, format_paths
+
+# Пакетная загрузка больших сетей (до ~10⁶ работ) для CPMEngine.
+#
+# Форматы:
+#   .json  — как в contcut/itercut: {"activities": [...], "data": {работа: {...}}};
+#   .jsonl — по работе на строку: {"name": ..., "predecessors": [...], "duration": ..., ...};
+#   .csv   — строка на работу: name, duration, crash_duration, cost_normal, cost_crash
+#            и необязательные predecessors (через ";"), поля трёхточечной оценки и
+#            resources ("crew=2;crane=1"); связи можно дать отдельным CSV-списком рёбер (from, to).
+# Мощности ресурсов задаются в JSON ключом верхнего уровня "resources": {ресурс: единиц}.
+# Имена работ переводятся в целые номера, числовые поля собираются в столбцы и проверяются
+# векторно, связи хранятся массивами src/dst. Топологический порядок и проверку на цикл
+# даёт один векторный проход Кана в CPMEngine.compile_edges — без словарей работ
+# и без графа networkx.
+
+COLUMNS = ("duration", "crash_duration", "cost_normal", "cost_crash")
+FORMATS = ("json", "jsonl", "csv")
+
+
+class BulkNetwork:
+    """
+    Сеть в столбцах: names — имена по номерам, columns — {поле: массив float},
+    src/dst — связи предшественник → работа (номера), extra — необязательные поля EXTRA_FIELDS
+    ({поле: список значений или None}), dropped — число ссылок на неизвестные работы,
+    capacities — мощности ресурсов {ресурс: единиц}.
+    """
+
+    def __init__(self, names, index, columns, src, dst, extra=None, dropped=0, capacities=None):
+        self.names = names
+        self.index = index
+        self.columns = columns
+        self.src = src
+        self.dst = dst
+        self.extra = extra or {}
+        self.dropped = dropped
+        self.capacities = capacities or {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def engine(self, engine=None):
+        """Скомпилировать сеть в CPMEngine (новый или переданный). Цикл — CycleError."""
+        engine = engine or CPMEngine()
+        engine.compile_edges(self.names, self.src, self.dst, self.index)
+        return engine
+
+    def durations(self):
+        """Вектор нормальных длительностей в порядке names (= порядок работ в engine())."""
+        return self.columns["duration"]
+
+    def predecessors(self):
+        """Списки имён предшественников по работам."""
+        by_dst = np.argsort(self.dst, kind="stable")
+        ptr = np.concatenate([[0], np.cumsum(np.bincount(self.dst, minlength=len(self.names)))])
+        names = self.names
+        src = self.src[by_dst].tolist()
+        return [[names[p] for p in src[ptr[v]:ptr[v + 1]]] for v in range(len(names))]
+
+    def to_data(self):
+        """(activities, data) в формате contcut/itercut — для окон, работающих со словарями."""
+        cols = {k: v.tolist() for k, v in self.columns.items()}
+        preds = self.predecessors()
+        data = {}
+        for v, act in enumerate(self.names):
+            dur, crash_dur = cols["duration"][v], cols["crash_duration"][v]
+            cost_n, cost_c = cols["cost_normal"][v], cols["cost_crash"][v]
+            crash_days = dur - crash_dur
+            data[act] = {
+                'predecessors': preds[v],
+                'duration': dur,
+                'crash_duration': crash_dur,
+                'cost_normal': cost_n,
+                'cost_crash': cost_c,
+                'max_crash_days': crash_days,
+                'slope': (cost_c - cost_n) / crash_days if crash_days > 0 else float('inf'),
+            }
+            for k, values in self.extra.items():
+                if values[v] is not None:
+                    data[act][k] = values[v]
+        return list(self.names), data
+
+
+def intern(names):
+    """Имена -> {имя: номер}; повтор имени — ValueError."""
+    index = {a: i for i, a in enumerate(names)}
+    if len(index) < len(names):
+        seen = set()
+        dup = next(a for a in names if a in seen or seen.add(a))
+        raise ValueError(f"Работа {dup} описана дважды")
+    return index
+
+
+def column(names, key, values):
+    """Столбец float; при пропуске или нечисловом значении — ValueError с именем работы."""
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        for a, x in zip(names, values):
+            try:
+                float(x)
+            except (TypeError, ValueError):
+                raise ValueError(f"Для работы {a}: некорректное значение {key}: {x!r}") from None
+        raise
+
+
+def validate(names, columns, strict=False):
+    """
+    Проверка столбцов целиком: конечные неотрицательные значения, crash_duration ≤ duration
+    (при strict — строго меньше, как при вводе в окнах). Ошибка называет первую работу-нарушителя.
+    """
+    def fail(mask, message):
+        bad = np.flatnonzero(mask)
+        if len(bad):
+            raise ValueError(f"Для работы {names[bad[0]]}: {message}" +
+                             (f" (и ещё {len(bad) - 1})" if len(bad) > 1 else ""))
+
+    for key, col in columns.items():
+        fail(~np.isfinite(col), f"{key} не задано или не конечно")
+        fail(col < 0, f"{key} отрицательно")
+    dur, crash = columns["duration"], columns["crash_duration"]
+    if strict:
+        fail(crash >= dur, "crash_duration должен быть меньше duration")
+    else:
+        fail(crash > dur, "crash_duration больше duration")
+
+
+def edges(index, pred_names, dst):
+    """Имена предшественников и номера работ -> (src, dst, число неизвестных имён)."""
+    src = np.fromiter(map(index.get, pred_names, repeat(-1)), dtype=np.int64, count=len(pred_names))
+    dst = np.asarray(dst, dtype=np.int64)
+    known = src >= 0
+    return src[known], dst[known], int(len(src) - known.sum())
+
+
+def from_records(names, records):
+    """Сеть из списка описаний работ (словари с полями COLUMNS, predecessors, EXTRA_FIELDS)."""
+    index = intern(names)
+    columns = {k: column(names, k, [r.get(k) for r in records]) for k in COLUMNS}
+    preds = [r.get('predecessors') or () for r in records]
+    counts = np.fromiter(map(len, preds), dtype=np.int64, count=len(preds))
+    src, dst, dropped = edges(index, [p for ps in preds for p in ps], np.repeat(np.arange(len(names)), counts))
+    extra = {}
+    for k in EXTRA_FIELDS:
+        values = [r.get(k) for r in records]
+        if any(x is not None for x in values):
+            extra[k] = values
+    return BulkNetwork(names, index, columns, src, dst, extra, dropped)
+
+
+def capacities(spec):
+    """Мощности ресурсов: {ресурс: единиц} или строка "crew=5;crane=2" -> {ресурс: float}."""
+    if isinstance(spec, str):
+        pairs = [part.split("=", 1) for part in spec.replace(",", ";").split(";") if part.strip()]
+        if any(len(pair) != 2 for pair in pairs):
+            raise ValueError(f"Некорректная запись ресурсов '{spec}' (нужно: ресурс=количество; ...)")
+        spec = dict(pairs)
+    if not isinstance(spec, dict):
+        raise ValueError("Ресурсы задаются как {ресурс: количество}")
+    try:
+        return {str(k).strip(): float(v) for k, v in spec.items()}
+    except (TypeError, ValueError):
+        raise ValueError(f"Некорректные количества ресурсов: {spec}") from None
+
+
+def modes(spec):
+    """Режимы работы из ячейки CSV "10:100;8:150" -> [[длительность, стоимость], ...]."""
+    try:
+        return [[float(x) for x in part.split(":")] for part in spec.split(";") if part.strip()]
+    except ValueError:
+        raise ValueError(f"Некорректная запись режимов '{spec}' (нужно: длительность:стоимость; ...)") from None
+
+
+def read_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        d = json.load(f)
+    activities = d.get('activities') if isinstance(d, dict) else None
+    data = d.get('data') if isinstance(d, dict) else None
+    if not isinstance(activities, list) or not isinstance(data, dict):
+        raise ValueError("Некорректный формат JSON. Требуются ключи 'activities' (list) и 'data' (dict).")
+    missing = [a for a in activities if not isinstance(data.get(a), dict)]
+    if missing:
+        raise ValueError(f"Нет данных для работы {missing[0]} в 'data'.")
+    net = from_records(list(activities), [data[a] for a in activities])
+    net.capacities = capacities(d.get('resources', {}))
+    return net
+
+
+def read_jsonl(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = [line for line in f if line.strip()]
+    # Все строки разбираются одним вызовом json как массив; при ошибке ищем строку с ней
+    try:
+        records = json.loads("[" + ",".join(lines) + "]")
+    except json.JSONDecodeError:
+        for line_no, line in enumerate(lines, 1):
+            try:
+                json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Строка {line_no} (без учёта пустых): {e}") from None
+        raise
+    names = [r.get('name', r.get('activity')) if isinstance(r, dict) else None for r in records]
+    if None in names:
+        raise ValueError(f"Строка {names.index(None) + 1} (без учёта пустых): нет поля 'name'")
+    return from_records(names, records)
+
+
+def read_table(path):
+    """
+    CSV -> (заголовок, {столбец: список строк}). Файл без кавычек разбирается целиком
+    строковыми split (в разы быстрее построчного csv.reader), иначе — модулем csv.
+    """
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        lines = [line for line in f.read().splitlines() if line]
+    if not lines:
+        return [], {}
+    header = next(csv.reader(lines[:1]))
+    k = len(header)
+    body = lines[1:]
+    if not any('"' in line for line in body) and all(line.count(",") == k - 1 for line in body):
+        flat = ",".join(body).split(",") if body else []
+        return header, {h: flat[i::k] for i, h in enumerate(header)}
+    rows = list(csv.reader(body))
+    bad = next((n for n, r in enumerate(rows, 2) if len(r) != k), None)
+    if bad is not None:
+        raise ValueError(f"{path}, строка {bad}: ожидалось полей: {k}")
+    return header, {h: [r[i] for r in rows] for i, h in enumerate(header)}
+
+
+def read_csv(path, edges_path=None):
+    fields, col = read_table(path)
+    missing = [k for k in ("name",) + COLUMNS if k not in fields]
+    if missing:
+        raise ValueError(f"В CSV нет столбцов: {', '.join(missing)}")
+    names = col["name"]
+    index = intern(names)
+    columns = {k: column(names, k, col[k]) for k in COLUMNS}
+
+    pred_names, dst = [], np.zeros(0, dtype=np.int64)
+    if "predecessors" in col:
+        preds = [[p.strip() for p in cell.split(";") if p.strip()] for cell in col["predecessors"]]
+        counts = np.fromiter(map(len, preds), dtype=np.int64, count=len(preds))
+        pred_names = [p for ps in preds for p in ps]
+        dst = np.repeat(np.arange(len(names)), counts)
+    if edges_path:
+        header, e = read_table(edges_path)
+        if "from" not in header or "to" not in header:
+            raise ValueError("В CSV связей нужны столбцы from и to")
+        frm, to = e["from"], e["to"]
+        to_id = np.fromiter(map(index.get, to, repeat(-1)), dtype=np.int64, count=len(to))
+        keep = np.flatnonzero(to_id >= 0).tolist()
+        pred_names = pred_names + [frm[k] for k in keep]
+        dst = np.concatenate([dst, to_id[keep]])
+    src, dst, dropped = edges(index, pred_names, dst)
+
+    extra = {}
+    for k in EXTRA_FIELDS:
+        if k in col:
+            if k == "distribution":
+                extra[k] = [x or None for x in col[k]]
+            elif k == "resources":
+                extra[k] = [capacities(x) if x else None for x in col[k]]
+            elif k == "modes":
+                extra[k] = [modes(x) if x else None for x in col[k]]
+            else:
+                extra[k] = [float(x) if x else None for x in col[k]]
+    return BulkNetwork(names, index, columns, src, dst, extra, dropped)
+
+
+def load_network(path, edges_path=None, fmt=None, strict=False):
+    """
+    Загрузить сеть из JSON/JSONL/CSV (формат — по расширению, если fmt не задан)
+    и проверить столбцы. Ссылки на несуществующие работы отбрасываются, как в окнах.
+    """
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат '{fmt}' (допустимо: {', '.join(FORMATS)})")
+    if fmt == "csv":
+        net = read_csv(path, edges_path)
+    else:
+        if edges_path:
+            raise ValueError("Отдельный список связей поддерживается только для CSV")
+        net = read_json(path) if fmt == "json" else read_jsonl(path)
+    validate(net.names, net.columns, strict)
+    return net
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетная загрузка большой сети и расчёт КП")
+    parser.add_argument("network", help="файл сети: .json, .jsonl или .csv")
+    parser.add_argument("--edges", help="CSV со связями (from, to) для сети в CSV")
+    parser.add_argument("--format", choices=FORMATS, help="формат, если не по расширению")
+    parser.add_argument("--paths", type=int, default=0, help="вывести k самых длинных путей")
+    args = parser.parse_args(argv)
+
+    t = time.perf_counter()
+    net = load_network(args.network, args.edges, args.format)
+    t_load = time.perf_counter() - t
+    t = time.perf_counter()
+    engine = net.engine()
+    t_compile = time.perf_counter() - t
+    t = time.perf_counter()
+    duration, es, ef, ls, lf = engine.passes(net.durations())
+    t_pass = time.perf_counter() - t
+
+    critical = int(np.count_nonzero(np.abs(ef - lf) < 1e-6))
+    print(f"Работ: {len(net)}, связей: {len(net.src)}, уровней: {len(engine.levels)}"
+          + (f", отброшено ссылок на неизвестные работы: {net.dropped}" if net.dropped else ""))
+    print(f"Длительность проекта: {duration:.2f} дней, критических работ: {critical}")
+    print(f"Загрузка и проверка: {t_load:.2f} с, компиляция (Кан): {t_compile:.2f} с, проходы КП: {t_pass:.2f} с")
+    if args.paths > 0:
+        t = time.perf_counter()
+        paths = LongestPaths(engine, net.durations()).take(args.paths)
+        print(format_paths(engine.names, paths, duration))
+        print(f"Перечисление путей: {time.perf_counter() - t:.2f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,527 @@
+import sys
+import time
+import bisect
+import hashlib
+import argparse
+import numpy as np
+
+from cpm_io import load_network
+
+# Точная оптимизация «время — стоимость» (crashing) линейным программированием.
+#
+# Переменные: t_i — начало работы i, y_i — на сколько её ускорить (0 ≤ y_i ≤ duration - crash_duration).
+# Минимизируем Σ slope_i · y_i при условиях
+#   t_j ≥ t_i + d_i - y_i   для каждой связи i → j,
+#   t_i + d_i - y_i ≤ T     для конечных работ,  t_i ≥ 0.
+# В отличие от жадного выбора одной работы на критическом пути, LP сокращает сразу все
+# параллельные критические пути и даёт минимальную стоимость. Решатель — HiGHS из scipy
+# (импортируется при вызове), матрица ограничений разреженная.
+#
+# Кривая «длительность — стоимость» целиком строится параметрически (Phillips–Dessouky):
+# на каждом шаге минимальный разрез критической подсети даёт набор работ, которые надо
+# ускорить (и ранее ускоренных, которые можно вернуть), так что все критические пути
+# сокращаются одновременно; шаг идёт до следующей точки излома. Кривая кэшируется по
+# хэшу состояния сети, а ответ для любой цели — бинарный поиск по точкам излома.
+#
+# CrashExplorer — пошаговое жадное ускорение из лабораторной работы (itercut.py) без ограничения
+# на число шагов: КП шага — один векторный проход по уровням, а длительности каждого шага хранятся снимками
+# с общими блоками, так что к любому шагу можно вернуться без пересчёта.
+
+
+def min_cost_crash(engine, data, target):
+    """
+    Минимальная по стоимости программа ускорения до длительности target.
+    engine — скомпилированный CPMEngine той же сети. Если target меньше минимально
+    возможной длительности (все работы ускорены до предела), решается задача для неё.
+    Возвращает словарь: feasible, target, duration, min_duration, normal_duration, extra_cost,
+    crash (массив ускорений по индексам работ), durations, status.
+    """
+    from scipy.optimize import linprog
+    from scipy.sparse import coo_matrix
+
+    names = engine.names
+    n = len(names)
+    d = engine.durations(data)
+    limit = np.array([data[a]['duration'] - data[a]['crash_duration'] for a in names])
+    slope = np.array([data[a]['slope'] for a in names])
+    slope = np.where(np.isfinite(slope), slope, 0.0)   # бесконечная цена — значит, ускорять нельзя (limit = 0)
+
+    normal_duration = engine.passes(d)[0]
+    min_duration = engine.passes(d - limit)[0]
+    feasible = target >= min_duration - 1e-9
+    T = max(float(target), min_duration)
+    result = {"feasible": feasible, "target": float(target), "normal_duration": normal_duration,
+              "min_duration": min_duration, "status": ""}
+    if T >= normal_duration - 1e-9:
+        result.update(duration=normal_duration, extra_cost=0.0, crash=np.zeros(n), durations=d.copy())
+        return result
+
+    # Переменные x = [t_0..t_{n-1}, y_0..y_{n-1}], ограничения вида A x ≤ b
+    src = np.repeat(np.arange(n), np.diff(engine.succ_ptr))
+    dst = engine.succ_idx
+    m = len(src)
+    sinks = engine.sinks
+    k = len(sinks)
+    rows = np.concatenate([np.arange(m)] * 3 + [m + np.arange(k)] * 2)
+    cols = np.concatenate([src, dst, n + src, sinks, n + sinks])
+    vals = np.concatenate([np.ones(m), -np.ones(m), -np.ones(m), np.ones(k), -np.ones(k)])
+    A = coo_matrix((vals, (rows, cols)), shape=(m + k, 2 * n)).tocsr()
+    b = np.concatenate([-d[src], T - d[sinks]])
+
+    c = np.concatenate([np.zeros(n), slope])
+    bounds = np.concatenate([np.column_stack([np.zeros(n), np.full(n, np.inf)]),
+                             np.column_stack([np.zeros(n), limit])])
+    res = linprog(c, A_ub=A, b_ub=b, bounds=bounds, method="highs-ds")
+    result["status"] = res.message
+    if not res.success:
+        raise ValueError(f"Решатель не нашёл решение: {res.message}")
+
+    crash = np.clip(res.x[n:], 0.0, limit)
+    crash[crash < 1e-9] = 0.0
+    durations = d - crash
+    result.update(duration=engine.passes(durations)[0], extra_cost=float(slope @ crash),
+                  crash=crash, durations=durations)
+    return result
+
+
+def network_key(engine, data):
+    """Хэш состояния сети: работы, связи, длительности и стоимости."""
+    h = hashlib.sha1()
+    for a in engine.names:
+        info = data[a]
+        h.update(repr((a, info['predecessors'], info['duration'], info['crash_duration'],
+                       info['cost_normal'], info['cost_crash'])).encode('utf-8'))
+    return h.hexdigest()
+
+
+def integer_scale(values, limit, max_denominator=10 ** 4):
+    """
+    Наименьший множитель, переводящий все values в целые (общий знаменатель дробей
+    со знаменателем до max_denominator), если он не больше limit; иначе None.
+    """
+    from fractions import Fraction
+    from math import lcm
+
+    scale = 1
+    for x in np.unique(values):
+        fr = Fraction(float(x)).limit_denominator(max_denominator)
+        if abs(float(fr) - x) > 1e-9 * max(1.0, abs(x)):
+            return None
+        scale = lcm(scale, fr.denominator)
+        if scale > limit:
+            return None
+    return scale
+
+
+def min_cut_with_lower_bounds(n_nodes, u, v, lower, upper, s, t):
+    """
+    Минимальный s-t разрез сети с нижними границами потока на дугах u → v
+    (upper = inf — бесконечная пропускная способность). Сначала ищется допустимый поток
+    (циркуляция через дугу t → s), затем он дополняется до максимального в остаточной сети.
+    Возвращает булев массив «вершина на стороне s» или None, если разрез бесконечен
+    (или допустимого потока нет).
+
+    Потоки считает scipy.sparse.csgraph.maximum_flow, которому нужны целые 32-битные
+    пропускные способности. Цены переводятся в целые точно (общий знаменатель, см.
+    integer_scale), а если это невозможно — с масштабом до 2^28: тогда разрез оптимален
+    с точностью порядка (число дуг) · Σ цен / 2^28.
+    """
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import maximum_flow, breadth_first_order
+
+    # Конечные пропускные способности в сумме не больше 2^28, «бесконечность» — 2^30:
+    # даже после вычитания потока первой фазы бесконечный путь даёт поток больше 2^29
+    INF = 2 ** 30
+    finite = np.isfinite(upper)
+    total = float(upper[finite].sum() + lower.sum())
+    scale = integer_scale(np.concatenate([upper[finite], lower]), 2 ** 28 / max(1.0, total))
+    exact = scale is not None
+    if not exact:
+        scale = 2 ** 28 / max(1.0, total)
+    lo = np.rint(lower * scale).astype(np.int64)
+    cap = np.where(finite, np.rint(np.where(finite, upper, 0.0) * scale).astype(np.int64) - lo, INF)
+
+    def matrix(rows, cols, vals, size):
+        m = csr_matrix((vals, (rows, cols)), shape=(size, size), dtype=np.int64)
+        m.data = np.minimum(m.data, INF)
+        return m
+
+    # Допустимый поток: пропускные способности upper - lower, избытки от нижних границ
+    excess = (np.bincount(v, lo, minlength=n_nodes) - np.bincount(u, lo, minlength=n_nodes)).astype(np.int64)
+    base = matrix(u, v, cap, n_nodes)
+    if np.any(excess > 0):
+        src, dst = n_nodes, n_nodes + 1
+        pos = np.flatnonzero(excess > 0)
+        neg = np.flatnonzero(excess < 0)
+        rows = np.concatenate([u, [t], np.full(len(pos), src), neg])
+        cols = np.concatenate([v, [s], pos, np.full(len(neg), dst)])
+        vals = np.concatenate([cap, [INF], excess[pos], -excess[neg]])
+        res = maximum_flow(matrix(rows, cols, vals, n_nodes + 2).astype(np.int32), src, dst)
+        # при неточном масштабе округление может «недодать» по единице на дугу
+        if res.flow_value < int(excess[pos].sum()) - (0 if exact else len(u)):
+            return None
+        flow = res.flow.tocoo()
+        keep = ((flow.row < n_nodes) & (flow.col < n_nodes)
+                & ~(((flow.row == s) & (flow.col == t)) | ((flow.row == t) & (flow.col == s))))
+        flow = csr_matrix((flow.data[keep].astype(np.int64), (flow.row[keep], flow.col[keep])),
+                          shape=(n_nodes, n_nodes))
+        residual = base - flow
+    else:
+        residual = base
+    residual.data = np.clip(residual.data, 0, INF)
+    residual.eliminate_zeros()
+    residual = residual.astype(np.int32)
+
+    # Максимальный поток от допустимого и разрез — достижимые из s в остаточной сети
+    res = maximum_flow(residual, s, t)
+    if res.flow_value > 2 ** 29:
+        return None
+    left = residual.astype(np.int64) - res.flow.astype(np.int64)
+    left.data = (left.data > 0).astype(np.int8)
+    left.eliminate_zeros()
+    side = np.zeros(n_nodes, dtype=bool)
+    side[breadth_first_order(left, s, directed=True, return_predecessors=False)] = True
+    if side[t]:
+        return None
+    return side
+
+
+class Cancelled(Exception):
+    """Построение кривой прервано: обратный вызов progress вернул True."""
+
+
+class TimeCostCurve:
+    """
+    Кусочно-линейная кривая минимальной стоимости от длительности проекта.
+    durations[k] — длительность проекта в точке излома k (по убыванию), costs[k] — доп. затраты,
+    plans[k] — вектор длительностей работ. Между соседними точками всё меняется линейно.
+    progress(доля) вызывается после каждой точки излома (доля пройденного пути от нормальной
+    длительности к минимальной); если он вернёт True, построение прерывается исключением Cancelled.
+    """
+
+    def __init__(self, engine, data, max_steps=100000, progress=None):
+        self.engine = engine
+        names = engine.names
+        self.normal = engine.durations(data)
+        self.crash = np.array([data[a]['crash_duration'] for a in names])
+        slope = np.array([data[a]['slope'] for a in names])
+        self.slope = np.where(np.isfinite(slope), slope, 0.0)
+        self.durations = []
+        self.costs = []
+        self.plans = []
+        self.steps = 0
+        self._build(max_steps, progress)
+
+    def _critical(self, d):
+        eng = self.engine
+        duration, es, ef, ls, lf = eng.passes(d)
+        crit = np.abs(ls - es) < 1e-9
+        return duration, es, ef, crit
+
+    def _cut(self, d, es, ef, crit, duration):
+        """
+        Минимальный разрез критической подсети: (ускоряемые, удлиняемые) индексы или None,
+        если сократить длительность уже нельзя. Дуга работы: верхняя граница — цена ускорения
+        (бесконечность, если запаса нет), нижняя — цена возврата (slope, если работа уже ускорена);
+        стоимость разреза = Σ верхних прямых дуг − Σ нижних обратных.
+        """
+        eng = self.engine
+        crit_idx = np.flatnonzero(crit)
+        k = len(crit_idx)
+        rank = np.full(len(d), -1)
+        rank[crit_idx] = np.arange(k)
+        node_in = 2 + 2 * rank      # 0 — исток, 1 — сток
+        node_out = node_in + 1
+
+        # Дуги работ
+        can_crash = d[crit_idx] > self.crash[crit_idx] + 1e-9
+        crashed = d[crit_idx] < self.normal[crit_idx] - 1e-9
+        upper = [np.where(can_crash, self.slope[crit_idx], np.inf)]
+        lower = [np.where(crashed, self.slope[crit_idx], 0.0)]
+        us, vs = [node_in[crit_idx]], [node_out[crit_idx]]
+        # Исток → начальные критические работы, конечные → сток
+        first = crit_idx[es[crit_idx] < 1e-9]
+        last = crit_idx[ef[crit_idx] > duration - 1e-9]
+        # Критические связи (предшественник заканчивается ровно к началу последователя)
+        src = np.repeat(np.arange(len(d)), np.diff(eng.succ_ptr))
+        dst = eng.succ_idx
+        tight = crit[src] & crit[dst] & (np.abs(es[dst] - ef[src]) < 1e-9)
+        for a, b in ((np.zeros(len(first), dtype=np.int64), node_in[first]),
+                     (node_out[last], np.ones(len(last), dtype=np.int64)),
+                     (node_out[src[tight]], node_in[dst[tight]])):
+            us.append(a)
+            vs.append(b)
+            upper.append(np.full(len(a), np.inf))
+            lower.append(np.zeros(len(a)))
+        side = min_cut_with_lower_bounds(2 + 2 * k, np.concatenate(us), np.concatenate(vs),
+                                         np.concatenate(lower), np.concatenate(upper), 0, 1)
+        if side is None:
+            return None
+        s_in, s_out = side[node_in[crit_idx]], side[node_out[crit_idx]]
+        return crit_idx[s_in & ~s_out], crit_idx[s_out & ~s_in & crashed]
+
+    def _step_length(self, d, change, duration, limit):
+        """
+        Наибольший шаг δ ≤ limit, при котором длительность проекта убывает ровно на δ.
+        g(δ) = T(d + δ·change) - (duration - δ) выпукла; пока g > 0, переходим к пересечению
+        самого длинного пути при текущем δ с прямой duration - δ (метод Ньютона по путям).
+        """
+        eng = self.engine
+        delta = limit
+        for _ in range(1000):
+            trial = d + delta * change
+            t_dur, es, ef, _, _ = eng.passes(trial)
+            if t_dur <= duration - delta + 1e-9:
+                return delta
+            # восстанавливаем самый длинный путь и считаем его длину и наклон при δ = 0
+            v = int(np.argmax(ef))
+            length, slope = 0.0, 0.0
+            while True:
+                length += d[v]
+                slope += change[v]
+                preds = eng.preds[v]
+                if not preds:
+                    break
+                v = max(preds, key=lambda p: ef[p])
+            if 1 + slope <= 1e-12:
+                return delta
+            delta = min(delta, (duration - length) / (1 + slope))
+            if delta <= 1e-12:
+                return 0.0
+        return delta
+
+    def _build(self, max_steps, progress=None):
+        d = self.normal.copy()
+        cost = 0.0
+        duration, es, ef, crit = self._critical(d)
+        if progress is not None:
+            start = duration
+            span = (start - self.engine.passes(self.crash)[0]) or 1.0
+        self.durations.append(duration)
+        self.costs.append(cost)
+        self.plans.append(d.copy())
+        while self.steps < max_steps:
+            cut = self._cut(d, es, ef, crit, duration)
+            if cut is None:
+                break
+            shorten, lengthen = cut
+            if not len(shorten):
+                break
+            change = np.zeros(len(d))
+            change[shorten] = -1.0
+            change[lengthen] = 1.0
+            rate = float(self.slope[shorten].sum() - self.slope[lengthen].sum())
+            limit = min(np.min(d[shorten] - self.crash[shorten]),
+                        np.min(self.normal[lengthen] - d[lengthen]) if len(lengthen) else np.inf)
+            delta = self._step_length(d, change, duration, limit)
+            if delta <= 1e-12:
+                break
+            d = np.clip(d + delta * change, self.crash, self.normal)
+            cost += rate * delta
+            self.steps += 1
+            duration, es, ef, crit = self._critical(d)
+            self.durations.append(duration)
+            self.costs.append(cost)
+            self.plans.append(d.copy())
+            if progress is not None and progress(min(1.0, (start - duration) / span)):
+                raise Cancelled()
+
+    @property
+    def min_duration(self):
+        return self.durations[-1]
+
+    def plan(self, target):
+        """
+        Доп. затраты и длительности работ для цели target: бинарный поиск по точкам излома
+        и линейная интерполяция внутри отрезка. Формат — как у min_cost_crash.
+        """
+        feasible = target >= self.min_duration - 1e-9
+        T = min(max(float(target), self.min_duration), self.durations[0])
+        # durations убывают: ищем в развёрнутом (возрастающем) списке точку k с durations[k] ≥ T > durations[k + 1]
+        k = len(self.durations) - 1 - bisect.bisect_left(self.durations[::-1], T - 1e-12)
+        if k == len(self.durations) - 1 or self.durations[k] - T < 1e-12:
+            cost, d = self.costs[k], self.plans[k]
+        else:
+            w = (self.durations[k] - T) / (self.durations[k] - self.durations[k + 1])
+            cost = self.costs[k] + w * (self.costs[k + 1] - self.costs[k])
+            d = self.plans[k] + w * (self.plans[k + 1] - self.plans[k])
+        crash = self.normal - d
+        crash[crash < 1e-9] = 0.0
+        return {"feasible": feasible, "target": float(target), "normal_duration": self.durations[0],
+                "min_duration": self.min_duration, "duration": T, "extra_cost": float(cost),
+                "crash": crash, "durations": d.copy(), "status": "кривая"}
+
+
+_curves = {}
+
+
+def cached_curve(engine, data):
+    """Кривая для текущего состояния сети, если она уже построена, иначе None."""
+    return _curves.get(network_key(engine, data))
+
+
+def time_cost_curve(engine, data, cache_size=16, progress=None):
+    """Кривая для текущего состояния сети; повторный вызов без изменений — из кэша."""
+    key = network_key(engine, data)
+    curve = _curves.get(key)
+    if curve is None:
+        curve = TimeCostCurve(engine, data, progress=progress)
+        if len(_curves) >= cache_size:
+            _curves.pop(next(iter(_curves)))
+        _curves[key] = curve
+    return curve
+
+
+class CrashExplorer:
+    """
+    Жадное ускорение по шагам: среди критических работ с запасом выбирается работа с наименьшей
+    ценой дня (при равенстве — с меньшим номером) и ускоряется на step дней или на остаток.
+    Снимок шага — кортеж блоков по BLOCK длительностей: шаг копирует только изменённый блок,
+    остальные общие с предыдущим снимком. history[s] — запись шага s (0 — исходное состояние).
+    """
+
+    BLOCK = 256
+
+    def __init__(self, engine, data, step=1.0):
+        self.engine = engine
+        self.step = step
+        names = engine.names
+        d = engine.durations(data)
+        self.crash = np.array([data[a]['crash_duration'] for a in names], dtype=float)
+        self.slope = np.array([data[a]['slope'] for a in names], dtype=float)
+        self.base = (d.copy(), self.crash.copy(), self.slope.copy())
+        self.version = engine.version
+        self.d = d.copy()          # длительности текущего шага
+        self.crit = None           # критические работы текущего шага; None — пересчитать
+        self.refresh()
+        blocks = tuple(d[i:i + self.BLOCK].copy() for i in range(0, len(d), self.BLOCK))
+        self.history = [{"step": 0, "act": None, "by": 0.0, "slope": 0.0, "duration": self.total,
+                         "cost": float(sum(data[a]['cost_normal'] for a in names)), "blocks": blocks}]
+        self.current = 0
+
+    def matches(self, data):
+        """Снимки ещё относятся к этой сети: структура и исходные длительности/цены не менялись."""
+        eng = self.engine
+        if not (eng.compiled and eng.version == self.version):
+            return False
+        d, crash, slope = self.base
+        return (np.array_equal(eng.durations(data), d)
+                and np.array_equal([data[a]['crash_duration'] for a in eng.names], crash)
+                and np.array_equal([data[a]['slope'] for a in eng.names], slope))
+
+    def durations(self, s=None):
+        """Вектор длительностей шага s (по умолчанию текущего)."""
+        return np.concatenate(self.history[self.current if s is None else s]["blocks"])
+
+    def goto(self, s):
+        """Сделать текущим шаг s; следующий run продолжит с него, отбросив более поздние шаги."""
+        self.current = s
+        self.d = self.durations(s)
+        self.crit = None
+
+    def refresh(self):
+        """Прямой и обратный проходы для текущих длительностей: срок и критические работы."""
+        self.total, es, _, ls, _ = self.engine.passes(self.d)
+        self.crit = np.flatnonzero(np.abs(ls - es) < 1e-6)
+
+    def choose(self):
+        """Следующий ход (работа, на сколько ускорить) или None, если ускорять нечего."""
+        if self.crit is None:
+            self.refresh()
+        d, crit = self.d, self.crit
+        crit = crit[d[crit] - self.crash[crit] > 1e-9]
+        if not len(crit):
+            return None
+        v = int(crit[np.argmin(self.slope[crit])])
+        return v, min(self.step, d[v] - self.crash[v])
+
+    def apply(self, v, by):
+        del self.history[self.current + 1:]
+        self.d[v] -= by
+        self.refresh()
+        prev = self.history[-1]
+        blocks = list(prev["blocks"])
+        b = v // self.BLOCK
+        blocks[b] = blocks[b].copy()
+        blocks[b][v % self.BLOCK] = self.d[v]
+        rec = {"step": prev["step"] + 1, "act": v, "by": by, "slope": float(self.slope[v]),
+               "duration": self.total, "cost": prev["cost"] + by * self.slope[v], "blocks": tuple(blocks)}
+        self.history.append(rec)
+        self.current += 1
+        return rec
+
+    def run(self, steps=None, target=None, budget=None):
+        """
+        Шаги от текущего до первого из условий: сделано steps шагов ("steps"), срок ≤ target
+        ("target"), следующий шаг вывел бы доп. затраты за budget ("budget"), ускорять нечего
+        ("exhausted"). Возвращает причину остановки.
+        """
+        if self.crit is None:
+            self.refresh()
+        del self.history[self.current + 1:]
+        start_cost = self.history[0]["cost"]
+        done = 0
+        while True:
+            if steps is not None and done >= steps:
+                return "steps"
+            if target is not None and self.total <= target + 1e-9:
+                return "target"
+            move = self.choose()
+            if move is None:
+                return "exhausted"
+            v, by = move
+            if budget is not None and self.history[-1]["cost"] + by * self.slope[v] - start_cost > budget + 1e-9:
+                return "budget"
+            self.apply(v, by)
+            done += 1
+
+
+def format_plan(engine, data, result):
+    """Текстовый отчёт: итог и план ускорения по работам."""
+    lines = []
+    if result["feasible"]:
+        lines.append(f"Цель {result['target']:.2f} дней достижима.")
+    else:
+        lines.append(f"Невозможно достичь цели {result['target']:.2f} дней; "
+                     f"минимально возможная длительность {result['min_duration']:.2f} дней.")
+    lines.append(f"Длительность: {result['normal_duration']:.2f} → {result['duration']:.2f} дней")
+    lines.append(f"Дополнительные затраты (минимальные): {result['extra_cost']:.2f} у.е.")
+    crashed = np.flatnonzero(result["crash"] > 0)
+    if len(crashed):
+        lines.append(f"{'Работа':<12} {'Было':>8} {'Стало':>8} {'Ускор.':>8} {'Цена/день':>10} {'Затраты':>10}")
+        for i in crashed:
+            a = engine.names[i]
+            y = result["crash"][i]
+            lines.append(f"{a:<12} {data[a]['duration']:>8.2f} {result['durations'][i]:>8.2f} {y:>8.2f} "
+                         f"{data[a]['slope']:>10.2f} {y * data[a]['slope']:>10.2f}")
+    else:
+        lines.append("Ускорение не требуется.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Точная оптимизация сетевого графика по стоимости (LP)")
+    parser.add_argument("network", help="файл сети: .json, .jsonl или .csv (см. cpm_io)")
+    parser.add_argument("--target", type=float, required=True, help="целевая длительность проекта")
+    parser.add_argument("--curve", action="store_true",
+                        help="ответить по кривой «длительность — стоимость» и вывести её точки излома")
+    args = parser.parse_args(argv)
+
+    net = load_network(args.network)
+    engine = net.engine()
+    activities, data = net.to_data()
+    t = time.perf_counter()
+    if args.curve:
+        curve = time_cost_curve(engine, data)
+        print("Точки излома (длительность: доп. затраты):")
+        print("  " + ", ".join(f"{T:.2f}: {c:.2f}" for T, c in zip(curve.durations, curve.costs)))
+        result = curve.plan(args.target)
+    else:
+        result = min_cost_crash(engine, data, args.target)
+    print(format_plan(engine, data, result))
+    print(f"Работ: {len(activities)}, решено за {time.perf_counter() - t:.2f} с")
+    return 0 if result["feasible"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
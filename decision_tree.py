@@ -0,0 +1,312 @@
+import json
+import sys
+import argparse
+
+# Произвольное дерево решений: узлы решения (decision), случая (chance) и конечные (terminal).
+#
+# Формат JSON (вложенный):
+# {"type": "decision", "name": "Исследование?", "branches": [
+#     {"label": "Проводить", "cost": 50000, "node": {"type": "chance", "branches": [
+#         {"label": "Прогноз +", "p": 0.52, "node": {...}},
+#         {"label": "Прогноз -", "p": 0.48, "ref": "rynok"}]}},
+#     {"label": "Не проводить", "node": {"type": "terminal", "payoff": 357100}}],
+#  "subtrees": {"rynok": {...}}}
+#
+# Для очень глубоких/больших деревьев — плоский формат без вложенности
+# (стандартный json не разбирает вложенность глубже ~1000 уровней):
+# {"root": "n0", "nodes": {"n0": {"type": "decision", "branches": [{"label": "...", "ref": "n1"}]}, ...}}
+#
+# На ветке можно указать "cost" (вычитается из значения поддерева) и у случайного узла — "p".
+
+TERMINAL, CHANCE, DECISION = 0, 1, 2
+NODE_TYPES = {"terminal": TERMINAL, "chance": CHANCE, "decision": DECISION}
+
+
+class DecisionTree:
+    """
+    Дерево решений, интернированное по содержимому: одинаковые поддеревья
+    (тот же тип, имя, выигрыш, ветки и их поддеревья) получают один и тот же id,
+    поэтому при свёртке каждое уникальное поддерево считается ровно один раз.
+    id выдаются в порядке обхода «дети раньше родителя», и свёртка — простой
+    проход по массиву без рекурсии.
+    """
+
+    def __init__(self):
+        self.kind = []        # тип узла по id
+        self.name = []        # имя узла
+        self.payoff = []      # выигрыш конечного узла (0 для остальных)
+        self.branches = []    # [(label, p, cost, child_id), ...]
+        self._index = {}      # ключ содержимого -> id
+        self.root = None
+        self.values = None
+        self.best = None      # индекс лучшей ветки для узлов решения
+        self.total_nodes = 0  # число узлов в развёрнутом дереве (с повторами)
+
+    def __len__(self):
+        return len(self.kind)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    @classmethod
+    def from_dict(cls, obj):
+        tree = cls()
+        table = obj.get("nodes") or obj.get("subtrees") or {}
+        root = table[obj["root"]] if isinstance(obj.get("root"), str) else obj
+        tree.root = tree._intern(root, table)
+        return tree
+
+    def add_node(self, kind, name="", payoff=0.0, branches=()):
+        """
+        Добавляет узел (дети должны быть уже добавлены) и возвращает его id.
+        Если такое же поддерево уже есть — возвращает существующий id.
+        """
+        branches = tuple(branches)
+        key = (kind, name, payoff, branches)
+        node_id = self._index.get(key)
+        if node_id is None:
+            node_id = len(self.kind)
+            self._index[key] = node_id
+            self.kind.append(kind)
+            self.name.append(name)
+            self.payoff.append(payoff)
+            self.branches.append(branches)
+        return node_id
+
+    @staticmethod
+    def _child(branch, table):
+        if "ref" in branch:
+            try:
+                return table[branch["ref"]]
+            except KeyError:
+                raise ValueError(f"Неизвестная ссылка на поддерево: {branch['ref']}")
+        if "node" not in branch:
+            raise ValueError(f"У ветки «{branch.get('label', '')}» нет ни 'node', ни 'ref'")
+        return branch["node"]
+
+    def _intern(self, root, table):
+        # Итеративный обход в глубину: при раскрытии узел возвращается в стек вместе
+        # со списком детей, дети кладутся выше; после них узел собирается из id детей.
+        done = {}        # id(объекта JSON) -> id узла; общие ссылки разбираются один раз
+        counts = {}      # id(объекта JSON) -> размер развёрнутого поддерева
+        open_ = set()
+        stack = [(root, None)]
+        while stack:
+            obj, children = stack.pop()
+            oid = id(obj)
+            if oid in done:
+                continue
+            if children is None:
+                if oid in open_:
+                    raise ValueError(f"Цикл в дереве через узел «{obj.get('name', '')}»")
+                open_.add(oid)
+                children = [self._child(br, table) for br in obj.get("branches", ())]
+                stack.append((obj, children))
+                stack.extend((child, None) for child in children if id(child) not in done)
+                continue
+
+            open_.discard(oid)
+            kind = NODE_TYPES.get(obj.get("type"))
+            if kind is None:
+                raise ValueError(f"Неизвестный тип узла: {obj.get('type')}")
+            name = obj.get("name", "")
+            if kind == TERMINAL:
+                done[oid] = self.add_node(TERMINAL, name, float(obj.get("payoff", 0.0)))
+                counts[oid] = 1
+                continue
+            if not children:
+                raise ValueError(f"У узла «{name}» нет ветвей")
+
+            branches = []
+            size = 1
+            for br, child in zip(obj["branches"], children):
+                cid = id(child)
+                p = float(br.get("p", 0.0)) if kind == CHANCE else 0.0
+                branches.append((br.get("label", ""), p, float(br.get("cost", 0.0)), done[cid]))
+                size += counts[cid]
+            if kind == CHANCE:
+                total_p = sum(b[1] for b in branches)
+                if abs(total_p - 1.0) > 1e-6:
+                    raise ValueError(f"Сумма вероятностей в узле «{name}» равна {total_p}, а не 1")
+            done[oid] = self.add_node(kind, name, 0.0, branches)
+            counts[oid] = size
+
+        self.total_nodes = counts[id(root)]
+        return done[id(root)]
+
+    def rollback(self):
+        """
+        Свёртка дерева (ОДО): конечный узел — выигрыш, случайный — взвешенная сумма,
+        решение — максимум по веткам за вычетом их стоимости. Без рекурсии: дети
+        всегда имеют меньший id, поэтому достаточно одного прохода по id.
+        Возвращает значение корня.
+        """
+        n = len(self.kind)
+        values = [0.0] * n
+        best = [-1] * n
+        for i in range(n):
+            kind = self.kind[i]
+            if kind == TERMINAL:
+                values[i] = self.payoff[i]
+            elif kind == CHANCE:
+                values[i] = sum(p * (values[c] - cost) for _, p, cost, c in self.branches[i])
+            else:
+                best_v, best_j = None, -1
+                for j, (_, _, cost, c) in enumerate(self.branches[i]):
+                    v = values[c] - cost
+                    if best_v is None or v > best_v:
+                        best_v, best_j = v, j
+                values[i] = best_v
+                best[i] = best_j
+        self.values = values
+        self.best = best
+        return values[self.root]
+
+    def policy(self, limit=None):
+        """
+        Оптимальная стратегия (генератор): для каждого достижимого при оптимальном поведении узла
+        решения — (путь из меток веток, имя узла, выбранная ветка, значение узла).
+        Обход итеративный; в стеке хранится ссылка на родительское звено пути, а сам путь
+        собирается только для выдаваемых записей, поэтому память на обход — O(числа узлов).
+        limit ограничивает число записей для огромных деревьев.
+        """
+        if self.values is None:
+            self.rollback()
+        links = []            # звенья путей: (индекс родительского звена или -1, метка ветки)
+
+        def path(link):
+            labels = []
+            while link >= 0:
+                link, label = links[link]
+                labels.append(label)
+            return tuple(reversed(labels))
+
+        emitted = 0
+        stack = [(self.root, -1)]
+        while stack and (limit is None or emitted < limit):
+            i, link = stack.pop()
+            kind = self.kind[i]
+            if kind == DECISION:
+                label, _, _, child = self.branches[i][self.best[i]]
+                yield path(link), self.name[i], label, self.values[i]
+                emitted += 1
+                links.append((link, label))
+                stack.append((child, len(links) - 1))
+            elif kind == CHANCE:
+                for label, _, _, child in reversed(self.branches[i]):
+                    links.append((link, label))
+                    stack.append((child, len(links) - 1))
+
+    def optimal_path(self):
+        """Главный путь: оптимальные решения, а в узлах случая — наиболее вероятный исход."""
+        if self.values is None:
+            self.rollback()
+        path = []
+        i = self.root
+        while self.kind[i] != TERMINAL:
+            if self.kind[i] == DECISION:
+                label, _, _, child = self.branches[i][self.best[i]]
+            else:
+                label, _, _, child = max(self.branches[i], key=lambda b: b[1])
+            path.append((self.name[i], label, self.values[i]))
+            i = child
+        path.append((self.name[i], "", self.values[i]))
+        return path
+
+
+NODE_MARKERS = {DECISION: "s", CHANCE: "o", TERMINAL: "^"}
+NODE_COLORS = {DECISION: "lightblue", CHANCE: "lightyellow", TERMINAL: "lightgreen"}
+
+
+def render(tree, path, min_prob=1e-3, max_nodes=10000, label_limit=300):
+    """
+    Рисует развёрнутое дерево в файл (PNG/SVG/PDF — по расширению).
+    Разворачивание идёт в ширину от корня; ветки с вероятностью пути ниже min_prob
+    и всё, что не вошло в max_nodes узлов, сворачиваются — такой узел рисуется серым
+    с числом скрытых веток. Раскладка — tree_layout.tidy_layout (O(n)), отрисовка
+    пакетная, подписи — только если узлов не больше label_limit.
+    Возвращает (число нарисованных узлов, число свёрнутых).
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from collections import deque
+    from tree_layout import tidy_layout, draw_batched
+
+    if tree.values is None:
+        tree.rollback()
+
+    node_id = [tree.root]       # id узла DecisionTree для каждого нарисованного узла
+    children = [[]]
+    hidden = [0]
+    edges, edge_colors, edge_labels = [], [], {}
+    queue = deque([(0, 1.0)])
+    while queue:
+        v, prob = queue.popleft()
+        i = node_id[v]
+        for j, (label, p, _, c) in enumerate(tree.branches[i]):
+            child_prob = prob * p if tree.kind[i] == CHANCE else prob
+            if child_prob < min_prob or len(node_id) >= max_nodes:
+                hidden[v] += 1
+                continue
+            w = len(node_id)
+            node_id.append(c)
+            children.append([])
+            hidden.append(0)
+            children[v].append(w)
+            edges.append((v, w))
+            optimal = tree.kind[i] == DECISION and j == tree.best[i]
+            edge_colors.append("red" if optimal else "gray")
+            edge_labels[(v, w)] = f"{label} ({p:g})" if tree.kind[i] == CHANCE else label
+            queue.append((w, child_prob))
+
+    breadth, depth = tidy_layout(children)
+    pos = {v: (depth[v] * 3.0, -breadth[v] * 2.0) for v in range(len(node_id))}
+    kinds = [tree.kind[i] for i in node_id]
+    labels = {v: f"{tree.name[i]}\n{tree.values[i]:g}" + (f"\n(+{hidden[v]} скрыто)" if hidden[v] else "")
+              for v, i in enumerate(node_id)}
+
+    width = max(12.0, 2.0 * (max(depth) + 1))
+    height = max(8.0, min(200.0, 1.2 * (max(breadth) - min(breadth) + 1)))
+    fig, ax = plt.subplots(figsize=(width, height))
+    draw_batched(ax, pos, edges, edge_colors=edge_colors,
+                 node_colors={v: "lightgray" if hidden[v] else NODE_COLORS[k] for v, k in enumerate(kinds)},
+                 node_markers={v: NODE_MARKERS[k] for v, k in enumerate(kinds)},
+                 labels=labels, edge_labels=edge_labels, label_limit=label_limit)
+    ax.set_title(f"Дерево решений: ОДО корня {tree.values[tree.root]:g}, "
+                 f"показано {len(node_id)} из {tree.total_nodes} узлов")
+    fig.tight_layout()
+    fig.savefig(path, dpi=100)
+    plt.close(fig)
+    return len(node_id), sum(1 for h in hidden if h)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Свёртка произвольного дерева решений из JSON")
+    parser.add_argument("tree_file", help="JSON с деревом (вложенный или плоский формат)")
+    parser.add_argument("--limit", type=int, default=50, help="сколько узлов решения стратегии вывести")
+    parser.add_argument("--render", metavar="FILE", help="нарисовать дерево в файл (PNG/SVG/PDF)")
+    parser.add_argument("--min-prob", type=float, default=1e-3, help="сворачивать ветки с вероятностью пути ниже")
+    parser.add_argument("--max-nodes", type=int, default=10000, help="предел числа рисуемых узлов")
+    args = parser.parse_args(argv)
+
+    tree = DecisionTree.load(args.tree_file)
+    value = tree.rollback()
+    print(f"Узлов в дереве: {tree.total_nodes}, уникальных поддеревьев: {len(tree)}")
+    print(f"ОДО корня: {value}")
+    print("Главный путь: " + " → ".join(f"{name or '•'} [{label}]" if label else f"{name or '•'} = {v}"
+                                       for name, label, v in tree.optimal_path()))
+    print("Оптимальная стратегия:")
+    for path, name, label, v in tree.policy(limit=args.limit):
+        where = " / ".join(path) if path else "(корень)"
+        print(f"  {where}: {name or 'решение'} → {label} (ОДО {v})")
+    if args.render:
+        shown, collapsed = render(tree, args.render, args.min_prob, args.max_nodes)
+        print(f"Рисунок сохранён: {args.render} (узлов {shown}, свёрнуто {collapsed})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+import tkinter as tk
+from tkinter import ttk
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+import argparse
+import json
+import math
+import sys
+
+# Палитра для отдельных работ (при крупном масштабе)
+PALETTE = ["#4e79a7", "#f28e2b", "#e15759", "#76b7b2", "#59a14f",
+           "#edc948", "#b07aa1", "#ff9da7", "#9c755f", "#bab0ac"]
+AGG_COLOR = (0x4e, 0x79, 0xa7)  # цвет агрегированных столбцов, яркость = загрузка
+
+
+class GanttLane:
+    """
+    Дорожка (машина) диаграммы: непересекающиеся интервалы, отсортированные по началу.
+    Хранит префиксные суммы занятости, поэтому загрузка любого окна [t0, t1)
+    считается за O(log n) — на этом строится агрегирование при мелком масштабе.
+    """
+
+    def __init__(self, name, starts, ends, labels):
+        self.name = name
+        self.starts = list(starts)
+        self.ends = list(ends)
+        self.labels = list(labels)
+        # cum[i] — суммарная занятость интервалов 0..i-1
+        self.cum = [0.0] + list(accumulate(e - s for s, e in zip(self.starts, self.ends)))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def busy_before(self, t):
+        """Занятое время на отрезке (-inf, t)."""
+        k = bisect_right(self.starts, t) - 1
+        if k < 0:
+            return 0.0
+        return self.cum[k] + max(0.0, min(t, self.ends[k]) - self.starts[k])
+
+    def visible(self, t0, t1):
+        """Диапазон индексов интервалов, пересекающих окно [t0, t1] (отсечение по области просмотра)."""
+        lo = bisect_right(self.ends, t0)
+        hi = bisect_left(self.starts, t1)
+        return lo, max(lo, hi)
+
+    def items(self, t0, t1, pixels, min_px=3.0):
+        """
+        Что рисовать в окне [t0, t1] шириной pixels:
+        ('bar', start, end, label) для отдельных работ, если их мало на пиксель,
+        иначе ('agg', b0, b1, загрузка 0..1) по столбцам шириной min_px пикселей.
+        """
+        lo, hi = self.visible(t0, t1)
+        if hi == lo:
+            return []
+        if (hi - lo) * min_px <= pixels:
+            return [("bar", self.starts[i], self.ends[i], self.labels[i]) for i in range(lo, hi)]
+
+        bins = max(1, int(pixels / min_px))
+        width = (t1 - t0) / bins
+        out = []
+        prev = self.busy_before(t0)
+        for b in range(bins):
+            b0 = t0 + b * width
+            b1 = b0 + width
+            cur = self.busy_before(b1)
+            load = (cur - prev) / width if width > 0 else 0.0
+            prev = cur
+            if load > 1e-9:
+                out.append(("agg", b0, b1, min(1.0, load)))
+        return out
+
+
+def lanes_from_details(details, m1_name="Машина 1", m2_name="Машина 2"):
+    """Дорожки М1/М2 из деталей расписания Джонсона (simulate_schedule / IncrementalJohnson.details)."""
+    return [
+        GanttLane(m1_name, [d["m1_start"] for d in details], [d["m1_end"] for d in details],
+                  [d["job"] for d in details]),
+        GanttLane(m2_name, [d["m2_start"] for d in details], [d["m2_end"] for d in details],
+                  [d["job"] for d in details]),
+    ]
+
+
+def span_of(lanes):
+    ends = [lane.ends[-1] for lane in lanes if len(lane)]
+    return max(ends) if ends else 0.0
+
+
+def nice_step(span, target_ticks=10):
+    """Шаг делений оси времени вида 1/2/5·10^k."""
+    if span <= 0:
+        return 1.0
+    raw = span / target_ticks
+    base = 10 ** math.floor(math.log10(raw))
+    for m in (1, 2, 5, 10):
+        if raw <= m * base:
+            return m * base
+    return 10 * base
+
+
+def agg_color(load):
+    """Цвет агрегированного столбца: от светлого (малая загрузка) к насыщенному."""
+    r, g, b = AGG_COLOR
+    mix = 0.25 + 0.75 * load
+    return "#%02x%02x%02x" % (int(255 - (255 - r) * mix), int(255 - (255 - g) * mix), int(255 - (255 - b) * mix))
+
+
+def job_color(label):
+    return PALETTE[sum(map(ord, str(label))) % len(PALETTE)]
+
+
+class GanttCanvas(ttk.Frame):
+    """
+    Диаграмма Ганта на tk.Canvas: колесо мыши — масштаб вокруг курсора,
+    перетаскивание — сдвиг. Рисуется только видимое окно, а при мелком масштабе
+    работы агрегируются по пикселям, поэтому перерисовка не зависит от числа работ.
+    """
+
+    LANE_HEIGHT = 36
+    LANE_GAP = 14
+    LEFT = 90
+    TOP = 10
+    AXIS = 24
+
+    def __init__(self, master, height=150, **kw):
+        super().__init__(master, **kw)
+        self.canvas = tk.Canvas(self, height=height, background="white", highlightthickness=0)
+        self.canvas.pack(fill="both", expand=True)
+        self.lanes = []
+        self.t0, self.t1 = 0.0, 1.0
+        self._drag_x = None
+        self._pending = False
+
+        self.canvas.bind("<Configure>", lambda e: self.redraw())
+        self.canvas.bind("<MouseWheel>", self._on_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self._zoom(e.x, 0.8))
+        self.canvas.bind("<Button-5>", lambda e: self._zoom(e.x, 1.25))
+        self.canvas.bind("<ButtonPress-1>", self._on_press)
+        self.canvas.bind("<B1-Motion>", self._on_drag)
+        self.canvas.bind("<Double-1>", lambda e: self.reset_view())
+
+    def set_lanes(self, lanes):
+        self.lanes = lanes
+        self.reset_view()
+
+    def reset_view(self):
+        self.t0, self.t1 = 0.0, max(span_of(self.lanes), 1.0)
+        self.redraw()
+
+    def _plot_width(self):
+        return max(1, self.canvas.winfo_width() - self.LEFT - 10)
+
+    def _x(self, t, width):
+        return self.LEFT + (t - self.t0) / (self.t1 - self.t0) * width
+
+    def _on_wheel(self, event):
+        self._zoom(event.x, 0.8 if event.delta > 0 else 1.25)
+
+    def _zoom(self, x, factor):
+        width = self._plot_width()
+        frac = min(max((x - self.LEFT) / width, 0.0), 1.0)
+        center = self.t0 + frac * (self.t1 - self.t0)
+        span = max((self.t1 - self.t0) * factor, 1e-6)
+        self.t0 = center - frac * span
+        self.t1 = self.t0 + span
+        self.redraw()
+
+    def _on_press(self, event):
+        self._drag_x = event.x
+
+    def _on_drag(self, event):
+        if self._drag_x is None:
+            return
+        dt = (event.x - self._drag_x) / self._plot_width() * (self.t1 - self.t0)
+        self._drag_x = event.x
+        self.t0 -= dt
+        self.t1 -= dt
+        self.redraw()
+
+    def redraw(self):
+        # Склеиваем серию событий (колесо, перетаскивание) в одну перерисовку
+        if not self._pending:
+            self._pending = True
+            self.after_idle(self._draw)
+
+    def _draw(self):
+        self._pending = False
+        c = self.canvas
+        c.delete("all")
+        width = self._plot_width()
+
+        for i, lane in enumerate(self.lanes):
+            y0 = self.TOP + i * (self.LANE_HEIGHT + self.LANE_GAP)
+            y1 = y0 + self.LANE_HEIGHT
+            c.create_text(self.LEFT - 8, (y0 + y1) / 2, text=lane.name, anchor="e", font=("Arial", 9, "bold"))
+            c.create_rectangle(self.LEFT, y0, self.LEFT + width, y1, outline="#dddddd")
+            for kind, a, b, extra in lane.items(self.t0, self.t1, width):
+                xa = max(self._x(a, width), self.LEFT)
+                xb = min(self._x(b, width), self.LEFT + width)
+                if kind == "bar":
+                    c.create_rectangle(xa, y0 + 3, xb, y1 - 3, fill=job_color(extra), outline="black")
+                    if xb - xa > 7 * len(str(extra)):
+                        c.create_text((xa + xb) / 2, (y0 + y1) / 2, text=str(extra), font=("Arial", 8))
+                else:
+                    c.create_rectangle(xa, y0 + 3, xb, y1 - 3, fill=agg_color(extra), width=0)
+
+        # Ось времени
+        y_axis = self.TOP + len(self.lanes) * (self.LANE_HEIGHT + self.LANE_GAP)
+        c.create_line(self.LEFT, y_axis, self.LEFT + width, y_axis)
+        step = nice_step(self.t1 - self.t0)
+        t = math.ceil(self.t0 / step) * step
+        while t <= self.t1:
+            x = self._x(t, width)
+            c.create_line(x, y_axis, x, y_axis + 4)
+            c.create_text(x, y_axis + 6, text=f"{t:g}", anchor="n", font=("Arial", 8))
+            t += step
+
+
+def export_svg(lanes, path, width=1600, t0=None, t1=None):
+    """Экспорт диаграммы в SVG без дисплея (с тем же агрегированием, что и на экране)."""
+    t0 = 0.0 if t0 is None else t0
+    t1 = max(span_of(lanes), 1.0) if t1 is None else t1
+    left, top, lane_h, gap, axis = 90, 10, 36, 14, 30
+    plot_w = width - left - 10
+    height = top + len(lanes) * (lane_h + gap) + axis
+
+    def x(t):
+        return left + (t - t0) / (t1 - t0) * plot_w
+
+    def esc(text):
+        return str(text).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'font-family="Arial" font-size="9">',
+             f'<rect width="{width}" height="{height}" fill="white"/>']
+    for i, lane in enumerate(lanes):
+        y0 = top + i * (lane_h + gap)
+        parts.append(f'<text x="{left - 8}" y="{y0 + lane_h / 2 + 3}" text-anchor="end" '
+                     f'font-weight="bold">{esc(lane.name)}</text>')
+        parts.append(f'<rect x="{left}" y="{y0}" width="{plot_w}" height="{lane_h}" fill="none" stroke="#dddddd"/>')
+        for kind, a, b, extra in lane.items(t0, t1, plot_w):
+            xa, xb = max(x(a), left), min(x(b), left + plot_w)
+            if kind == "bar":
+                parts.append(f'<rect x="{xa:.2f}" y="{y0 + 3}" width="{xb - xa:.2f}" height="{lane_h - 6}" '
+                             f'fill="{job_color(extra)}" stroke="black" stroke-width="0.5"/>')
+                if xb - xa > 7 * len(str(extra)):
+                    parts.append(f'<text x="{(xa + xb) / 2:.2f}" y="{y0 + lane_h / 2 + 3}" '
+                                 f'text-anchor="middle">{esc(extra)}</text>')
+            else:
+                parts.append(f'<rect x="{xa:.2f}" y="{y0 + 3}" width="{xb - xa:.2f}" height="{lane_h - 6}" '
+                             f'fill="{agg_color(extra)}"/>')
+
+    y_axis = top + len(lanes) * (lane_h + gap)
+    parts.append(f'<line x1="{left}" y1="{y_axis}" x2="{left + plot_w}" y2="{y_axis}" stroke="black"/>')
+    step = nice_step(t1 - t0)
+    t = math.ceil(t0 / step) * step
+    while t <= t1:
+        parts.append(f'<line x1="{x(t):.2f}" y1="{y_axis}" x2="{x(t):.2f}" y2="{y_axis + 4}" stroke="black"/>')
+        parts.append(f'<text x="{x(t):.2f}" y="{y_axis + 15}" text-anchor="middle">{t:g}</text>')
+        t += step
+    parts.append("</svg>")
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(parts))
+
+
+def export_png(lanes, path, width=1600, dpi=100):
+    """Экспорт в PNG через backend Agg (дисплей не нужен). Работы агрегируются так же, как на экране."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    t0, t1 = 0.0, max(span_of(lanes), 1.0)
+    plot_px = int(width * 0.85)
+    fig, ax = plt.subplots(figsize=(width / dpi, 0.6 * len(lanes) + 1), dpi=dpi)
+    for i, lane in enumerate(lanes):
+        y = len(lanes) - 1 - i
+        bars, colors = [], []
+        for kind, a, b, extra in lane.items(t0, t1, plot_px):
+            bars.append((a, b - a))
+            colors.append(job_color(extra) if kind == "bar" else agg_color(extra))
+        ax.broken_barh(bars, (y - 0.4, 0.8), facecolors=colors)
+    ax.set_yticks(range(len(lanes)))
+    ax.set_yticklabels([lane.name for lane in reversed(lanes)])
+    ax.set_xlim(t0, t1)
+    ax.set_xlabel("Время")
+    fig.tight_layout()
+    fig.savefig(path, dpi=dpi)
+    plt.close(fig)
+
+
+def export(lanes, path, width=1600):
+    """Экспорт по расширению файла: .svg или .png."""
+    if path.lower().endswith(".svg"):
+        export_svg(lanes, path, width=width)
+    else:
+        export_png(lanes, path, width=width)
+
+
+def main(argv=None):
+    # Офлайн-режим: файл задач → расписание Джонсона → PNG/SVG, без окна
+    from johnson import DEFAULT_CRITERIA, merge_loaded, johnson_order, simulate_schedule
+
+    parser = argparse.ArgumentParser(description="Экспорт диаграммы Ганта расписания Джонсона")
+    parser.add_argument("jobs_file", help="файл задач (формат forjoe.json)")
+    parser.add_argument("--out", default="gantt.svg", help="выходной файл .svg или .png")
+    parser.add_argument("--width", type=int, default=1600, help="ширина в пикселях")
+    args = parser.parse_args(argv)
+
+    with open(args.jobs_file, "r", encoding="utf-8") as f:
+        loaded = json.load(f)
+    jobs, data = [], {}
+    criteria = merge_loaded(loaded, [dict(c) for c in DEFAULT_CRITERIA], jobs, data)
+    m1_name, m2_name = criteria[0]["name"], criteria[1]["name"]
+    details, makespan = simulate_schedule(johnson_order(jobs, data, m1_name, m2_name), data, m1_name, m2_name)
+
+    export(lanes_from_details(details, m1_name, m2_name), args.out, width=args.width)
+    print(f"Makespan = {makespan}, диаграмма сохранена: {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
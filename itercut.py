@@ -1,8 +1,11 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog, simpledialog
-import json
+import numpy as np
 import networkx as nx
-from networkx.algorithms.dag import topological_sort
+from cpm import CPMEngine, DynamicTopo, CycleError, LongestPaths, format_paths
+from cpm_io import load_network
+from crashing import CrashExplorer
+from pert import three_point, monte_carlo, summarize, format_report
 
 
 class NetworkLab:
@@ -16,6 +19,12 @@ class NetworkLab:
         #                'cost_normal': float, 'cost_crash': float, 'slope': float } }
         self.data = {}
         self.graph = nx.DiGraph()
+        # Топологический порядок, поддерживаемый при правке связей (проверка циклов без полного обхода)
+        self.topo = DynamicTopo()
+        # Скомпилированная структура сети для расчёта КП (сбрасывается при изменении связей)
+        self.cpm = CPMEngine(self.topo)
+        # Пошаговое ускорение со снимками шагов (создаётся заново, если сеть изменилась)
+        self.explorer = None
 
         self.setup_ui()
 
@@ -26,7 +35,25 @@ class NetworkLab:
         ttk.Button(top, text="Добавить работу", command=self.add_activity).grid(row=0, column=0, padx=5)
         ttk.Button(top, text="Загрузить JSON", command=self.load_json).grid(row=0, column=1, padx=5)
         ttk.Button(top, text="Рассчитать критический путь", command=self.calculate_cp).grid(row=0, column=2, padx=10)
-        ttk.Button(top, text="Оптимизация за 5 итераций", command=self.optimize_5_steps, style="Accent.TButton").grid(row=0, column=3, padx=20)
+        ttk.Button(top, text="Ускорение по шагам", command=self.explore_crashing, style="Accent.TButton").grid(row=0, column=3, padx=20)
+        ttk.Button(top, text="Монте-Карло (PERT)", command=self.simulate_pert).grid(row=0, column=4, padx=5)
+        ttk.Label(top, text="Выборок:").grid(row=0, column=5, padx=5, sticky="e")
+        self.samples_entry = ttk.Entry(top, width=10)
+        self.samples_entry.insert(0, "10000")
+        self.samples_entry.grid(row=0, column=6, padx=5, sticky="w")
+
+        # Условия остановки пошагового ускорения (пустое поле — без ограничения) и переход по шагам
+        self.stop_entries = {}
+        for col, (key, label, default) in enumerate((("steps", "Шагов:", "5"), ("target", "Цель, дней:", ""),
+                                                     ("budget", "Бюджет:", ""), ("step", "Шаг, дней:", "1"))):
+            ttk.Label(top, text=label).grid(row=1, column=2 * col, padx=5, sticky="e")
+            entry = ttk.Entry(top, width=8)
+            entry.insert(0, default)
+            entry.grid(row=1, column=2 * col + 1, padx=5, sticky="w")
+            self.stop_entries[key] = entry
+        ttk.Label(top, text="Снимок шага:").grid(row=2, column=0, padx=5, sticky="e")
+        self.step_scale = tk.Scale(top, from_=0, to=0, orient="horizontal", length=400, command=self.show_step)
+        self.step_scale.grid(row=2, column=1, columnspan=5, padx=5, sticky="w")
 
         # Таблица
         table_frame = ttk.Frame(self.root)
@@ -108,18 +135,13 @@ class NetworkLab:
             'cost_crash': float(cost_c),
             'slope': float(slope)
         }
+        # новая работа ещё не имеет последователей, поэтому цикла не создаёт
+        self.topo.add_node(name, preds)
         self.graph.add_node(name)
         for p in preds:
             self.graph.add_edge(p, name)
 
-        if not nx.is_directed_acyclic_graph(self.graph):
-            messagebox.showerror("Ошибка", "Добавление создает цикл — отменено")
-            # откат
-            self.activities.remove(name)
-            self.data.pop(name, None)
-            self.graph.remove_node(name)
-            return
-
+        self.cpm.invalidate()
         self.update_table()
 
     def update_table(self):
@@ -157,25 +179,21 @@ class NetworkLab:
             new_preds = [p.strip() for p in new.split(",") if p.strip()]
             # оставить только существующие
             new_preds = [p for p in new_preds if p in self.activities]
-            # откат запоминаем
-            old_preds = list(self.data[item]['predecessors'])
+            # проверка на цикл до изменения данных
+            try:
+                self.topo.set_predecessors(item, new_preds)
+            except CycleError as e:
+                messagebox.showerror("Ошибка", f"Изменение приводит к циклу — отменено.\n{e}")
+                return
             # убираем старые ребра
-            for p in old_preds:
+            for p in self.data[item]['predecessors']:
                 if self.graph.has_edge(p, item):
                     self.graph.remove_edge(p, item)
             # добавляем новые
             self.data[item]['predecessors'] = new_preds
             for p in new_preds:
                 self.graph.add_edge(p, item)
-            if not nx.is_directed_acyclic_graph(self.graph):
-                messagebox.showerror("Ошибка", "Изменение приводит к циклу — откат.")
-                # откат
-                for p in new_preds:
-                    if self.graph.has_edge(p, item):
-                        self.graph.remove_edge(p, item)
-                self.data[item]['predecessors'] = old_preds
-                for p in old_preds:
-                    self.graph.add_edge(p, item)
+            self.cpm.invalidate()
             self.update_table()
             return
         # для числовых полей
@@ -239,7 +257,9 @@ class NetworkLab:
         self.result.insert(tk.END, "КРИТИЧЕСКИЙ ПУТЬ И РЕЗЕРВЫ ВРЕМЕНИ\n")
         self.result.insert(tk.END, "="*70 + "\n")
         self.result.insert(tk.END, f"Длительность проекта: {duration:.2f} дней\n")
-        self.result.insert(tk.END, f"Критический путь: {' → '.join(cp)}\n\n")
+        self.result.insert(tk.END, f"Критические работы: {', '.join(cp)}\n")
+        paths = LongestPaths(self.cpm, self.cpm.durations(self.data, times)).take(5)
+        self.result.insert(tk.END, "Самые длинные пути:\n" + format_paths(self.cpm.names, paths, duration) + "\n\n")
 
         self.result.insert(tk.END, f"{'Работа':<12} {'ES':>6} {'EF':>6} {'LS':>6} {'LF':>6} {'Резерв общ.':>12} {'Резерв своб.':>12}\n")
         self.result.insert(tk.END, "-"*90 + "\n")
@@ -249,152 +269,132 @@ class NetworkLab:
                 f"{a:<12} {es[a]:>6.2f} {ef[a]:>6.2f} {ls[a]:>6.2f} {lf[a]:>6.2f} "
                 f"{total_float[a]:>12.2f} {free_float[a]:>12.2f}{star}\n")
 
+    def simulate_pert(self):
+        """
+        Стохастический расчёт (pert.py) по трёхточечным оценкам: распределение срока,
+        вероятность уложиться в детерминированную длительность, индексы критичности.
+        """
+        if not self.activities:
+            messagebox.showinfo("Инфо", "Нет работ для расчета")
+            return
+        try:
+            samples = int(self.samples_entry.get())
+            if samples <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Ошибка", "Введите положительное число выборок")
+            return
+
+        try:
+            self.cpm.sync(self.activities, self.data)
+            params = three_point(self.cpm, self.data)
+            durations, critical = monte_carlo(self.cpm, params, samples)
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e))
+            return
+
+        deterministic = self.cpm.passes(self.cpm.durations(self.data))[0]
+        self.result.delete(1.0, tk.END)
+        self.result.insert(tk.END, "МОНТЕ-КАРЛО (PERT)\n")
+        self.result.insert(tk.END, "="*70 + "\n")
+        self.result.insert(tk.END, format_report(self.cpm, summarize(durations, critical, deterministic), deterministic) + "\n")
+
     def calc_path(self, times):
         """
         Возвращает: duration, critical_list (в порядке топологической сортировки), ES, EF, LS, LF
         times: dict {act: duration}
         """
-        es = {}
-        ef = {}
-        # Прямой проход
-        for act in topological_sort(self.graph):
-            preds = self.data[act]['predecessors']
-            if not preds:
-                es[act] = 0.0
-            else:
-                es[act] = max([ef.get(p, 0.0) for p in preds])
-            dur = float(times.get(act, self.data[act]['duration']))
-            ef[act] = es[act] + dur
-
-        duration = max(ef.values()) if ef else 0.0
-
-        # Обратный проход
-        lf = {}
-        ls = {}
-        for act in reversed(list(topological_sort(self.graph))):
-            succs = list(self.graph.successors(act))
-            if not succs:
-                lf[act] = duration
-            else:
-                lf[act] = min([ls.get(s, duration) for s in succs])
-            dur = float(times.get(act, self.data[act]['duration']))
-            ls[act] = lf[act] - dur
+        return self.cpm.calc_path(self.activities, self.data, times)
 
-        # Критические — EF == LF
-        critical = [a for a in self.activities if abs(ef[a] - lf[a]) < 1e-6]
-        return duration, critical, es, ef, ls, lf
-
-    def optimize_5_steps(self):
+    def explore_crashing(self):
+        """
+        Жадное ускорение по шагам (crashing.CrashExplorer) до заданного числа шагов, цели,
+        бюджета доп. затрат или пока есть что ускорять. Повторный запуск продолжает с выбранного
+        снимка; к любому шагу можно вернуться ползунком без пересчёта.
+        """
         if not self.activities:
             messagebox.showinfo("Ошибка", "Нет данных")
             return
+        try:
+            limits = {k: float(e.get()) if e.get().strip() else None for k, e in self.stop_entries.items()}
+            step = limits.pop("step")
+            step = 1.0 if step is None else step
+            steps = None if limits["steps"] is None else int(limits["steps"])
+            if step <= 0 or (steps is not None and steps < 0):
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("Ошибка", "Шагов, цель и бюджет — неотрицательные числа, шаг — положительное число")
+            return
 
-        # копия текущих длительностей
-        current_durations = {a: float(self.data[a]['duration']) for a in self.activities}
-        initial_duration, _, _, _, _, _ = self.calc_path(current_durations)
-        initial_cost = sum(self.data[a]['cost_normal'] for a in self.activities)
-
-        self.result.insert(tk.END, "\n\nОПТИМИЗАЦИЯ ЗА 5 ИТЕРАЦИЙ (crashing)\n")
-        self.result.insert(tk.END, "="*70 + "\n")
-        self.result.insert(tk.END, f"Исходная длительность: {initial_duration:.2f} дней\n")
-        self.result.insert(tk.END, f"Исходная стоимость: {initial_cost:.2f} у.е.\n\n")
-
-        total_cost = initial_cost
-
-        for step in range(1, 6):
-            duration, cp, es, ef, ls, lf = self.calc_path(current_durations)
-
-            # Выбор лучшей работы на критическом пути (минимальный slope и есть запас для ускорения)
-            best_act = None
-            best_slope = float('inf')
-            for act in cp:
-                possible_reduce = current_durations[act] - self.data[act]['crash_duration']
-                if possible_reduce > 1e-9:
-                    slope = self.data[act]['slope']
-                    if slope < best_slope:
-                        best_slope = slope
-                        best_act = act
-
-            if best_act is None:
-                self.result.insert(tk.END, f"Итерация {step}: НЕЛЬЗЯ ускорить дальше!\n")
-                break
-
-            # Ускоряем на 1 день (или на возможный остаток, если меньше 1)
-            possible_reduce = current_durations[best_act] - self.data[best_act]['crash_duration']
-            reduce_by = min(1.0, possible_reduce)
-            current_durations[best_act] -= reduce_by
-            cost_increase = reduce_by * best_slope
-            total_cost += cost_increase
-
-            # пересчёт длительности проекта
-            new_duration, new_cp, _, _, _, _ = self.calc_path(current_durations)
-
-            self.result.insert(tk.END, f"Итерация {step}:\n")
-            self.result.insert(tk.END, f"  Ускоряем работу: {best_act} (цена {best_slope:.2f} у.е./день), на {reduce_by:.2f} дн.\n")
-            self.result.insert(tk.END, f"  Новая длительность проекта: {new_duration:.2f} дней\n")
-            self.result.insert(tk.END, f"  Новая стоимость: {total_cost:.2f} у.е.\n")
-            self.result.insert(tk.END, f"  Новый критический путь: {' → '.join(new_cp)}\n\n")
-
-        final_duration, _, _, _, _, _ = self.calc_path(current_durations)
-        self.result.insert(tk.END, f"Финальная длительность: {final_duration:.2f} дней\n")
-        self.result.insert(tk.END, f"Финальная стоимость: {total_cost:.2f} у.е.\n")
-        self.result.insert(tk.END, f"Сокращено на: {initial_duration - final_duration:.2f} дней\n")
+        self.cpm.sync(self.activities, self.data)
+        if self.explorer is None or not self.explorer.matches(self.data):
+            self.explorer = CrashExplorer(self.cpm, self.data, step)
+        self.explorer.step = step
+        reason = self.explorer.run(steps, limits["target"], limits["budget"])
+        self.step_scale.configure(to=len(self.explorer.history) - 1)
+        self.step_scale.set(self.explorer.current)
+        self.render_steps(reason)
+
+    def show_step(self, value):
+        """Ползунок снимков: сделать шаг текущим и показать его (без расчёта КП)."""
+        if self.explorer is None:
+            return
+        s = int(float(value))
+        if s != self.explorer.current and s < len(self.explorer.history):
+            self.explorer.goto(s)
+            self.render_steps()
+
+    def render_steps(self, reason=None):
+        ex = self.explorer
+        names = self.cpm.names
+        history = ex.history
+        first, cur = history[0], history[ex.current]
+        reasons = {"steps": "сделано заданное число шагов", "target": "достигнута цель",
+                   "budget": "следующий шаг превысил бы бюджет", "exhausted": "ускорять больше нечего"}
+
+        lines = ["ПОШАГОВОЕ УСКОРЕНИЕ (crashing)", "=" * 70]
+        if reason:
+            lines.append(f"Остановка: {reasons[reason]}")
+        lines.append(f"Исходно: {first['duration']:.2f} дней, {first['cost']:.2f} у.е.")
+        lines.append(f"Шаг {cur['step']} из {len(history) - 1}: {cur['duration']:.2f} дней, {cur['cost']:.2f} у.е. "
+                     f"(сокращено на {first['duration'] - cur['duration']:.2f} дней за {cur['cost'] - first['cost']:.2f} у.е.)")
+        d0, d = ex.durations(0), ex.durations()
+        changed = np.flatnonzero(d != d0)
+        if len(changed):
+            lines.append("Ускорены: " + ", ".join(f"{names[i]} {d0[i]:g}→{d[i]:g}" for i in changed[:30])
+                         + (f" и ещё {len(changed) - 30}" if len(changed) > 30 else ""))
+
+        lines.append(f"\n{'Шаг':>5} {'Работа':<12} {'На, дн.':>8} {'Цена/день':>10} {'Длит.':>9} {'Стоимость':>12}")
+        lo = max(1, ex.current - 100)
+        if lo > 1:
+            lines.append(f"{'...':>5}")
+        for rec in history[lo:ex.current + 101]:
+            mark = " ←" if rec["step"] == ex.current else ""
+            lines.append(f"{rec['step']:>5} {names[rec['act']]:<12} {rec['by']:>8.2f} {rec['slope']:>10.2f} "
+                         f"{rec['duration']:>9.2f} {rec['cost']:>12.2f}{mark}")
+        if len(history) > ex.current + 101:
+            lines.append(f"{'...':>5}")
+        self.result.delete(1.0, tk.END)
+        self.result.insert(tk.END, "\n".join(lines) + "\n")
 
     def load_json(self):
-        path = filedialog.askopenfilename(filetypes=[("JSON", "*.json")])
+        path = filedialog.askopenfilename(filetypes=[("Сеть", "*.json *.jsonl *.csv"), ("JSON", "*.json"),
+                                                     ("JSON Lines", "*.jsonl"), ("CSV", "*.csv")])
         if not path:
             return
         try:
-            with open(path, 'r', encoding='utf-8') as f:
-                d = json.load(f)
-            # ожидаем формат: { "activities": [...], "data": { act: { ... } } }
-            if not isinstance(d, dict) or 'activities' not in d or 'data' not in d:
-                raise ValueError("Некорректный формат JSON: требуются ключи 'activities' и 'data'")
-
-            activities = d['activities']
-            data = d['data']
-            if not isinstance(activities, list) or not isinstance(data, dict):
-                raise ValueError("Некорректные типы для 'activities' или 'data'")
-
-            # Очистка
-            self.activities = []
-            self.data = {}
-            self.graph.clear()
+            # Разбор и проверка столбцами (cpm_io), затем проверка на цикл с порядком работ
+            net = load_network(path, strict=True)
+            activities, data = net.to_data()
+            self.topo.build(activities, {a: data[a]['predecessors'] for a in activities})
 
-            a_set = set(activities)
-            # Добавим узлы и данные
-            for act in activities:
-                if act not in data:
-                    raise ValueError(f"Нет описания работы '{act}' в 'data'")
-                info = data[act]
-                preds = info.get('predecessors', [])
-                dur = float(info.get('duration'))
-                crash_dur = float(info.get('crash_duration'))
-                cost_n = float(info.get('cost_normal'))
-                cost_c = float(info.get('cost_crash'))
-                if crash_dur >= dur:
-                    raise ValueError(f"Для работы {act}: crash_duration должен быть меньше duration")
-                crash_days = dur - crash_dur
-                slope = (cost_c - cost_n) / crash_days if crash_days > 0 else float('inf')
-                self.activities.append(act)
-                self.data[act] = {
-                    'predecessors': [p for p in preds if p in a_set],
-                    'duration': dur,
-                    'crash_duration': crash_dur,
-                    'cost_normal': cost_n,
-                    'cost_crash': cost_c,
-                    'slope': slope
-                }
-                self.graph.add_node(act)
-
-            # Добавить рёбра
-            for act in self.activities:
-                for p in self.data[act]['predecessors']:
-                    if p in a_set:
-                        self.graph.add_edge(p, act)
-
-            if not nx.is_directed_acyclic_graph(self.graph):
-                raise ValueError("Загруженный граф содержит цикл")
+            self.activities = activities
+            self.data = data
+            self.graph.clear()
+            self.graph.add_nodes_from(activities)
+            self.graph.add_edges_from(zip((activities[i] for i in net.src.tolist()),
+                                          (activities[i] for i in net.dst.tolist())))
+            self.cpm.invalidate()
 
             self.update_table()
             messagebox.showinfo("OK", f"Загружено {len(self.activities)} работ")
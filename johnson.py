@@ -3,6 +3,322 @@ from tkinter import ttk, messagebox
 import tkinter.simpledialog as simpledialog
 from tkinter import filedialog
 import json
+import os
+import sys
+import csv
+import glob
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from bisect import bisect_left, insort
+from gantt import GanttCanvas, lanes_from_details, export as export_gantt
+
+DEFAULT_CRITERIA = [
+    {'name': 'Машина 1', 'direction': 'min'},
+    {'name': 'Машина 2', 'direction': 'min'}
+]
+
+
+def merge_loaded(loaded, criteria, jobs, data):
+    """
+    Вливает содержимое JSON (формат forjoe.json) в criteria/jobs/data на месте.
+    Возвращает итоговый список критериев (первые два из файла, если их там не меньше двух).
+    """
+    loaded_criteria = loaded.get('criteria', [])
+    if len(loaded_criteria) >= 2:
+        criteria = loaded_criteria[:2]
+
+    for job in loaded.get('jobs', []):
+        if job not in jobs:
+            jobs.append(job)
+            data[job] = {c['name']: 0.0 for c in criteria}
+
+    crit_names = [c['name'] for c in criteria]
+    for job, times in loaded.get('data', {}).items():
+        if job not in data:
+            jobs.append(job)
+            data[job] = {}
+        for crit_name, val in times.items():
+            if crit_name in crit_names:
+                data[job][crit_name] = float(val)
+    return criteria
+
+
+def johnson_order(jobs, data, m1_name, m2_name):
+    """Порядок Джонсона: группа t1 < t2 по t1 ↑, затем остальные по t2 ↓."""
+    group1, group2 = [], []
+    for job in jobs:
+        t1 = data[job][m1_name]
+        t2 = data[job][m2_name]
+        if t1 < t2:
+            group1.append((t1, job))
+        else:
+            group2.append((t2, job))
+
+    group1.sort()  # по t1 ↑
+    group2.sort(reverse=True)  # по t2 ↓
+
+    return [job for _, job in group1] + [job for _, job in group2]
+
+
+def simulate_schedule(schedule, data, m1_name, m2_name):
+    """
+    Симуляция выполнения на двух машинах.
+    Возвращает (details, makespan), details — список словарей по каждой задаче.
+    """
+    time_m1 = 0
+    time_m2 = 0
+    details = []
+
+    for i, job in enumerate(schedule, 1):
+        t1 = data[job][m1_name]
+        t2 = data[job][m2_name]
+
+        start_m1 = time_m1
+        end_m1 = time_m1 + t1
+        time_m1 = end_m1
+
+        start_m2 = max(time_m2, end_m1)
+        idle = start_m2 - time_m2 if start_m2 > time_m2 else 0
+        end_m2 = start_m2 + t2
+        time_m2 = end_m2
+
+        details.append({
+            "num": i,
+            "job": job,
+            "m1_start": start_m1,
+            "m1_end": end_m1,
+            "m2_start": start_m2,
+            "m2_end": end_m2,
+            "idle": idle
+        })
+
+    return details, time_m2
+
+
+class IncrementalJohnson:
+    """
+    Расписание Джонсона с инкрементальным обновлением.
+    Группы хранятся отсортированными списками (поиск позиции — bisect за O(log n),
+    вставка/удаление — сдвиг хвоста списка, быстрый memmove даже на десятках тысяч задач),
+    состояние симуляции — префиксом по позициям расписания: изменение задачи
+    на позиции p сбрасывает только суффикс начиная с p, он пересчитывается
+    лениво при следующем запросе makespan/деталей.
+    """
+
+    def __init__(self):
+        self.times = {}                 # {job: (t1, t2)}
+        self.group1 = []                # (t1, job), t1 < t2 — по t1 ↑
+        self.group2 = []                # (t2, job), t1 >= t2 — обходится в обратном порядке (по t2 ↓)
+        # Префикс состояния симуляции: конец на М1, конец на М2, простой М2 — по позициям расписания
+        self._m1_end = []
+        self._m2_end = []
+        self._idle = []
+
+    def __len__(self):
+        return len(self.times)
+
+    def __contains__(self, job):
+        return job in self.times
+
+    def _position(self, job):
+        """Позиция задачи в расписании, O(log n)."""
+        t1, t2 = self.times[job]
+        if t1 < t2:
+            return bisect_left(self.group1, (t1, job))
+        return len(self.group1) + len(self.group2) - 1 - bisect_left(self.group2, (t2, job))
+
+    def _invalidate(self, pos):
+        if pos < len(self._m1_end):
+            del self._m1_end[pos:]
+            del self._m2_end[pos:]
+            del self._idle[pos:]
+
+    def _job_at_range(self, start):
+        """Задачи расписания начиная с позиции start."""
+        n1 = len(self.group1)
+        if start < n1:
+            for i in range(start, n1):
+                yield self.group1[i][1]
+            start = n1
+        for i in range(len(self.group2) - (start - n1) - 1, -1, -1):
+            yield self.group2[i][1]
+
+    def add(self, job, t1, t2):
+        if job in self.times:
+            raise KeyError(f"Задача {job} уже есть")
+        self.times[job] = (t1, t2)
+        if t1 < t2:
+            insort(self.group1, (t1, job))
+        else:
+            insort(self.group2, (t2, job))
+        self._invalidate(self._position(job))
+
+    def remove(self, job):
+        pos = self._position(job)
+        t1, t2 = self.times.pop(job)
+        if t1 < t2:
+            del self.group1[bisect_left(self.group1, (t1, job))]
+        else:
+            del self.group2[bisect_left(self.group2, (t2, job))]
+        self._invalidate(pos)
+
+    def update(self, job, t1, t2):
+        """Изменение времён задачи: удаление + вставка, каждое сбрасывает суффикс со своей позиции."""
+        self.remove(job)
+        self.add(job, t1, t2)
+
+    def rename(self, old, new):
+        t1, t2 = self.times[old]
+        self.remove(old)
+        self.add(new, t1, t2)
+
+    def _refresh(self):
+        """Досчитывает недостающий суффикс состояния симуляции."""
+        k = len(self._m1_end)
+        if k == len(self.times):
+            return
+        time_m1 = self._m1_end[-1] if k else 0
+        time_m2 = self._m2_end[-1] if k else 0
+        for job in self._job_at_range(k):
+            t1, t2 = self.times[job]
+            time_m1 += t1
+            start_m2 = max(time_m2, time_m1)
+            self._idle.append(start_m2 - time_m2 if start_m2 > time_m2 else 0)
+            time_m2 = start_m2 + t2
+            self._m1_end.append(time_m1)
+            self._m2_end.append(time_m2)
+
+    def schedule(self):
+        return list(self._job_at_range(0))
+
+    def makespan(self):
+        self._refresh()
+        return self._m2_end[-1] if self._m2_end else 0
+
+    def total_idle(self):
+        self._refresh()
+        return sum(self._idle)
+
+    def details(self):
+        """То же, что simulate_schedule, но из кэшированного состояния."""
+        self._refresh()
+        details = []
+        for i, job in enumerate(self._job_at_range(0)):
+            t1, t2 = self.times[job]
+            m1_end = self._m1_end[i]
+            m2_end = self._m2_end[i]
+            details.append({
+                "num": i + 1,
+                "job": job,
+                "m1_start": m1_end - t1,
+                "m1_end": m1_end,
+                "m2_start": m2_end - t2,
+                "m2_end": m2_end,
+                "idle": self._idle[i]
+            })
+        return details
+
+
+def schedule_file(path):
+    """
+    Планирует один файл задач (для пакетного режима, выполняется в рабочем процессе).
+    Ошибки не пробрасываются, а возвращаются в поле 'error'.
+    """
+    result = {"file": path, "status": "ok", "sequence": [], "makespan": None, "total_idle": None, "error": ""}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            loaded = json.load(f)
+        if not isinstance(loaded, dict):
+            raise ValueError("Ожидается JSON-объект с ключами 'criteria', 'jobs', 'data'")
+
+        jobs, data = [], {}
+        criteria = merge_loaded(loaded, [dict(c) for c in DEFAULT_CRITERIA], jobs, data)
+        if len(jobs) < 2 or len(criteria) != 2:
+            raise ValueError("Нужны минимум 2 задачи и ровно 2 машины")
+
+        m1_name = criteria[0]["name"]
+        m2_name = criteria[1]["name"]
+        for job in jobs:
+            for name in (m1_name, m2_name):
+                if name not in data[job]:
+                    raise ValueError(f"Нет времени '{name}' для задачи {job}")
+
+        schedule = johnson_order(jobs, data, m1_name, m2_name)
+        details, makespan = simulate_schedule(schedule, data, m1_name, m2_name)
+        result["sequence"] = schedule
+        result["makespan"] = makespan
+        result["total_idle"] = sum(d["idle"] for d in details)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    return result
+
+
+def collect_job_files(sources):
+    """Разворачивает каталоги (все *.json внутри) и glob-шаблоны в отсортированный список файлов."""
+    files = []
+    for src in sources:
+        if os.path.isdir(src):
+            files.extend(glob.glob(os.path.join(src, "*.json")))
+        else:
+            files.extend(glob.glob(src, recursive=True))
+    return sorted(set(files))
+
+
+def write_results(results, out_path):
+    """Пишет сводный файл результатов: CSV при расширении .csv, иначе JSON."""
+    if out_path.lower().endswith(".csv"):
+        with open(out_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["file", "status", "sequence", "makespan", "total_idle", "error"])
+            for r in results:
+                writer.writerow([r["file"], r["status"], " → ".join(r["sequence"]),
+                                 "" if r["makespan"] is None else r["makespan"],
+                                 "" if r["total_idle"] is None else r["total_idle"],
+                                 r["error"]])
+    else:
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def run_batch(sources, out_path, workers=None, stream=sys.stdout):
+    """
+    Пакетный режим: планирует все найденные файлы в пуле процессов,
+    печатает прогресс по мере готовности и пишет сводный файл.
+    Ошибка в одном файле не прерывает пакет.
+    Возвращает список результатов в порядке входных файлов.
+    """
+    # Сводный файл мог оказаться в том же каталоге — не планируем его как задачу
+    files = [p for p in collect_job_files(sources) if os.path.abspath(p) != os.path.abspath(out_path)]
+    if not files:
+        print("Файлы задач не найдены", file=stream)
+        return []
+
+    results = {}
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(schedule_file, path): path for path in files}
+        for done, fut in enumerate(as_completed(futures), 1):
+            path = futures[fut]
+            try:
+                r = fut.result()
+            except Exception as e:
+                # Рабочий процесс упал целиком (например, BrokenProcessPool)
+                r = {"file": path, "status": "error", "sequence": [], "makespan": None,
+                     "total_idle": None, "error": f"{type(e).__name__}: {e}"}
+            results[path] = r
+            if r["status"] == "ok":
+                msg = f"makespan={r['makespan']}, простой={r['total_idle']}"
+            else:
+                failed += 1
+                msg = f"ОШИБКА {r['error']}"
+            print(f"[{done}/{len(files)}] {path}: {msg}", file=stream, flush=True)
+
+    ordered = [results[p] for p in files]
+    write_results(ordered, out_path)
+    print(f"Готово: {len(files) - failed} успешно, {failed} с ошибками. Результаты: {out_path}", file=stream)
+    return ordered
+
 
 class JohnsonScheduler:
     def __init__(self, root):
@@ -11,15 +327,24 @@ class JohnsonScheduler:
         self.root.geometry("1300x800")
 
         self.jobs = []
-        self.criteria = [
-            {'name': 'Машина 1', 'direction': 'min'},
-            {'name': 'Машина 2', 'direction': 'min'}
-        ]
+        self.criteria = [dict(c) for c in DEFAULT_CRITERIA]
         self.data = {}
+        # Инкрементальное расписание, синхронизируется при каждом изменении задач
+        self.scheduler = IncrementalJohnson()
 
         self.setup_ui()
         self.update_table()
 
+    def job_times(self, job):
+        m1_name = self.criteria[0]["name"]
+        m2_name = self.criteria[1]["name"]
+        return self.data[job].get(m1_name, 0.0), self.data[job].get(m2_name, 0.0)
+
+    def rebuild_scheduler(self):
+        self.scheduler = IncrementalJohnson()
+        for job in self.jobs:
+            self.scheduler.add(job, *self.job_times(job))
+
     def setup_ui(self):
         top_frame = ttk.Frame(self.root)
         top_frame.pack(fill="x", padx=10, pady=10)
@@ -33,6 +358,7 @@ class JohnsonScheduler:
         ttk.Button(top_frame, text="Загрузить JSON", command=self.load_json).grid(row=0, column=3, padx=10)
         ttk.Button(top_frame, text="Вычислить расписание Джонсона", command=self.compute_johnson,
                    style="Accent.TButton").grid(row=0, column=4, padx=20)
+        ttk.Button(top_frame, text="Экспорт Ганта (PNG/SVG)", command=self.export_gantt).grid(row=0, column=5, padx=5)
 
         # === Таблица ввода ===
         table_frame = ttk.Frame(self.root)
@@ -72,6 +398,12 @@ class JohnsonScheduler:
         self.makespan_label = ttk.Label(result_frame, text="Makespan: —", font=("Arial", 12, "bold"), foreground="blue")
         self.makespan_label.pack(pady=5)
 
+        # === Диаграмма Ганта ===
+        gantt_frame = ttk.LabelFrame(self.root, text="Диаграмма Ганта (колесо — масштаб, перетаскивание — сдвиг)")
+        gantt_frame.pack(fill="both", expand=True, padx=10, pady=5)
+        self.gantt = GanttCanvas(gantt_frame, height=150)
+        self.gantt.pack(fill="both", expand=True, padx=5, pady=5)
+
         # Контекстное меню
         self.context_menu = tk.Menu(self.root, tearoff=0)
         self.context_menu.add_command(label="Переименовать задачу", command=self.rename_job)
@@ -90,6 +422,7 @@ class JohnsonScheduler:
             return
         self.jobs.append(name)
         self.data[name] = {c["name"]: 0.0 for c in self.criteria}
+        self.scheduler.add(name, *self.job_times(name))
         self.job_entry.delete(0, "end")
         self.update_table()
 
@@ -100,28 +433,27 @@ class JohnsonScheduler:
             with open(file_path, 'r', encoding='utf-8') as f:
                 loaded = json.load(f)
 
-            loaded_criteria = loaded.get('criteria', [])
-            if len(loaded_criteria) >= 2:
-                self.criteria = loaded_criteria[:2]
-
-            for job in loaded.get('jobs', []):
-                if job not in self.jobs:
-                    self.jobs.append(job)
-                    self.data[job] = {c['name']: 0.0 for c in self.criteria}
-
-            for job, times in loaded.get('data', {}).items():
-                if job not in self.data:
-                    self.jobs.append(job)
-                    self.data[job] = {}
-                for crit_name, val in times.items():
-                    if crit_name in [c['name'] for c in self.criteria]:
-                        self.data[job][crit_name] = float(val)
+            self.criteria = merge_loaded(loaded, self.criteria, self.jobs, self.data)
+            self.rebuild_scheduler()
 
             self.update_table()
             messagebox.showinfo("Успех", "Данные из JSON загружены")
         except Exception as e:
             messagebox.showerror("Ошибка", f"Не удалось загрузить: {e}")
 
+    def export_gantt(self):
+        if not self.gantt.lanes:
+            messagebox.showwarning("Ошибка", "Сначала вычислите расписание")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".png",
+                                            filetypes=[("PNG", "*.png"), ("SVG", "*.svg")])
+        if not path: return
+        try:
+            export_gantt(self.gantt.lanes, path)
+            messagebox.showinfo("Успех", f"Диаграмма сохранена: {path}")
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить: {e}")
+
     def update_table(self):
         self.tree.delete(*self.tree.get_children())
         crit_names = [c["name"] for c in self.criteria]
@@ -160,6 +492,7 @@ class JohnsonScheduler:
                 val = float(entry.get())
                 if val < 0: raise ValueError()
                 self.data[job_name][crit_name] = val
+                self.scheduler.update(job_name, *self.job_times(job_name))
                 self.update_table()
             except:
                 messagebox.showerror("Ошибка", "Введите положительное число")
@@ -184,6 +517,7 @@ class JohnsonScheduler:
             idx = self.jobs.index(old)
             self.jobs[idx] = new
             self.data[new] = self.data.pop(old)
+            self.scheduler.rename(old, new)
             self.update_table()
 
     def delete_job(self):
@@ -191,6 +525,7 @@ class JohnsonScheduler:
         if item and messagebox.askyesno("Удаление", f"Удалить задачу «{item}»?"):
             self.jobs.remove(item)
             self.data.pop(item, None)
+            self.scheduler.remove(item)
             self.update_table()
 
     def rename_criterion(self):
@@ -220,52 +555,10 @@ class JohnsonScheduler:
             messagebox.showwarning("Ошибка", "Нужны минимум 2 задачи и ровно 2 машины")
             return
 
-        m1_name = self.criteria[0]["name"]
-        m2_name = self.criteria[1]["name"]
-
-        group1, group2 = [], []
-        for job in self.jobs:
-            t1 = self.data[job][m1_name]
-            t2 = self.data[job][m2_name]
-            if t1 < t2:
-                group1.append((t1, job))
-            else:
-                group2.append((t2, job))
-
-        group1.sort()  # по t1 ↑
-        group2.sort(reverse=True)  # по t2 ↓
-
-        schedule = [job for _, job in group1] + [job for _, job in group2]
-
-        # Симуляция выполнения
-        time_m1 = 0
-        time_m2 = 0
-        details = []
-
-        for i, job in enumerate(schedule, 1):
-            t1 = self.data[job][m1_name]
-            t2 = self.data[job][m2_name]
-
-            start_m1 = time_m1
-            end_m1 = time_m1 + t1
-            time_m1 = end_m1
-
-            start_m2 = max(time_m2, end_m1)
-            idle = start_m2 - time_m2 if start_m2 > time_m2 else 0
-            end_m2 = start_m2 + t2
-            time_m2 = end_m2
-
-            details.append({
-                "num": i,
-                "job": job,
-                "m1_start": start_m1,
-                "m1_end": end_m1,
-                "m2_start": start_m2,
-                "m2_end": end_m2,
-                "idle": idle
-            })
-
-        makespan = time_m2
+        # Расписание поддерживается инкрементально — пересчитывается только изменённый суффикс
+        details = self.scheduler.details()
+        schedule = [d["job"] for d in details]
+        makespan = self.scheduler.makespan()
 
         # Вывод результата
         self.result_tree.delete(*self.result_tree.get_children())
@@ -279,14 +572,32 @@ class JohnsonScheduler:
             ))
 
         self.makespan_label.config(text=f"Makespan: {makespan} единиц времени")
+        self.gantt.set_lanes(lanes_from_details(details, self.criteria[0]["name"], self.criteria[1]["name"]))
 
         messagebox.showinfo("Готово!",
                             f"Оптимальное расписание построено!\n"
                             f"Порядок: {' → '.join(schedule)}\n"
                             f"Makespan = {makespan}")
 
-# Запуск
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Метод Джонсона: окно или пакетный режим")
+    parser.add_argument("--batch", nargs="+", metavar="ПУТЬ",
+                        help="каталоги или glob-шаблоны файлов задач (формат forjoe.json)")
+    parser.add_argument("--out", default="johnson_results.json",
+                        help="сводный файл результатов (.json или .csv)")
+    parser.add_argument("--workers", type=int, default=None, help="число рабочих процессов")
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        results = run_batch(args.batch, args.out, args.workers)
+        return 0 if results and all(r["status"] == "ok" for r in results) else 1
+
     root = tk.Tk()
     app = JohnsonScheduler(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    return 0
+
+
+# Запуск
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
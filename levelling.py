@@ -0,0 +1,228 @@
+import sys
+import time
+import argparse
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from cpm_io import load_network
+from rcpsp import slot_durations, usage
+
+# Выравнивание ресурсов в пределах резервов (метод Бёрджесса).
+#
+# Срок проекта не меняется: каждая работа остаётся между своими ES и LS (на слотах шага step),
+# сдвигаются только работы с резервом. Работы перебираются от поздних к ранним (по ES);
+# для очередной работы её вклад снимается с гистограммы загрузки, и выбирается старт
+# в пределах, допускаемых текущими стартами предшественников и последователей, с наименьшим
+# значением критерия:
+#   squares — сумма квадратов загрузки Σu² (гладкость профиля);
+#   peak    — сумма пиков по ресурсам, при равенстве — Σu².
+# Работа сдвигается, только если критерий строго улучшается; при равных вариантах берётся
+# более поздний старт. Проходы повторяются, пока есть улучшения и не исчерпан бюджет времени.
+#
+# Гистограмма хранится массивом (ресурс × слот), ход стоит O(длительность + диапазон сдвига):
+# для Σu² изменение при старте s равно 2·Σ q·(сумма загрузки в окне [s, s+p)) + const, окна
+# считаются префиксными суммами; для пика глобальный максимум без работы берётся из дерева
+# отрезков (ResourceProfile), максимум в окне — скользящим окном.
+
+OBJECTIVES = ("squares", "peak")
+BARS = " ▁▂▃▄▅▆▇█"
+
+
+class ResourceProfile:
+    """
+    Загрузка одного ресурса по слотам 0..horizon-1: дерево отрезков с прибавлением на отрезке
+    и максимумом без проталкивания — top[v] = add[v] + max(top[детей]).
+    """
+
+    def __init__(self, horizon):
+        size = 1
+        while size < max(horizon, 1):
+            size *= 2
+        self.size = size
+        self.top = [0.0] * (2 * size)
+        self.add = [0.0] * (2 * size)
+
+    def update(self, lo, hi, value, v=1, nl=0, nr=None):
+        """Прибавить value к загрузке слотов [lo, hi)."""
+        if nr is None:
+            nr = self.size
+        if hi <= nl or nr <= lo:
+            return
+        if lo <= nl and nr <= hi:
+            self.add[v] += value
+            self.top[v] += value
+            return
+        mid = (nl + nr) // 2
+        self.update(lo, hi, value, 2 * v, nl, mid)
+        self.update(lo, hi, value, 2 * v + 1, mid, nr)
+        self.top[v] = self.add[v] + max(self.top[2 * v], self.top[2 * v + 1])
+
+
+def demands(engine, data):
+    """Ресурсы, упомянутые в полях resources работ, и матрица потребностей (V, R)."""
+    names = sorted({r for act in engine.names for r in (data[act].get('resources') or {})})
+    col = {r: k for k, r in enumerate(names)}
+    req = np.zeros((len(engine.names), len(names)))
+    for i, act in enumerate(engine.names):
+        for r, amount in (data[act].get('resources') or {}).items():
+            if float(amount) < 0:
+                raise ValueError(f"Для работы {act}: отрицательная потребность в ресурсе {r}")
+            req[i, col[r]] = float(amount)
+    return names, req
+
+
+def level(engine, data, objective="squares", step=1.0, budget=2.0, max_passes=100):
+    """
+    Выравнивание в пределах полного резерва. Возвращает словарь: start, finish (время по индексам
+    работ), duration, resources, before, after (гистограммы (R, H) по слотам), step, objective,
+    moved (индексы сдвинутых работ), passes, elapsed, complete (False — остановлено по бюджету).
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Неизвестный критерий '{objective}' (допустимо: {', '.join(OBJECTIVES)})")
+    if step <= 0:
+        raise ValueError("Шаг времени должен быть положительным")
+    names, req = demands(engine, data)
+    if not names:
+        raise ValueError("Ни у одной работы не заданы потребности в ресурсах (поле resources)")
+    p = slot_durations(engine, data, step)
+    duration, es, _, ls, _ = engine.passes(p.astype(float))
+    es = np.rint(es).astype(np.int64)
+    ls = np.rint(ls).astype(np.int64)
+    start = es.copy()
+    hist = usage(start, start + p, req)
+    before = hist.copy()
+
+    profiles = None
+    if objective == "peak":
+        profiles = [ResourceProfile(hist.shape[1]) for _ in names]
+        for v in np.flatnonzero(p > 0).tolist():
+            for r in np.flatnonzero(req[v]).tolist():
+                profiles[r].update(int(start[v]), int(start[v] + p[v]), float(req[v, r]))
+
+    # Кандидаты — работы с резервом и ненулевой потребностью, от поздних к ранним
+    movable = np.flatnonzero((ls > es) & (p > 0) & req.any(axis=1))
+    order = movable[np.lexsort((-movable, -es[movable]))].tolist()
+    preds, succs = engine.preds, engine.succs
+    dur = p.tolist()
+    starts = start.tolist()
+
+    t0 = time.perf_counter()
+    passes = 0
+    complete = True
+    improved = True
+    while improved and passes < max_passes:
+        improved = False
+        passes += 1
+        for v in order:
+            if time.perf_counter() - t0 > budget:
+                complete = False
+                break
+            k, s = dur[v], starts[v]
+            lo = max([int(es[v])] + [starts[u] + dur[u] for u in preds[v]])
+            hi = min([int(ls[v])] + [starts[w] - k for w in succs[v]])
+            if hi <= lo:
+                continue
+            q = req[v]
+            rows = np.flatnonzero(q)
+            hist[rows, s:s + k] -= q[rows, None]
+
+            window = hist[rows, lo:hi + k]
+            sums = np.cumsum(np.pad(window, ((0, 0), (1, 0))), axis=1)
+            cost = q[rows] @ (sums[:, k:] - sums[:, :-k])
+            if profiles is not None:
+                for r in rows.tolist():
+                    profiles[r].update(s, s + k, -float(q[r]))
+                rest = np.array([profiles[r].top[1] for r in rows.tolist()])
+                wmax = sliding_window_view(window, k, axis=1).max(axis=2)
+                peak = np.maximum(rest[:, None], wmax + q[rows, None]).sum(axis=0)
+                keys = (np.round(cost, 6), np.round(peak, 6))
+            else:
+                keys = (np.round(cost, 6),)
+            # Лучший вариант, при равенстве — самый поздний; сдвиг — только при строгом улучшении
+            best = int(np.lexsort((-np.arange(len(cost)),) + keys)[0])
+            better = [key[best] for key in reversed(keys)] < [key[s - lo] for key in reversed(keys)]
+            t = lo + int(best) if better else s
+
+            hist[rows, t:t + k] += q[rows, None]
+            if profiles is not None:
+                for r in rows.tolist():
+                    profiles[r].update(t, t + k, float(q[r]))
+            if t != s:
+                starts[v] = t
+                improved = True
+        if not complete:
+            break
+
+    start = np.array(starts, dtype=np.int64)
+    moved = np.flatnonzero(start != es)
+    return {
+        "start": start * step,
+        "finish": (start + p) * step,
+        "duration": duration * step,
+        "resources": names,
+        "before": before,
+        "after": hist,
+        "step": step,
+        "objective": objective,
+        "moved": moved[np.lexsort((moved, start[moved]))].tolist(),
+        "start_before": es * step,
+        "passes": passes,
+        "elapsed": time.perf_counter() - t0,
+        "complete": complete,
+    }
+
+
+def sparkline(values, top, width=60):
+    """Строка из блоков: values сжимаются до width столбцов (максимум в столбце), top — верх шкалы."""
+    if len(values) == 0:
+        return ""
+    buckets = np.array_split(values, min(width, len(values)))
+    levels = len(BARS) - 1
+    return "".join(BARS[min(levels, max(0, int(np.ceil(b.max() / top * levels - 1e-9)))) if top > 0 else 0]
+                   for b in buckets)
+
+
+def format_levelling(engine, result, limit=30):
+    """Текстовый отчёт: пики и Σu² до/после, гистограммы загрузки, сдвинутые работы."""
+    before, after = result["before"], result["after"]
+    title = {"squares": "сумма квадратов загрузки", "peak": "пиковая загрузка"}[result["objective"]]
+    lines = [f"Критерий: {title}; проходов: {result['passes']}, сдвинуто работ: {len(result['moved'])}, "
+             f"{result['elapsed']:.2f} с" + ("" if result["complete"] else " (остановлено по бюджету времени)"),
+             f"Срок проекта не меняется: {result['duration']:.2f} дней",
+             f"{'Ресурс':<12} {'Пик до':>8} {'Пик после':>10} {'Σu² до':>12} {'Σu² после':>12}"]
+    for r, name in enumerate(result["resources"]):
+        lines.append(f"{name:<12} {before[r].max():>8g} {after[r].max():>10g} "
+                     f"{(before[r] ** 2).sum() * result['step']:>12.1f} {(after[r] ** 2).sum() * result['step']:>12.1f}")
+    for r, name in enumerate(result["resources"]):
+        top = max(before[r].max(), after[r].max())
+        lines.append(f"\n{name} (до / после, шкала 0–{top:g}):")
+        lines.append("  до    |" + sparkline(before[r], top) + "|")
+        lines.append("  после |" + sparkline(after[r], top) + "|")
+    if result["moved"]:
+        lines.append(f"\n{'Работа':<12} {'Начало до':>10} {'после':>8}")
+        for v in result["moved"][:limit]:
+            lines.append(f"{engine.names[v]:<12} {result['start_before'][v]:>10.2f} {result['start'][v]:>8.2f}")
+        if len(result["moved"]) > limit:
+            lines.append(f"... ещё {len(result['moved']) - limit} работ")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Выравнивание ресурсов в пределах резервов (метод Бёрджесса)")
+    parser.add_argument("network", help="файл сети: .json, .jsonl или .csv")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="squares")
+    parser.add_argument("--step", type=float, default=1.0, help="шаг времени (слот)")
+    parser.add_argument("--budget", type=float, default=5.0, help="бюджет времени, с")
+    parser.add_argument("--limit", type=int, default=30, help="сколько сдвинутых работ показать")
+    args = parser.parse_args(argv)
+
+    net = load_network(args.network)
+    engine = net.engine()
+    _, data = net.to_data()
+    result = level(engine, data, args.objective, args.step, args.budget)
+    print(format_levelling(engine, result, args.limit))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
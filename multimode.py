@@ -0,0 +1,417 @@
+import sys
+import time
+import argparse
+import itertools
+from collections import defaultdict
+import numpy as np
+
+from cpm import LongestPaths
+from cpm_io import load_network
+
+# Дискретная задача «время — стоимость»: у каждой работы несколько режимов выполнения
+# (длительность, стоимость), например предложения субподрядчиков. Выбирается режим для каждой
+# работы: минимальная стоимость при сроке не больше deadline или минимальный срок при
+# стоимости не больше budget. Режимы берутся из поля modes ([[длительность, стоимость], ...]);
+# без него у работы два режима — нормальный и ускоренный (линейного наклона между ними нет).
+#
+# Точный метод — динамическое программирование по последовательно-параллельной структуре.
+# Сеть «работы в узлах» превращается в сеть «работы на дугах» с фиктивными дугами связей;
+# последовательные (узел с одной входящей и одной исходящей дугой) и параллельные (дуги
+# с общими концами) сокращения сворачивают её в одну дугу. На каждой дуге хранится множество
+# Парето (длительность, стоимость) частичных решений: последовательно длительности складываются,
+# параллельно берётся максимум, стоимости складываются всегда. Если сеть не сворачивается
+# или множества разрастаются, используется лагранжева эвристика.
+#
+# Лагранжева эвристика снимает ограничения «длина пути ≤ deadline» с множителями μ_P ≥ 0
+# для путей, оказавшихся самыми длинными: при заданных μ работа выбирает режим с минимумом
+# стоимость + F·длительность, где F — сумма μ путей через работу, и значение даёт нижнюю
+# границу стоимости. μ обновляются субградиентом (шаг Поляка), каждое решение релаксации
+# чинится до допустимого (ускорение работ самого длинного пути по наименьшей цене дня, затем
+# замедление работ в пределах свободного резерва до самых дешёвых режимов) — верхняя граница.
+# Разрыв (верхняя - нижняя) / верхняя выводится в отчёте. Для бюджета срок ищется делением
+# отрезка, каждая проба — задача со сроком.
+
+METHODS = ("auto", "exact", "lagrange")
+MAX_POINTS = 20_000    # предел размера множества Парето на дуге в точном методе
+EPS = 1e-9
+ZERO = [(0.0, 0.0, None)]
+
+
+def activity_modes(engine, data):
+    """
+    Режимы в порядке engine.names: (dur, cost, orig) — массивы (V, M), в строке только
+    недоминируемые режимы по возрастанию длительности (стоимость строго убывает), хвост — inf;
+    orig — номер режима в исходном списке работы.
+    """
+    rows = []
+    for act in engine.names:
+        info = data[act]
+        raw = info.get('modes')
+        if raw is None:
+            raw = [(info['duration'], info['cost_normal'])]
+            if info['crash_duration'] < info['duration']:
+                raw.append((info['crash_duration'], info['cost_crash']))
+        pairs = []
+        for m in raw:
+            try:
+                d, c = (m['duration'], m['cost']) if isinstance(m, dict) else m
+                d, c = float(d), float(c)
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"Для работы {act}: режим задаётся парой [длительность, стоимость]") from None
+            if not (np.isfinite(d) and np.isfinite(c)) or d < 0:
+                raise ValueError(f"Для работы {act}: некорректный режим ({d:g}, {c:g})")
+            pairs.append((d, c))
+        if not pairs:
+            raise ValueError(f"Для работы {act}: нет ни одного режима")
+        front = []
+        for k in sorted(range(len(pairs)), key=lambda k: pairs[k]):
+            if not front or pairs[k][1] < pairs[front[-1]][1] - EPS:
+                front.append(k)
+        rows.append((pairs, front))
+
+    n = len(rows)
+    width = max((len(f) for _, f in rows), default=1)
+    dur = np.full((n, width), np.inf)
+    cost = np.full((n, width), np.inf)
+    orig = np.full((n, width), -1, dtype=np.int64)
+    for v, (pairs, front) in enumerate(rows):
+        for j, k in enumerate(front):
+            dur[v, j], cost[v, j] = pairs[k]
+            orig[v, j] = k
+    return dur, cost, orig
+
+
+class TooLarge(Exception):
+    pass
+
+
+def pareto(points):
+    """Недоминируемые точки (длительность, стоимость, откуда) по возрастанию длительности."""
+    points.sort(key=lambda p: (p[0], p[1]))
+    front = []
+    for p in points:
+        if not front or p[1] < front[-1][1] - EPS:
+            front.append(p)
+    if len(front) > MAX_POINTS:
+        raise TooLarge
+    return front
+
+
+def series(a, b, limit):
+    if a is ZERO:
+        return b
+    if b is ZERO:
+        return a
+    return pareto([(pa[0] + pb[0], pa[1] + pb[1], (pa, pb)) for pa in a for pb in b if pa[0] + pb[0] <= limit + EPS])
+
+
+def parallel(a, b):
+    # При длительности t каждая ветвь берёт свой самый дешёвый режим с длительностью ≤ t
+    points = []
+    i = j = -1
+    for t in sorted({p[0] for p in a} | {p[0] for p in b}):
+        while i + 1 < len(a) and a[i + 1][0] <= t:
+            i += 1
+        while j + 1 < len(b) and b[j + 1][0] <= t:
+            j += 1
+        if i >= 0 and j >= 0:
+            points.append((t, a[i][1] + b[j][1], (a[i], b[j])))
+    return pareto(points)
+
+
+def series_parallel(engine, dur, cost, limit=np.inf):
+    """
+    Множество Парето (длительность, стоимость, откуда) всего проекта сворачиванием сети,
+    или None, если сеть не последовательно-параллельная или множества слишком велики.
+    """
+    n = len(engine.names)
+    S, T = 0, 1
+    edges = {}
+    out, inn = defaultdict(set), defaultdict(set)
+    ids = itertools.count()
+
+    def add(a, b, profile):
+        e = next(ids)
+        edges[e] = (a, b, profile)
+        out[a].add(e)
+        inn[b].add(e)
+        return e
+
+    def drop(e):
+        a, b, _ = edges.pop(e)
+        out[a].discard(e)
+        inn[b].discard(e)
+
+    for v in range(n):
+        profile = [(dur[v, k], cost[v, k], ("mode", v, k)) for k in range(dur.shape[1])
+                   if np.isfinite(dur[v, k]) and dur[v, k] <= limit + EPS]
+        if not profile:
+            return []
+        add(2 + 2 * v, 3 + 2 * v, profile)
+    src = np.repeat(np.arange(n), np.diff(engine.succ_ptr))
+    for u, w in zip(src.tolist(), engine.succ_idx.tolist()):
+        add(3 + 2 * u, 2 + 2 * w, ZERO)
+    for v in np.flatnonzero(engine.pred_ptr[1:] == engine.pred_ptr[:-1]).tolist():
+        add(S, 2 + 2 * v, ZERO)
+    for v in engine.sinks.tolist():
+        add(3 + 2 * v, T, ZERO)
+
+    stack = list(range(2 + 2 * n))
+    try:
+        while stack:
+            x = stack.pop()
+            ends = {}
+            for e in list(out[x]):
+                b = edges[e][1]
+                if b in ends:
+                    f = ends[b]
+                    profile = parallel(edges[f][2], edges[e][2])
+                    drop(e)
+                    edges[f] = (x, b, profile)
+                    stack.append(b)
+                else:
+                    ends[b] = e
+            if x not in (S, T) and len(inn[x]) == 1 and len(out[x]) == 1:
+                e1, e2 = next(iter(inn[x])), next(iter(out[x]))
+                a, b = edges[e1][0], edges[e2][1]
+                profile = series(edges[e1][2], edges[e2][2], limit)
+                drop(e1)
+                drop(e2)
+                add(a, b, profile)
+                stack += [a, b]
+    except TooLarge:
+        return None
+    if len(edges) != 1:
+        return None
+    (a, b, profile), = edges.values()
+    return profile if (a, b) == (S, T) else None
+
+
+def chosen(point, n):
+    """Номера режимов (в строках activity_modes) из точки множества Парето."""
+    k = np.zeros(n, dtype=np.int64)
+    stack = [point]
+    while stack:
+        back = stack.pop()[2]
+        if back is None:
+            continue
+        if back[0] == "mode":
+            k[back[1]] = back[2]
+        else:
+            stack += back
+    return k
+
+
+def repair(engine, dur, cost, k, deadline):
+    """
+    Сделать выбор режимов k допустимым и подешевле. Пока срок > deadline, на самом длинном пути
+    ускоряются работы по наименьшей цене дня на величину превышения. Затем работы замедляются
+    до самых дешёвых режимов, помещающихся в свободный резерв (до ES последователей или до
+    deadline): такие сдвиги не меняют ничьих ES и допустимы все сразу; раунды повторяются,
+    пока что-то меняется. Возвращает новый k.
+    """
+    k = k.copy()
+    rows = np.arange(len(k))
+    while True:
+        d = dur[rows, k]
+        length, path = LongestPaths(engine, d).take(1)[0]
+        excess = length - deadline
+        if excess <= EPS:
+            break
+        options = [v for v in path if k[v] > 0]
+        if not options:
+            raise ValueError(f"Срок {deadline:g} недостижим даже в самых быстрых режимах")
+        while excess > EPS and options:
+            price = [(cost[v, k[v] - 1] - cost[v, k[v]]) / (dur[v, k[v]] - dur[v, k[v] - 1]) for v in options]
+            v = options[int(np.argmin(price))]
+            excess -= dur[v, k[v]] - dur[v, k[v] - 1]
+            k[v] -= 1
+            if k[v] == 0:
+                options.remove(v)
+
+    src = np.repeat(rows, np.diff(engine.succ_ptr))
+    while True:
+        d = dur[rows, k]
+        _, es, ef, _, _ = engine.passes(d)
+        room = np.full(len(k), float(deadline))
+        np.minimum.at(room, src, es[engine.succ_idx])
+        fits = (dur <= (d + room - ef)[:, None] + EPS).sum(axis=1) - 1
+        if not np.any(fits > k):
+            return k
+        k = np.maximum(k, fits)
+
+
+def lagrange(engine, dur, cost, deadline, time_limit=10.0, iterations=500, tol=1e-4):
+    """Минимальная стоимость при сроке ≤ deadline: (k, верхняя граница, нижняя граница, итераций)."""
+    n = len(engine.names)
+    rows = np.arange(n)
+    valid = np.isfinite(dur)
+    last = valid.sum(axis=1) - 1
+    if engine.passes(dur[:, 0])[0] > deadline + EPS:
+        raise ValueError(f"Срок {deadline:g} недостижим даже в самых быстрых режимах")
+    best = min((repair(engine, dur, cost, start, deadline) for start in (np.zeros(n, dtype=np.int64), last)),
+               key=lambda k: cost[rows, k].sum())
+    upper = float(cost[rows, best].sum())
+    lower = -np.inf
+    F = np.zeros(n)
+    paths = {}             # путь -> [μ, индексы работ]
+    theta, stall = 2.0, 0
+    t0 = time.perf_counter()
+    it = 0
+    for it in range(1, iterations + 1):
+        red = np.where(valid, cost + F[:, None] * np.where(valid, dur, 0.0), np.inf)
+        k = np.argmin(red, axis=1)
+        value = float(red[rows, k].sum()) - deadline * sum(mu for mu, _ in paths.values())
+        if value > lower + EPS:
+            lower, stall = value, 0
+        else:
+            stall += 1
+            if stall >= 10:
+                theta, stall = theta / 2, 0
+        cand = repair(engine, dur, cost, k, deadline)
+        c = float(cost[rows, cand].sum())
+        if c < upper - EPS:
+            upper, best = c, cand
+        if upper - lower <= tol * max(1.0, abs(upper)) or time.perf_counter() - t0 > time_limit:
+            break
+
+        d = dur[rows, k]
+        length, path = LongestPaths(engine, d).take(1)[0]
+        if length > deadline + EPS and tuple(path) not in paths:
+            paths[tuple(path)] = [0.0, np.array(path)]
+        grad = {key: float(d[idx].sum()) - deadline for key, (_, idx) in paths.items()}
+        active = [key for key in paths if paths[key][0] > 0 or grad[key] > 0]
+        norm = sum(grad[key] ** 2 for key in active)
+        if norm <= EPS:
+            break
+        step = theta * (upper - value) / norm
+        for key in active:
+            mu, idx = paths[key]
+            new = max(0.0, mu + step * grad[key])
+            F[idx] += new - mu
+            paths[key][0] = new
+        np.maximum(F, 0.0, out=F)
+        for key in [key for key in paths if paths[key][0] == 0 and grad[key] <= 0]:
+            del paths[key]
+    return best, upper, lower, it
+
+
+def solve(engine, data, deadline=None, budget=None, method="auto", time_limit=10.0):
+    """
+    Выбор режимов работ: при deadline — минимальная стоимость со сроком ≤ deadline, при budget —
+    минимальный срок со стоимостью ≤ budget. Возвращает словарь: modes (номера режимов в списках
+    работ), durations, costs, duration, cost, objective, target, method, exact, lower_bound
+    (нижняя граница стоимости или срока), gap, elapsed.
+    """
+    if (deadline is None) == (budget is None):
+        raise ValueError("Нужно задать либо срок, либо бюджет")
+    if method not in METHODS:
+        raise ValueError(f"Неизвестный метод '{method}' (допустимо: {', '.join(METHODS)})")
+    t0 = time.perf_counter()
+    dur, cost, orig = activity_modes(engine, data)
+    n = len(engine.names)
+    rows = np.arange(n)
+    last = np.isfinite(dur).sum(axis=1) - 1
+    makespan = lambda k: engine.passes(dur[rows, k])[0]
+
+    k = None
+    exact = False
+    if method != "lagrange":
+        front = series_parallel(engine, dur, cost, deadline if deadline is not None else np.inf)
+        if front is None and method == "exact":
+            raise ValueError("Сеть не последовательно-параллельная (или слишком много вариантов) — "
+                             "точный метод неприменим")
+        if front is not None:
+            fits = [p for p in front if p[1] <= budget + EPS] if budget is not None else front[-1:]
+            if not fits:
+                what = f"Срок {deadline:g} недостижим даже в самых быстрых режимах" if deadline is not None else \
+                    f"Бюджет {budget:g} меньше стоимости самых дешёвых режимов"
+                raise ValueError(what)
+            k, exact = chosen(fits[0], n), True
+            name = "ДП по последовательно-параллельной структуре"
+
+    if k is None:
+        name = "лагранжева релаксация + починка"
+        if deadline is not None:
+            k, _, bound, _ = lagrange(engine, dur, cost, deadline, time_limit)
+        else:
+            if cost[rows, last].sum() > budget + EPS:
+                raise ValueError(f"Бюджет {budget:g} меньше стоимости самых дешёвых режимов")
+            # Деление отрезка по сроку: проба допустима, если эвристика уложилась в бюджет,
+            # и доказанно недопустима, если нижняя граница стоимости больше бюджета
+            k = last.copy()
+            lo = bound = makespan(np.zeros(n, dtype=np.int64))
+            hi = makespan(k)
+            probes = 30
+            for _ in range(probes):
+                if hi - lo <= 1e-6 * max(1.0, hi):
+                    break
+                mid = (lo + hi) / 2
+                cand, upper, lower, _ = lagrange(engine, dur, cost, mid, time_limit / probes)
+                if upper <= budget + EPS:
+                    k, hi = cand, makespan(cand)
+                else:
+                    lo = mid
+                    if lower > budget + EPS:
+                        bound = mid
+
+    total = float(cost[rows, k].sum())
+    duration = makespan(k)
+    value = duration if budget is not None else total
+    return {
+        "modes": orig[rows, k],
+        "durations": dur[rows, k],
+        "costs": cost[rows, k],
+        "duration": duration,
+        "cost": total,
+        "objective": "budget" if budget is not None else "deadline",
+        "target": budget if budget is not None else deadline,
+        "method": name,
+        "exact": exact,
+        "lower_bound": value if exact else bound,
+        "gap": 0.0 if exact else max(0.0, value - bound) / max(abs(value), EPS),
+        "elapsed": time.perf_counter() - t0,
+    }
+
+
+def format_solution(engine, result, limit=40):
+    """Текстовый отчёт: срок, стоимость, граница и разрыв, выбранные режимы."""
+    if result["objective"] == "deadline":
+        head = f"Минимальная стоимость при сроке ≤ {result['target']:g}"
+        bound = f"нижняя граница стоимости: {result['lower_bound']:.2f}"
+    else:
+        head = f"Минимальный срок при бюджете ≤ {result['target']:g}"
+        bound = f"нижняя граница срока: {result['lower_bound']:.2f}"
+    lines = [head,
+             f"Метод: {result['method']}" + (" (точно)" if result["exact"] else ""),
+             f"Срок: {result['duration']:.2f} дней, стоимость: {result['cost']:.2f}",
+             f"{bound}, разрыв: {result['gap']:.2%}, время: {result['elapsed']:.2f} с",
+             f"\n{'Работа':<12} {'Режим':>6} {'Длительность':>13} {'Стоимость':>11}"]
+    for i, act in enumerate(engine.names[:limit]):
+        lines.append(f"{act:<12} {result['modes'][i] + 1:>6} {result['durations'][i]:>13.2f} {result['costs'][i]:>11.2f}")
+    if len(engine.names) > limit:
+        lines.append(f"... ещё {len(engine.names) - limit} работ")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Выбор дискретных режимов работ: стоимость при сроке или срок при бюджете")
+    parser.add_argument("network", help="файл сети: .json, .jsonl или .csv")
+    goal = parser.add_mutually_exclusive_group(required=True)
+    goal.add_argument("--deadline", type=float, help="директивный срок")
+    goal.add_argument("--budget", type=float, help="бюджет")
+    parser.add_argument("--method", choices=METHODS, default="auto")
+    parser.add_argument("--time", type=float, default=10.0, help="бюджет времени эвристики, с")
+    parser.add_argument("--limit", type=int, default=40, help="сколько работ показать")
+    args = parser.parse_args(argv)
+
+    net = load_network(args.network)
+    engine = net.engine()
+    _, data = net.to_data()
+    result = solve(engine, data, args.deadline, args.budget, args.method, args.time)
+    print(format_solution(engine, result, args.limit))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
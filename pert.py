@@ -0,0 +1,237 @@
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from cpm_io import load_network
+
+# Стохастический метод критического пути (PERT, Монте-Карло).
+#
+# Длительность каждой работы — случайная величина по трёхточечной оценке
+# (optimistic ≤ most_likely ≤ pessimistic) с распределением "beta" (PERT), "triangular"
+# или "uniform". Если оценки у работы нет, берётся ±spread от её duration.
+#
+# Выборки обрабатываются блоками: матрица длительностей V×S (работы × выборки) проходится
+# по топологическим уровням CPMEngine так же, как в CPMEngine.passes, только каждая операция
+# сразу над всеми выборками блока (строка работы непрерывна в памяти, поэтому выборка
+# предшественников — это копирование целых строк). Обратный проход считает «хвосты» q
+# (самый длинный путь от начала работы до конца проекта), критична работа с ES + q = T.
+# Бета-PERT выбирается по таблице квантилей, построенной один раз на каждую моду. Размер блока подбирается
+# так, чтобы матрица занимала порядка cells элементов, блоки можно раздать по процессам.
+
+DISTRIBUTIONS = ("beta", "triangular", "uniform")
+PERCENTILES = (5, 10, 25, 50, 75, 80, 90, 95, 99)
+QUANTILES = 1025       # точек в таблице квантилей бета-распределения
+
+
+def three_point(engine, data, spread=0.2):
+    """
+    Параметры длительностей в порядке engine.names: {"low", "width", "mode", "kind", "modes", "row"},
+    mode — положение наиболее вероятного значения на [0, 1], kind — номер в DISTRIBUTIONS,
+    modes/row — различные моды бета-работ и номер моды для каждой работы.
+    Работы без полей optimistic/pessimistic получают a = (1 - spread)·d, b = (1 + spread)·d.
+    """
+    n = len(engine.names)
+    a, m, b = np.empty(n), np.empty(n), np.empty(n)
+    kind = np.empty(n, dtype=np.int64)
+    for i, act in enumerate(engine.names):
+        info = data[act]
+        d = float(info['duration'])
+        m[i] = float(info.get('most_likely', d))
+        a[i] = float(info.get('optimistic', (1 - spread) * m[i]))
+        b[i] = float(info.get('pessimistic', (1 + spread) * m[i]))
+        dist = info.get('distribution', "beta")
+        if dist not in DISTRIBUTIONS:
+            raise ValueError(f"Для работы {act}: неизвестное распределение '{dist}' "
+                             f"(допустимо: {', '.join(DISTRIBUTIONS)})")
+        if not 0 <= a[i] <= m[i] <= b[i]:
+            raise ValueError(f"Для работы {act}: нужно 0 ≤ optimistic ≤ most_likely ≤ pessimistic")
+        kind[i] = DISTRIBUTIONS.index(dist)
+    width = b - a
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mode = np.where(width > 0, (m - a) / width, 0.5)
+    modes, row = np.unique(np.where(kind == 0, mode, 0.5), return_inverse=True)
+    return {"low": a, "width": width, "mode": mode, "kind": kind, "modes": modes, "row": row.ravel()}
+
+
+def beta_quantiles(modes, points=QUANTILES, grid=8 * QUANTILES):
+    """
+    Таблицы квантилей бета-PERT (α = 1 + 4·мода, β = 1 + 4·(1 - мода)), строка на моду:
+    CDF считается численно на сетке из grid точек и обращается интерполяцией.
+    """
+    x = np.linspace(0.0, 1.0, grid)
+    levels = np.linspace(0.0, 1.0, points)
+    table = np.empty((len(modes), points))
+    for k, c in enumerate(modes):
+        pdf = x ** (4 * c) * (1 - x) ** (4 * (1 - c))
+        cdf = np.concatenate([[0.0], np.cumsum(pdf[1:] + pdf[:-1])])
+        table[k] = np.interp(levels, cdf / cdf[-1], x)
+    return table
+
+
+def sample_durations(rng, params, n, table):
+    """
+    Матрица длительностей (V, n). Бета-PERT берётся обратным преобразованием по таблице
+    квантилей table (beta_quantiles) — в несколько раз быстрее, чем rng.beta.
+    """
+    kind = params["kind"]
+    x = np.empty((len(kind), n))
+
+    cols = np.flatnonzero(kind == 0)
+    if len(cols):
+        points = table.shape[1]
+        u = rng.random((len(cols), n), dtype=np.float32) * (points - 1)
+        i = u.astype(np.int64)
+        np.minimum(i, points - 2, out=i)
+        i += (params["row"][cols] * points)[:, None]
+        flat = table.ravel()
+        lo = flat[i]
+        x[cols] = lo + (flat[i + 1] - lo) * (u - (i % points))
+    cols = np.flatnonzero(kind == 1)
+    if len(cols):
+        # Треугольное — обратной функцией распределения (работает и при a == b)
+        u = rng.random((len(cols), n))
+        c = params["mode"][cols, None]
+        x[cols] = np.where(u < c, np.sqrt(u * c), 1 - np.sqrt((1 - u) * (1 - c)))
+    cols = np.flatnonzero(kind == 2)
+    if len(cols):
+        x[cols] = rng.random((len(cols), n))
+    return params["low"][:, None] + x * params["width"][:, None]
+
+
+def sweep(engine, d):
+    """
+    Прямой и обратный проходы сразу для всех столбцов d (V, S).
+    Возвращает (T — длительности проекта (S,), маска критических работ (V, S)).
+    """
+    es = np.zeros_like(d)
+    ef = np.empty_like(d)
+    for nodes, (src, seg), _, _ in engine.levels:
+        if len(src):
+            es[nodes] = np.maximum.reduceat(ef[src], seg)
+        ef[nodes] = es[nodes] + d[nodes]
+    T = ef[engine.sinks].max(axis=0)
+
+    q = d.copy()
+    for _, _, inner, (dst, seg) in reversed(engine.levels):
+        if len(inner):
+            q[inner] += np.maximum.reduceat(q[dst], seg)
+    es += q
+    return T, es >= T * (1 - 1e-12)
+
+
+def simulate(engine, params, samples, seed, cells=10_000_000):
+    """
+    samples выборок блоками по ≈ cells элементов матрицы. Возвращает
+    (длительности проекта (samples,), число выборок, в которых работа критична (V,)).
+    Модульная функция, чтобы её можно было отправлять в рабочие процессы.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(engine.names)
+    chunk = max(1, cells // max(n, 1))
+    table = beta_quantiles(params["modes"])
+    durations = np.empty(samples)
+    critical = np.zeros(n, dtype=np.int64)
+    for lo in range(0, samples, chunk):
+        hi = min(samples, lo + chunk)
+        T, crit = sweep(engine, sample_durations(rng, params, hi - lo, table))
+        durations[lo:hi] = T
+        critical += crit.sum(axis=1)
+    return durations, critical
+
+
+def monte_carlo(engine, params, samples, seed=0, cells=10_000_000, workers=1):
+    """Монте-Карло по сети; при workers > 1 выборки делятся между процессами с независимыми потоками."""
+    if not engine.names:
+        raise ValueError("Нет работ для моделирования")
+    if samples < 1:
+        raise ValueError("Число выборок должно быть положительным")
+    if cells < 1:
+        raise ValueError("Размер блока (cells) должен быть положительным")
+    if workers < 1:
+        raise ValueError("Число процессов должно быть положительным")
+    if workers == 1:
+        return simulate(engine, params, samples, seed, cells)
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [samples // workers + (1 if i < samples % workers else 0) for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(simulate, [engine] * workers, [params] * workers, shares, seeds, [cells] * workers))
+    return np.concatenate([p[0] for p in parts]), sum(p[1] for p in parts)
+
+
+def summarize(durations, critical, target=None):
+    """Статистики распределения срока завершения и индексы критичности (доля выборок)."""
+    samples = len(durations)
+    stats = {
+        "samples": samples,
+        "mean": float(durations.mean()),
+        "std": float(durations.std()),
+        "min": float(durations.min()),
+        "max": float(durations.max()),
+        "percentiles": dict(zip(PERCENTILES, np.percentile(durations, PERCENTILES).tolist())),
+        "criticality": critical / samples,
+        "target": target,
+    }
+    if target is not None:
+        stats["p_target"] = float(np.count_nonzero(durations <= target + 1e-9) / samples)
+    stats["histogram"] = np.histogram(durations, bins=12)
+    return stats
+
+
+def format_report(engine, stats, deterministic=None, top=30):
+    """Текстовый отчёт: распределение срока, вероятность уложиться в цель, индексы критичности."""
+    lines = [f"Выборок: {stats['samples']}"]
+    if deterministic is not None:
+        lines.append(f"Детерминированная длительность: {deterministic:.2f} дней")
+    lines.append(f"Срок завершения: среднее {stats['mean']:.2f}, ст. откл. {stats['std']:.2f}, "
+                 f"мин. {stats['min']:.2f}, макс. {stats['max']:.2f}")
+    lines.append("Процентили: " + ", ".join(f"P{p}={v:.2f}" for p, v in stats["percentiles"].items()))
+    if stats["target"] is not None:
+        lines.append(f"P(срок ≤ {stats['target']:.2f}) = {stats['p_target']:.4f}")
+
+    counts, edges = stats["histogram"]
+    scale = 40 / max(counts.max(), 1)
+    lines.append("\nРаспределение срока завершения:")
+    for c, lo, hi in zip(counts, edges[:-1], edges[1:]):
+        lines.append(f"  {lo:8.2f} – {hi:8.2f} | {'#' * int(round(c * scale)):<40} {c / stats['samples']:.3f}")
+
+    crit = stats["criticality"]
+    order = np.argsort(-crit, kind="stable")[:top]
+    lines.append(f"\n{'Работа':<12} {'Индекс критичности':>20}")
+    for i in order:
+        lines.append(f"{engine.names[i]:<12} {crit[i]:>20.3f}")
+    if len(crit) > top:
+        lines.append(f"... ещё {len(crit) - top} работ")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Монте-Карло метода критического пути (PERT)")
+    parser.add_argument("network", help="файл сети: .json (формат contcut/itercut), .jsonl или .csv")
+    parser.add_argument("--samples", type=int, default=100_000, help="число выборок")
+    parser.add_argument("--target", type=float, help="целевой срок для P(срок ≤ цели)")
+    parser.add_argument("--spread", type=float, default=0.2,
+                        help="разброс ±доля от duration для работ без трёхточечной оценки")
+    parser.add_argument("--workers", type=int, default=1, help="число процессов")
+    parser.add_argument("--cells", type=int, default=10_000_000, help="элементов в матрице одного блока")
+    parser.add_argument("--seed", type=int, default=12345)
+    parser.add_argument("--top", type=int, default=30, help="сколько работ показать в таблице критичности")
+    args = parser.parse_args(argv)
+
+    net = load_network(args.network)
+    engine = net.engine()
+    activities, data = net.to_data()
+    params = three_point(engine, data, args.spread)
+
+    t = time.perf_counter()
+    durations, critical = monte_carlo(engine, params, args.samples, args.seed, args.cells, args.workers)
+    dt = time.perf_counter() - t
+    deterministic = engine.passes(net.durations())[0]
+    print(format_report(engine, summarize(durations, critical, args.target), deterministic, args.top))
+    print(f"\nРабот: {len(activities)}, {dt:.2f} с")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
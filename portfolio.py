@@ -0,0 +1,243 @@
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+from cpm_io import FORMATS, load_network
+from crashing import min_cost_crash
+from levelling import demands, sparkline
+from rcpsp import usage
+
+# Портфель проектов на общем календаре.
+#
+# Каждый проект — отдельный файл сети (.json в формате contcut, .jsonl или .csv, см. cpm_io).
+# В JSON можно указать ключи верхнего уровня "start" — день начала проекта на общем календаре
+# (по умолчанию 0) и "deadline" — директивный срок проекта; если срок меньше длительности по КП,
+# проект ускоряется с минимальными доп. затратами (min_cost_crash). Общий срок --deadline
+# действует для проектов без собственного.
+#
+# Проекты считаются в пуле процессов. Результат проекта — словарь из простых типов, он пишется
+# в каталог кэша под хэшем SHA-1 от содержимого файла и параметров расчёта; при повторном запуске
+# пересчитываются только изменённые файлы. Сводка: срок портфеля (от первого начала до последнего
+# окончания), суммарная стоимость и общая загрузка ресурсов по слотам шага step.
+
+CACHE_DIR = ".portfolio_cache"
+
+
+def collect_files(sources):
+    """Разворачивает каталоги (все файлы сетей внутри) и glob-шаблоны в отсортированный список."""
+    files = []
+    for src in sources:
+        if os.path.isdir(src):
+            for fmt in FORMATS:
+                files.extend(glob.glob(os.path.join(src, f"*.{fmt}")))
+        else:
+            files.extend(glob.glob(src, recursive=True))
+    return sorted(set(files))
+
+
+def project_key(path, deadline=None, step=1.0):
+    """Хэш проекта: содержимое файла и параметры расчёта (имя файла не входит)."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(repr((os.path.splitext(path)[1].lower(), deadline, step)).encode('utf-8'))
+    return h.hexdigest()
+
+
+def header(path):
+    """Ключи "start" и "deadline" верхнего уровня JSON-проекта (для других форматов — по умолчанию)."""
+    if not path.lower().endswith(".json"):
+        return 0.0, None
+    with open(path, 'r', encoding='utf-8') as f:
+        d = json.load(f)
+    start = float(d.get('start', 0.0)) if isinstance(d, dict) else 0.0
+    deadline = d.get('deadline') if isinstance(d, dict) else None
+    if start < 0:
+        raise ValueError("Начало проекта (start) не может быть отрицательным")
+    return start, None if deadline is None else float(deadline)
+
+
+def analyse_project(path, deadline=None, step=1.0):
+    """
+    Расчёт одного проекта (выполняется в рабочем процессе): КП, при сроке — ускорение,
+    загрузка ресурсов при ранних стартах. Ошибка не поднимается, а попадает в поле error.
+    """
+    t = time.perf_counter()
+    result = {"file": path, "status": "ok", "error": ""}
+    try:
+        start, own = header(path)
+        deadline = own if own is not None else deadline
+        net = load_network(path)
+        engine = net.engine()
+        activities, data = net.to_data()
+        d = net.durations()
+        normal, es, ef, ls, lf = engine.passes(d)
+        result.update(activities=len(activities), normal_duration=normal, deadline=deadline,
+                      normal_cost=float(net.columns["cost_normal"].sum()), extra_cost=0.0, crashed=0,
+                      feasible=True)
+        if deadline is not None and deadline < normal - 1e-9:
+            plan = min_cost_crash(engine, data, deadline)
+            d = plan["durations"]
+            normal, es, ef, ls, lf = engine.passes(d)
+            result.update(extra_cost=plan["extra_cost"], crashed=int(np.count_nonzero(plan["crash"])),
+                          feasible=bool(plan["feasible"]))
+        result.update(start=start, duration=normal, finish=start + normal,
+                      cost=result["normal_cost"] + result["extra_cost"],
+                      critical=[activities[v] for v in np.flatnonzero(np.abs(ef - lf) < 1e-6)])
+
+        names, req = demands(engine, data)
+        profile = {}
+        if names:
+            first = np.floor(es / step + 1e-9).astype(np.int64)
+            last = np.maximum(first, np.ceil(ef / step - 1e-9).astype(np.int64))
+            hist = usage(first, last, req)[:, :max(1, int(last.max()))]
+            profile = {r: hist[k].tolist() for k, r in enumerate(names)}
+        result["resources"] = profile
+    except Exception as e:
+        result.update(status="error", error=f"{type(e).__name__}: {e}")
+    result["elapsed"] = time.perf_counter() - t
+    return result
+
+
+def cache_get(cache_dir, key):
+    if not cache_dir:
+        return None
+    try:
+        with open(os.path.join(cache_dir, key + ".json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cache_put(cache_dir, key, result):
+    if not cache_dir:
+        return
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp = os.path.join(cache_dir, key + ".tmp")
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False)
+    os.replace(tmp, os.path.join(cache_dir, key + ".json"))
+
+
+def run_portfolio(sources, deadline=None, step=1.0, workers=None, cache_dir=CACHE_DIR, stream=None):
+    """
+    Расчёт портфеля: проекты не из кэша считаются в пуле процессов (ошибка в одном файле
+    не прерывает расчёт). Возвращает (результаты в порядке файлов, сводка aggregate).
+    """
+    if step <= 0:
+        raise ValueError("Шаг времени должен быть положительным")
+    files = collect_files(sources)
+    if not files:
+        raise ValueError("Файлы проектов не найдены")
+
+    results = {}
+    keys = {}
+    for path in files:
+        keys[path] = project_key(path, deadline, step)
+        cached = cache_get(cache_dir, keys[path])
+        if cached is not None:
+            cached.update(file=path, cached=True)
+            results[path] = cached
+    todo = [p for p in files if p not in results]
+    if stream and len(todo) < len(files):
+        print(f"Из кэша: {len(files) - len(todo)} из {len(files)}", file=stream, flush=True)
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(analyse_project, path, deadline, step): path for path in todo}
+            for done, fut in enumerate(as_completed(futures), 1):
+                path = futures[fut]
+                try:
+                    r = fut.result()
+                except Exception as e:
+                    # Рабочий процесс упал целиком (например, BrokenProcessPool)
+                    r = {"file": path, "status": "error", "error": f"{type(e).__name__}: {e}", "elapsed": 0.0}
+                if r["status"] == "ok":
+                    cache_put(cache_dir, keys[path], r)
+                r["cached"] = False
+                results[path] = r
+                if stream:
+                    msg = f"{r['duration']:.2f} дней" if r["status"] == "ok" else f"ОШИБКА {r['error']}"
+                    print(f"[{done}/{len(todo)}] {path}: {msg}", file=stream, flush=True)
+
+    ordered = [results[p] for p in files]
+    return ordered, aggregate(ordered, step)
+
+
+def aggregate(results, step=1.0):
+    """
+    Сводка по успешно рассчитанным проектам: start/finish/duration портфеля, cost, extra_cost,
+    resources — общая загрузка {ресурс: массив по слотам от начала портфеля}, failed — число ошибок.
+    """
+    ok = [r for r in results if r["status"] == "ok"]
+    summary = {"projects": len(ok), "failed": len(results) - len(ok), "step": step,
+               "start": 0.0, "finish": 0.0, "duration": 0.0, "cost": 0.0, "extra_cost": 0.0, "resources": {}}
+    if not ok:
+        return summary
+    start = min(r["start"] for r in ok)
+    finish = max(r["finish"] for r in ok)
+    offsets = [int(np.floor((r["start"] - start) / step + 1e-9)) for r in ok]
+    horizon = max([1] + [off + len(p) for r, off in zip(ok, offsets) for p in r["resources"].values()])
+    profile = {}
+    for r, off in zip(ok, offsets):
+        for name, p in r["resources"].items():
+            total = profile.setdefault(name, np.zeros(horizon))
+            total[off:off + len(p)] += p
+    summary.update(start=start, finish=finish, duration=finish - start,
+                   cost=sum(r["cost"] for r in ok), extra_cost=sum(r["extra_cost"] for r in ok),
+                   resources=dict(sorted(profile.items())))
+    return summary
+
+
+def format_portfolio(results, summary, limit=50):
+    """Текстовый отчёт: таблица проектов, итог портфеля и общая загрузка ресурсов."""
+    lines = [f"{'Проект':<28} {'Работ':>7} {'Начало':>8} {'Срок':>8} {'Конец':>8} {'Стоимость':>12} {'Доп.':>10}"]
+    for r in results[:limit]:
+        name = os.path.basename(r["file"])[:28]
+        if r["status"] != "ok":
+            lines.append(f"{name:<28} ОШИБКА {r['error']}")
+            continue
+        mark = "" if r["feasible"] else " (срок недостижим)"
+        lines.append(f"{name:<28} {r['activities']:>7} {r['start']:>8.2f} {r['duration']:>8.2f} {r['finish']:>8.2f} "
+                     f"{r['cost']:>12.2f} {r['extra_cost']:>10.2f}" + (" *" if r.get("cached") else "") + mark)
+    if len(results) > limit:
+        lines.append(f"... ещё {len(results) - limit} проектов")
+    cached = sum(1 for r in results if r.get("cached"))
+    lines.append(f"\nПроектов: {summary['projects']}" + (f", с ошибками: {summary['failed']}" if summary["failed"] else "")
+                 + (f", из кэша (*): {cached}" if cached else ""))
+    lines.append(f"Портфель: {summary['start']:.2f} – {summary['finish']:.2f}, срок {summary['duration']:.2f} дней")
+    lines.append(f"Стоимость: {summary['cost']:.2f} (в т.ч. ускорение {summary['extra_cost']:.2f})")
+    for name, p in summary["resources"].items():
+        top = float(p.max())
+        lines.append(f"\n{name}: пик {top:g}, среднее {p.mean():.2f} (шкала 0–{top:g})")
+        lines.append("  |" + sparkline(p, top) + "|")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Портфель проектов: КП, ускорение и общая загрузка ресурсов")
+    parser.add_argument("sources", nargs="+", metavar="ПУТЬ", help="каталоги или glob-шаблоны файлов сетей")
+    parser.add_argument("--deadline", type=float, help="директивный срок для проектов без своего ключа deadline")
+    parser.add_argument("--step", type=float, default=1.0, help="шаг времени для загрузки ресурсов")
+    parser.add_argument("--workers", type=int, default=None, help="число рабочих процессов")
+    parser.add_argument("--cache", default=CACHE_DIR, help="каталог кэша результатов")
+    parser.add_argument("--no-cache", action="store_true", help="не читать и не писать кэш")
+    args = parser.parse_args(argv)
+
+    t = time.perf_counter()
+    results, summary = run_portfolio(args.sources, args.deadline, args.step, args.workers,
+                                     None if args.no_cache else args.cache, stream=sys.stderr)
+    print(format_portfolio(results, summary))
+    print(f"Рассчитано за {time.perf_counter() - t:.2f} с")
+    return 0 if not summary["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+import sys
+import math
+import time
+import heapq
+import bisect
+import argparse
+import numpy as np
+
+from cpm_io import load_network, capacities as parse_capacities
+
+# Календарное планирование с ограниченными ресурсами (RCPSP).
+#
+# У работы могут быть потребности data[работа]["resources"] = {ресурс: единиц}, у проекта —
+# мощности {ресурс: единиц} (ключ "resources" верхнего уровня в JSON или --capacity).
+# Время делится на слоты шага step; длительность работы — целое число слотов (с округлением вверх).
+#
+# Расписание строится схемой генерации (SGS) по правилу приоритета поверх ES/LS метода
+# критического пути:
+#   serial   — работы по одной в порядке приоритета среди готовых, каждая в самое раннее
+#              допустимое по ресурсам время не раньше окончания предшественников;
+#   parallel — время идёт по событиям, в каждый момент запускаются все готовые работы,
+#              которые помещаются, в порядке приоритета.
+# Правила: LFT — раньше позднее окончание, MSLK — меньше полный резерв, GRPW — больше
+# длительность работы вместе с длительностями её непосредственных последователей.
+#
+# В последовательной схеме загрузка хранится массивом (ресурс × слот). Самый ранний старт
+# ищется сразу по всем ресурсам работы окнами от готовности по связям: допустимые слоты
+# и отрезок нужной длины находятся векторно, окно удваивается и начинается за последним
+# недопустимым слотом. Работа запроса линейна по просмотренной части профиля (от готовности
+# до найденного старта), но идёт в NumPy, а не по узлам дерева; 10⁴ работ с тремя
+# ресурсами — около секунды на правило.
+
+RULES = ("LFT", "MSLK", "GRPW")
+SCHEMES = ("serial", "parallel")
+MAX_SLOTS = 10_000_000
+EPS = 1e-9
+
+
+def fit(load, rows, limits, lo, length, span=256):
+    """
+    Первый слот s ≥ lo, с которого length слотов подряд загрузка load[rows] (массив (R, H))
+    не больше limits по всем ресурсам сразу. Профиль просматривается окнами: в окне слоты,
+    допустимые по всем ресурсам, и первый отрезок из length допустимых ищутся векторно;
+    если его нет, следующее окно (вдвое длиннее) начинается за последним недопустимым слотом.
+    """
+    H = load.shape[1]
+    span = max(span, 4 * length)
+    while True:
+        hi = min(H, lo + span)
+        ok = (load[rows, lo:hi] <= limits[:, None] + EPS).all(axis=0)
+        bad = np.concatenate([[0], np.cumsum(~ok)])
+        if hi - lo >= length:
+            free = np.flatnonzero(bad[length:] == bad[:-length])
+            if len(free):
+                return lo + int(free[0])
+        if hi == H:
+            return H
+        last = np.flatnonzero(~ok)
+        lo = lo + int(last[-1]) + 1 if len(last) else hi - length + 1
+        span *= 2
+
+
+def resource_model(engine, data, caps):
+    """
+    Потребности работ (V, R) и мощности (R,) по ресурсам, упомянутым в caps.
+    Ресурс работы без заданной мощности или потребность больше мощности — ValueError.
+    """
+    names = sorted(caps)
+    col = {r: k for k, r in enumerate(names)}
+    req = np.zeros((len(engine.names), len(names)))
+    for i, act in enumerate(engine.names):
+        for r, amount in (data[act].get('resources') or {}).items():
+            if r not in col:
+                raise ValueError(f"Для работы {act}: не задана мощность ресурса {r}")
+            amount = float(amount)
+            if amount < 0:
+                raise ValueError(f"Для работы {act}: отрицательная потребность в ресурсе {r}")
+            if amount > caps[r] + EPS:
+                raise ValueError(f"Для работы {act}: нужно {amount:g} ед. ресурса {r}, а есть только {caps[r]:g}")
+            req[i, col[r]] = amount
+    return names, req, np.array([float(caps[r]) for r in names])
+
+
+def slot_durations(engine, data, step):
+    """Длительности в целых слотах шага step (округление вверх)."""
+    d = engine.durations(data)
+    p = np.ceil(d / step - 1e-9).astype(np.int64)
+    if p.sum() > MAX_SLOTS:
+        raise ValueError(f"Слишком мелкий шаг времени: {int(p.sum())} слотов, увеличьте step")
+    return p
+
+
+def priorities(engine, p, rule):
+    """Ключи приоритета (меньше — раньше) по ES/LS КП на длительностях p."""
+    _, es, ef, ls, lf = engine.passes(p.astype(float))
+    if rule == "LFT":
+        return np.lexsort((ls, lf))
+    if rule == "MSLK":
+        return np.lexsort((lf, ls - es))
+    if rule == "GRPW":
+        succ_sum = np.add.reduceat(np.append(p[engine.succ_idx], 0), engine.succ_ptr[:-1])
+        succ_sum[np.diff(engine.succ_ptr) == 0] = 0
+        return np.lexsort((lf, -(p + succ_sum)))
+    raise ValueError(f"Неизвестное правило приоритета '{rule}' (допустимо: {', '.join(RULES)})")
+
+
+def schedule(engine, data, caps, rule="LFT", scheme="serial", step=1.0):
+    """
+    Расписание с ограниченными ресурсами. Возвращает словарь: start, finish (массивы во времени
+    по индексам работ), makespan, cpm_duration (нижняя граница — КП на тех же слотах),
+    resources, capacity, peak, load (суммарная потребность·длительность по ресурсам), rule, scheme.
+    """
+    if scheme not in SCHEMES:
+        raise ValueError(f"Неизвестная схема '{scheme}' (допустимо: {', '.join(SCHEMES)})")
+    if step <= 0:
+        raise ValueError("Шаг времени должен быть положительным")
+    n = len(engine.names)
+    names, req, cap = resource_model(engine, data, caps)
+    p = slot_durations(engine, data, step)
+
+    dur = p.tolist()
+    succs = engine.succs
+    indeg = np.diff(engine.pred_ptr).tolist()
+    ready = [0] * n            # окончание последнего из уже поставленных предшественников
+    start = [0] * n
+    order = priorities(engine, p, rule)
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n)
+    rank = rank.tolist()
+    eligible = [rank[v] for v in range(n) if indeg[v] == 0]
+    heapq.heapify(eligible)
+    order = order.tolist()
+
+    def release(v, finish, queue):
+        for w in succs[v]:
+            ready[w] = max(ready[w], finish)
+            indeg[w] -= 1
+            if indeg[w] == 0:
+                queue(w)
+
+    if scheme == "serial":
+        load = np.zeros((len(names), int(p.sum()) + 1))
+        rows = [np.flatnonzero(req[v]) for v in range(n)]
+        limits = [cap[rs] - req[v, rs] for v, rs in enumerate(rows)]
+
+        while eligible:
+            v = order[heapq.heappop(eligible)]
+            rs, k = rows[v], dur[v]
+            t = fit(load, rs, limits[v], ready[v], k) if k and len(rs) else ready[v]
+            start[v] = t
+            if len(rs):
+                load[rs, t:t + k] += req[v, rs][:, None]
+            release(v, t + k, lambda w: heapq.heappush(eligible, rank[w]))
+    else:
+        # Все поставленные работы начались не позже t, поэтому загрузка после t не растёт
+        # и работе достаточно уместиться в свободный остаток в момент t.
+        free = cap.copy()
+        order_arr = np.array(order)
+        running = []               # (окончание, работа)
+        pending = []               # (готовность по связям, работа): предшественники поставлены
+        waiting = []               # ранги готовых к моменту t, по возрастанию
+        for k in eligible:
+            pending.append((0, order[k]))
+        heapq.heapify(pending)
+        placed, t = 0, 0
+        while placed < n:
+            while running and running[0][0] <= t:
+                free += req[heapq.heappop(running)[1]]
+            while pending and pending[0][0] <= t:
+                bisect.insort(waiting, rank[heapq.heappop(pending)[1]])
+            if waiting:
+                # Первая по приоритету работа, которая помещается в остаток, затем следующая после неё
+                vs = order_arr[waiting]
+                started, k = [], 0
+                while True:
+                    fits = np.flatnonzero((req[vs[k:]] <= free + EPS).all(axis=1))
+                    if not len(fits):
+                        break
+                    k += int(fits[0])
+                    v = int(vs[k])
+                    free -= req[v]
+                    start[v] = t
+                    started.append(k)
+                    heapq.heappush(running, (t + dur[v], v))
+                    release(v, t + dur[v], lambda w: heapq.heappush(pending, (ready[w], w)))
+                    k += 1
+                placed += len(started)
+                for k in reversed(started):
+                    del waiting[k]
+            if placed < n:
+                t = min(running[0][0] if running else math.inf, pending[0][0] if pending else math.inf)
+                if t == math.inf:
+                    raise RuntimeError("Параллельная схема: нет следующего события")
+
+    start = np.array(start, dtype=np.int64)
+    finish = start + p
+    cpm_duration = engine.passes(p.astype(float))[0]
+    load = usage(start, finish, req)
+    return {
+        "start": start * step,
+        "finish": finish * step,
+        "makespan": float(finish.max()) * step if n else 0.0,
+        "cpm_duration": cpm_duration * step,
+        "resources": names,
+        "capacity": cap,
+        "peak": load.max(axis=1) if load.size else np.zeros(len(names)),
+        "load": (req * p[:, None]).sum(axis=0) * step,
+        "rule": rule,
+        "scheme": scheme,
+    }
+
+
+def usage(start, finish, req):
+    """Загрузка ресурсов по слотам (R, H) для расписания в слотах start/finish."""
+    horizon = int(finish.max()) + 1 if len(finish) else 1
+    delta = np.zeros((req.shape[1], horizon + 1))
+    for r in range(req.shape[1]):
+        np.add.at(delta[r], start, req[:, r])
+        np.add.at(delta[r], finish, -req[:, r])
+    return np.cumsum(delta, axis=1)[:, :horizon]
+
+
+def check(engine, data, caps, result, step=1.0):
+    """Проверка расписания: связи соблюдены, загрузка ресурсов нигде не превышает мощность."""
+    _, req, cap = resource_model(engine, data, caps)
+    start = np.round(result["start"] / step).astype(np.int64)
+    finish = np.round(result["finish"] / step).astype(np.int64)
+    u = np.repeat(np.arange(len(engine.names)), np.diff(engine.succ_ptr))
+    if np.any(start[engine.succ_idx] < finish[u]):
+        return False
+    return not np.any(usage(start, finish, req) > cap[:, None] + 1e-6)
+
+
+def format_schedule(engine, result, limit=40):
+    """Текстовый отчёт: срок против КП, загрузка ресурсов и начало таблицы расписания."""
+    makespan = result["makespan"]
+    lines = [f"Схема: {result['scheme']}, правило: {result['rule']}",
+             f"Срок с учётом ресурсов: {makespan:.2f} дней (КП без ограничений: {result['cpm_duration']:.2f})"]
+    if result["resources"]:
+        lines.append(f"{'Ресурс':<12} {'Мощность':>9} {'Пик':>7} {'Загрузка':>9}")
+        for r, c, peak, load in zip(result["resources"], result["capacity"], result["peak"], result["load"]):
+            util = load / (makespan * c) if makespan > 0 and c > 0 else 0.0
+            lines.append(f"{r:<12} {c:>9g} {peak:>7g} {util:>8.0%}")
+    order = np.lexsort((np.arange(len(engine.names)), result["start"]))
+    lines.append(f"\n{'Работа':<12} {'Начало':>8} {'Конец':>8}")
+    for i in order[:limit]:
+        lines.append(f"{engine.names[i]:<12} {result['start'][i]:>8.2f} {result['finish'][i]:>8.2f}")
+    if len(order) > limit:
+        lines.append(f"... ещё {len(order) - limit} работ")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Расписание с ограниченными ресурсами (serial/parallel SGS)")
+    parser.add_argument("network", help="файл сети: .json, .jsonl или .csv")
+    parser.add_argument("--capacity", action="append", default=[],
+                        help="мощность ресурса: crew=5 (можно повторять; дополняет ключ resources из JSON)")
+    parser.add_argument("--rule", choices=RULES, default="LFT")
+    parser.add_argument("--scheme", choices=SCHEMES, default="serial")
+    parser.add_argument("--step", type=float, default=1.0, help="шаг времени (слот)")
+    parser.add_argument("--limit", type=int, default=40, help="сколько работ показать в таблице")
+    parser.add_argument("--all-rules", action="store_true", help="сравнить все правила и схемы")
+    args = parser.parse_args(argv)
+
+    net = load_network(args.network)
+    caps = dict(net.capacities)
+    for spec in args.capacity:
+        caps.update(parse_capacities(spec))
+    engine = net.engine()
+    _, data = net.to_data()
+
+    runs = [(s, r) for s in SCHEMES for r in RULES] if args.all_rules else [(args.scheme, args.rule)]
+    for scheme, rule in runs:
+        t = time.perf_counter()
+        result = schedule(engine, data, caps, rule, scheme, args.step)
+        dt = time.perf_counter() - t
+        if args.all_rules:
+            print(f"{scheme:<9} {rule:<5} срок {result['makespan']:.2f} ({dt:.2f} с)")
+        else:
+            print(format_schedule(engine, result, args.limit))
+            print(f"\nРабот: {len(net)}, ресурсов: {len(caps)}, {dt:.2f} с"
+                  + ("" if math.isclose(args.step, 1.0) else f", шаг {args.step:g}"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
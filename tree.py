@@ -1,231 +1,275 @@
 import json
-import networkx as nx
-import matplotlib.pyplot as plt
+import sys
+import argparse
+import numpy as np
+
+# matplotlib и networkx импортируются только при отрисовке (build_graph / render),
+# чтобы расчётные функции можно было быстро импортировать в пакетных задачах и серверах.
+
+# Hardcoded JSON как fallback
+DEFAULT_DATA_JSON = '''
+{
+  "projects": ["X", "Y", "Z"],
+  "wins_favorable": [460000, 450000, 350000],
+  "wins_unfavorable": [250000, -85000, -80000],
+  "probs_favorable_base": [0.51, 0.67, 0.98],
+  "research_cost": 50000,
+  "p_forecast_favorable": 0.52,
+  "p_fav_given_forecast_fav": 0.71,
+  "p_fav_given_forecast_unfav": 0.31
+}
+'''
 
 # Функция для загрузки данных из JSON
-def load_data():
+def load_data(path='data.json', verbose=True, fallback=False):
+    """
+    Данные дерева из JSON. Если файла нет или он испорчен: при fallback — встроенные данные
+    (интерактивный запуск tree.py), иначе исключение.
+    """
+    if not fallback:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if verbose:
+            print(f"Данные успешно загружены из файла '{path}'.")
+        return data
     try:
-        with open('data.json', 'r', encoding='utf-8') as f:
+        with open(path, 'r', encoding='utf-8') as f:
             data = json.load(f)
-            print("Данные успешно загружены из файла 'data.json'.")
+            if verbose:
+                print(f"Данные успешно загружены из файла '{path}'.")
             return data
     except FileNotFoundError:
-        print("Файл 'data.json' не найден. Использую встроенные (hardcoded) данные.")
-        # Hardcoded JSON как fallback
-        data_json = '''
-        {
-          "projects": ["X", "Y", "Z"],
-          "wins_favorable": [460000, 450000, 350000],
-          "wins_unfavorable": [250000, -85000, -80000],
-          "probs_favorable_base": [0.51, 0.67, 0.98],
-          "research_cost": 50000,
-          "p_forecast_favorable": 0.52,
-          "p_fav_given_forecast_fav": 0.71,
-          "p_fav_given_forecast_unfav": 0.31
-        }
-        '''
-        return json.loads(data_json)
+        if verbose:
+            print(f"Файл '{path}' не найден. Использую встроенные (hardcoded) данные.")
+        return json.loads(DEFAULT_DATA_JSON)
     except json.JSONDecodeError:
-        print("Ошибка в формате JSON в файле 'data.json'. Использую встроенные данные.")
-        return json.loads(data_json)  # fallback
-
-# Загружаем данные
-data = load_data()
-
-# Извлекаем параметры
-projects = data["projects"]
-wins_fav = data["wins_favorable"]
-wins_unfav = data["wins_unfavorable"]
-probs_fav_base = data["probs_favorable_base"]
-cost = data["research_cost"]
-p_forecast_fav = data["p_forecast_favorable"]
-p_fav_given_fav = data["p_fav_given_forecast_fav"]
-p_fav_given_unfav = data["p_fav_given_forecast_unfav"]
-p_forecast_unfav = 1 - p_forecast_fav
-p_unfav_given_fav = 1 - p_fav_given_fav
-p_unfav_given_unfav = 1 - p_fav_given_unfav
-
-# Функция для расчёта ОДО
+        if verbose:
+            print(f"Ошибка в формате JSON в файле '{path}'. Использую встроенные данные.")
+        return json.loads(DEFAULT_DATA_JSON)  # fallback
+
+# Функция для расчёта ОДО (работает и с числами, и с массивами NumPy)
 def calculate_odo(w_fav, w_unfav, p_fav):
     return p_fav * w_fav + (1 - p_fav) * w_unfav
 
-# Базовые ОДО без исследования
-odos_base = [calculate_odo(wins_fav[i], wins_unfav[i], probs_fav_base[i]) for i in range(3)]
-best_base_idx = odos_base.index(max(odos_base))
-best_base_odo = odos_base[best_base_idx]
-best_base_project = projects[best_base_idx]
-
-# ОДО при благоприятном прогнозе
-odos_fav_forecast = [calculate_odo(wins_fav[i], wins_unfav[i], p_fav_given_fav) for i in range(3)]
-max_fav_idx = odos_fav_forecast.index(max(odos_fav_forecast))
-max_fav_odo = odos_fav_forecast[max_fav_idx]
-max_fav_project = projects[max_fav_idx]
-
-# ОДО при неблагоприятном прогнозе
-odos_unfav_forecast = [calculate_odo(wins_fav[i], wins_unfav[i], p_fav_given_unfav) for i in range(3)]
-max_unfav_idx = odos_unfav_forecast.index(max(odos_unfav_forecast))
-max_unfav_odo = odos_unfav_forecast[max_unfav_idx]
-max_unfav_project = projects[max_unfav_idx]
-
-# Общая ОДО с исследованием
-odo_with_research = p_forecast_fav * max_fav_odo + p_forecast_unfav * max_unfav_odo
-odo_net = odo_with_research - cost
-
-# Определяем, выгоднее ли исследование
-if odo_net > best_base_odo:
-    best_option = "Проводить исследование"
-    best_value = odo_net
-else:
-    best_option = "Не проводить исследование"
-    best_value = best_base_odo
-
-# Вывод расчётов (для обоснования)
-print("Базовые ОДО:")
-for i, proj in enumerate(projects):
-    print(f"{proj}: {odos_base[i]}")
-print(f"Лучший без исследования: {best_base_project} с {best_base_odo}\n")
-
-print("ОДО при благоприятном прогнозе:")
-for i, proj in enumerate(projects):
-    print(f"{proj}: {odos_fav_forecast[i]}")
-print(f"Max: {max_fav_odo} ({max_fav_project})\n")
-
-print("ОДО при неблагоприятном прогнозе:")
-for i, proj in enumerate(projects):
-    print(f"{proj}: {odos_unfav_forecast[i]}")
-print(f"Max: {max_unfav_odo} ({max_unfav_project})\n")
-
-print(f"ОДО с исследованием: {odo_with_research}")
-print(f"Net ОДО: {odo_net}")
-print(f"Наиболее выгодный вариант: {best_option} с значением {best_value}")
-
-# Теперь строим дерево с вычисленными значениями
-G = nx.DiGraph()
-
-# Узлы с метками (динамические значения)
-nodes = {
-    "Start": "Начало\n(Выбор: исследование?)",
-    "Research": f"Проводить исследование\n(-{cost})",
-    "NoResearch": "Не проводить\nисследование",
-    "ForecastFav": f"Прогноз благоприятный\n{p_forecast_fav}",
-    "ForecastUnfav": f"Прогноз неблагоприятный\n{p_forecast_unfav}",
-    "MaxFav": f"max = {max_fav_odo}\n(Выбрать {max_fav_project})",
-    "MaxUnfav": f"max = {max_unfav_odo}\n(Выбрать {max_unfav_project})",
-    "Total": f"ОДО = {odo_with_research}\nNet = {odo_net}",
-    "BestNoRes": f"max = {best_base_odo}\n(Выбрать {best_base_project})",
-}
-
-# Добавляем узлы проектов
-for i, proj in enumerate(projects):
-    nodes[f"Fav{proj}"] = f"{proj}\n{odos_fav_forecast[i]}{' *' if i == max_fav_idx else ''}"
-    nodes[f"Unfav{proj}"] = f"{proj}\n{odos_unfav_forecast[i]}{' *' if i == max_unfav_idx else ''}"
-    nodes[f"No{proj}"] = f"{proj}\n{odos_base[i]}{' *' if i == best_base_idx else ''}"
-
-for node, label in nodes.items():
-    G.add_node(node, label=label)
-
-# Ребра (динамические цвета: красный для оптимального пути)
-research_color = "red" if odo_net > best_base_odo else "black"
-no_research_color = "red" if odo_net <= best_base_odo else "black"
-
-forecast_fav_color = "red" if odo_net > best_base_odo else "black"
-forecast_unfav_color = "black"  # Обычно не оптимальный, но если нужно, можно скорректировать
-
-edges = [
-    ("Start", "Research", {"label": f"Проводить (-{cost})", "color": research_color, "fontcolor": research_color}),
-    ("Start", "NoResearch", {"label": "Не проводить", "color": no_research_color, "fontcolor": no_research_color}),
-
-    ("Research", "ForecastFav",
-     {"label": f"{p_forecast_fav}", "color": forecast_fav_color, "fontcolor": forecast_fav_color}),
-    ("Research", "ForecastUnfav", {"label": f"{p_forecast_unfav}", "color": "black"}),
-
-    ("ForecastFav", f"Fav{projects[0]}",
-     {"label": f"{p_fav_given_fav} / {p_unfav_given_fav}", "color": "red" if 0 == max_fav_idx else "gray",
-      "fontcolor": "red" if 0 == max_fav_idx else "black"}),
-    ("ForecastFav", f"Fav{projects[1]}",
-     {"label": f"{p_fav_given_fav} / {p_unfav_given_fav}", "color": "red" if 1 == max_fav_idx else "gray",
-      "fontcolor": "red" if 1 == max_fav_idx else "black"}),
-    ("ForecastFav", f"Fav{projects[2]}",
-     {"label": f"{p_fav_given_fav} / {p_unfav_given_fav}", "color": "red" if 2 == max_fav_idx else "gray",
-      "fontcolor": "red" if 2 == max_fav_idx else "black"}),
-
-    ("ForecastUnfav", f"Unfav{projects[0]}",
-     {"label": f"{p_fav_given_unfav} / {p_unfav_given_unfav}", "color": "red" if 0 == max_unfav_idx else "gray",
-      "fontcolor": "red" if 0 == max_unfav_idx else "black"}),
-    ("ForecastUnfav", f"Unfav{projects[1]}",
-     {"label": f"{p_fav_given_unfav} / {p_unfav_given_unfav}", "color": "red" if 1 == max_unfav_idx else "gray",
-      "fontcolor": "red" if 1 == max_unfav_idx else "black"}),
-    ("ForecastUnfav", f"Unfav{projects[2]}",
-     {"label": f"{p_fav_given_unfav} / {p_unfav_given_unfav}", "color": "red" if 2 == max_unfav_idx else "gray",
-      "fontcolor": "red" if 2 == max_unfav_idx else "black"}),
-
-    (f"Fav{projects[0]}", "MaxFav", {"label": "", "color": "red" if 0 == max_fav_idx else "gray"}),
-    (f"Fav{projects[1]}", "MaxFav", {"label": "", "color": "red" if 1 == max_fav_idx else "gray"}),
-    (f"Fav{projects[2]}", "MaxFav", {"label": "", "color": "red" if 2 == max_fav_idx else "gray"}),
-
-    (f"Unfav{projects[0]}", "MaxUnfav", {"label": "", "color": "red" if 0 == max_unfav_idx else "gray"}),
-    (f"Unfav{projects[1]}", "MaxUnfav", {"label": "", "color": "red" if 1 == max_unfav_idx else "gray"}),
-    (f"Unfav{projects[2]}", "MaxUnfav", {"label": "", "color": "red" if 2 == max_unfav_idx else "gray"}),
-
-    ("MaxFav", "Total", {"label": "", "color": "red"}),
-    ("MaxUnfav", "Total", {"label": "", "color": "black"}),
-
-    ("NoResearch", f"No{projects[0]}",
-     {"label": f"{probs_fav_base[0]} / {1 - probs_fav_base[0]}", "color": "red" if 0 == best_base_idx else "gray",
-      "fontcolor": "red" if 0 == best_base_idx else "black"}),
-    ("NoResearch", f"No{projects[1]}",
-     {"label": f"{probs_fav_base[1]} / {1 - probs_fav_base[1]}", "color": "red" if 1 == best_base_idx else "gray",
-      "fontcolor": "red" if 1 == best_base_idx else "black"}),
-    ("NoResearch", f"No{projects[2]}",
-     {"label": f"{probs_fav_base[2]} / {1 - probs_fav_base[2]}", "color": "red" if 2 == best_base_idx else "gray",
-      "fontcolor": "red" if 2 == best_base_idx else "black"}),
-
-    (f"No{projects[0]}", "BestNoRes", {"label": "", "color": "red" if 0 == best_base_idx else "gray"}),
-    (f"No{projects[1]}", "BestNoRes", {"label": "", "color": "red" if 1 == best_base_idx else "gray"}),
-    (f"No{projects[2]}", "BestNoRes", {"label": "", "color": "red" if 2 == best_base_idx else "gray"}),
-]
-
-for u, v, d in edges:
-    G.add_edge(u, v, **d)
-
-# Позиционирование (адаптировано для 3 проектов)
-pos = {
-    "Start": (0, 10),
-    "Research": (3, 15),
-    "NoResearch": (3, 5),
-    "ForecastFav": (6, 18),
-    "ForecastUnfav": (6, 12),
-    "BestNoRes": (6, 5),
-    f"Fav{projects[0]}": (9, 20),
-    f"Fav{projects[1]}": (9, 18),
-    f"Fav{projects[2]}": (9, 16),
-    f"Unfav{projects[0]}": (9, 13),
-    f"Unfav{projects[1]}": (9, 11),
-    f"Unfav{projects[2]}": (9, 9),
-    f"No{projects[0]}": (9, 6),
-    f"No{projects[1]}": (9, 4),
-    f"No{projects[2]}": (9, 2),
-    "MaxFav": (12, 18),
-    "MaxUnfav": (12, 12),
-    "Total": (15, 15),
-}
-
-# Рисование
-plt.figure(figsize=(18, 12))
-
-nx.draw_networkx_nodes(G, pos, node_shape="s", node_size=4000, node_color="lightblue", edgecolors="black")
-
-labels = nx.get_node_attributes(G, 'label')
-nx.draw_networkx_labels(G, pos, labels, font_size=9, font_weight="bold")
-
-edge_colors = [G[u][v]['color'] for u, v in G.edges()]
-nx.draw_networkx_edges(G, pos, edge_color=edge_colors, arrows=True, arrowsize=20, width=2)
-
-edge_labels = nx.get_edge_attributes(G, 'label')
-filtered_edge_labels = {k: v for k, v in edge_labels.items() if v}
-nx.draw_networkx_edge_labels(G, pos, edge_labels=filtered_edge_labels, font_color="black", font_size=8)
-
-plt.title("Дерево решений при дополнительном исследовании рынка", fontsize=16, pad=20)
-plt.axis("off")
-plt.tight_layout()
-plt.show()
\ No newline at end of file
+def parse_forecasts(data):
+    """
+    Исходы прогноза: (названия, P(прогноз), P(благоприятный рынок | прогноз)).
+    Либо явный список data["forecasts"] = [{"name", "probability", "p_favorable"}, ...],
+    либо классическая пара благоприятный/неблагоприятный из p_forecast_favorable и т.д.
+    """
+    if "forecasts" in data:
+        names = [f["name"] for f in data["forecasts"]]
+        p_forecast = np.array([f["probability"] for f in data["forecasts"]], dtype=float)
+        p_fav_given = np.array([f["p_favorable"] for f in data["forecasts"]], dtype=float)
+    else:
+        names = ["Прогноз благоприятный", "Прогноз неблагоприятный"]
+        p_forecast = np.array([data["p_forecast_favorable"], 1 - data["p_forecast_favorable"]], dtype=float)
+        p_fav_given = np.array([data["p_fav_given_forecast_fav"], data["p_fav_given_forecast_unfav"]], dtype=float)
+
+    if not np.isclose(p_forecast.sum(), 1.0):
+        raise ValueError(f"Сумма вероятностей прогнозов должна быть 1, получено {p_forecast.sum()}")
+    if np.any((p_fav_given < 0) | (p_fav_given > 1)):
+        raise ValueError("Условные вероятности благоприятного рынка должны быть в [0, 1]")
+    return names, p_forecast, p_fav_given
+
+def compute_tree(data):
+    """
+    Расчёт дерева решений для любого числа проектов N и исходов прогноза K.
+    Все ОДО считаются векторами NumPy: базовые — форма (N,), при прогнозах — (K, N).
+    """
+    projects = list(data["projects"])
+    wins_fav = np.asarray(data["wins_favorable"], dtype=float)
+    wins_unfav = np.asarray(data["wins_unfavorable"], dtype=float)
+    probs_fav_base = np.asarray(data["probs_favorable_base"], dtype=float)
+    if not (len(projects) == len(wins_fav) == len(wins_unfav) == len(probs_fav_base)):
+        raise ValueError("Длины списков projects / wins_* / probs_favorable_base не совпадают")
+    if not projects:
+        raise ValueError("Нет проектов")
+
+    forecast_names, p_forecast, p_fav_given = parse_forecasts(data)
+    cost = data["research_cost"]
+
+    # Базовые ОДО без исследования
+    odos_base = calculate_odo(wins_fav, wins_unfav, probs_fav_base)
+    best_base_idx = int(np.argmax(odos_base))
+
+    # ОДО при каждом исходе прогноза: строки — прогнозы, столбцы — проекты
+    odos_forecast = calculate_odo(wins_fav[None, :], wins_unfav[None, :], p_fav_given[:, None])
+    best_forecast_idx = np.argmax(odos_forecast, axis=1)
+    max_forecast_odo = odos_forecast[np.arange(len(forecast_names)), best_forecast_idx]
+
+    # Общая ОДО с исследованием
+    odo_with_research = float(p_forecast @ max_forecast_odo)
+    odo_net = odo_with_research - cost
+    best_base_odo = float(odos_base[best_base_idx])
+    research = odo_net > best_base_odo
+
+    return {
+        "projects": projects,
+        "wins_fav": wins_fav,
+        "wins_unfav": wins_unfav,
+        "probs_fav_base": probs_fav_base,
+        "cost": cost,
+        "forecast_names": forecast_names,
+        "p_forecast": p_forecast,
+        "p_fav_given": p_fav_given,
+        "odos_base": odos_base,
+        "best_base_idx": best_base_idx,
+        "best_base_odo": best_base_odo,
+        "odos_forecast": odos_forecast,
+        "best_forecast_idx": best_forecast_idx,
+        "max_forecast_odo": max_forecast_odo,
+        "odo_with_research": odo_with_research,
+        "odo_net": odo_net,
+        "research": bool(research),
+        "best_option": "Проводить исследование" if research else "Не проводить исследование",
+        "best_value": odo_net if research else best_base_odo,
+    }
+
+def print_report(r):
+    projects = r["projects"]
+    print("Базовые ОДО:")
+    for i, proj in enumerate(projects):
+        print(f"{proj}: {r['odos_base'][i]}")
+    print(f"Лучший без исследования: {projects[r['best_base_idx']]} с {r['best_base_odo']}\n")
+
+    for k, name in enumerate(r["forecast_names"]):
+        print(f"ОДО при исходе «{name}» (p = {r['p_forecast'][k]:g}):")
+        for i, proj in enumerate(projects):
+            print(f"{proj}: {r['odos_forecast'][k, i]}")
+        print(f"Max: {r['max_forecast_odo'][k]} ({projects[r['best_forecast_idx'][k]]})\n")
+
+    print(f"ОДО с исследованием: {r['odo_with_research']}")
+    print(f"Net ОДО: {r['odo_net']}")
+    print(f"Наиболее выгодный вариант: {r['best_option']} с значением {r['best_value']}")
+
+def build_graph(r):
+    """
+    Строит граф дерева программно по векторам из compute_tree, а позиции узлов —
+    автоматической раскладкой (tree_layout.layout_graph) по скелету дерева:
+    Начало → исследование → исходы прогноза → проекты и Начало → без исследования → проекты.
+    Узлы свёртки (max, ОДО) ставятся справа напротив своих узлов дерева.
+    """
+    import networkx as nx
+    from tree_layout import layout_graph
+
+    projects = r["projects"]
+    cost = r["cost"]
+    G = nx.DiGraph()
+    skeleton = {"Start": ["Research", "NoResearch"], "Research": [], "NoResearch": ["_NoResearchLevel"]}
+
+    def red_if(flag, other="gray"):
+        return "red" if flag else other
+
+    research_color = red_if(r["research"], "black")
+    no_research_color = red_if(not r["research"], "black")
+
+    G.add_node("Start", label="Начало\n(Выбор: исследование?)")
+    G.add_node("Research", label=f"Проводить исследование\n(-{cost})")
+    G.add_node("NoResearch", label="Не проводить\nисследование")
+    G.add_node("Total", label=f"ОДО = {r['odo_with_research']}\nNet = {r['odo_net']}")
+    G.add_edge("Start", "Research", label=f"Проводить (-{cost})", color=research_color, fontcolor=research_color)
+    G.add_edge("Start", "NoResearch", label="Не проводить", color=no_research_color, fontcolor=no_research_color)
+
+    for k, name in enumerate(r["forecast_names"]):
+        best = int(r["best_forecast_idx"][k])
+        p_fav = r["p_fav_given"][k]
+        fnode, mnode = f"Forecast{k}", f"Max{k}"
+        G.add_node(fnode, label=f"{name}\n{r['p_forecast'][k]:g}")
+        G.add_node(mnode, label=f"max = {r['max_forecast_odo'][k]}\n(Выбрать {projects[best]})")
+        G.add_edge("Research", fnode, label=f"{r['p_forecast'][k]:g}", color=research_color, fontcolor=research_color)
+        G.add_edge(mnode, "Total", label="", color=research_color)
+        skeleton["Research"].append(fnode)
+        skeleton[fnode] = []
+
+        for i, proj in enumerate(projects):
+            leaf = ("forecast", k, i)   # ключ не зависит от имени проекта, подпись — в label
+            G.add_node(leaf, label=f"{proj}\n{r['odos_forecast'][k, i]}{' *' if i == best else ''}")
+            G.add_edge(fnode, leaf, label=f"{p_fav:g} / {1 - p_fav:g}", color=red_if(i == best),
+                       fontcolor=red_if(i == best, "black"))
+            G.add_edge(leaf, mnode, label="", color=red_if(i == best))
+            skeleton[fnode].append(leaf)
+
+    best = r["best_base_idx"]
+    G.add_node("BestNoRes", label=f"max = {r['best_base_odo']}\n(Выбрать {projects[best]})")
+    skeleton["_NoResearchLevel"] = []
+    for i, proj in enumerate(projects):
+        leaf = ("base", i)
+        p = r["probs_fav_base"][i]
+        G.add_node(leaf, label=f"{proj}\n{r['odos_base'][i]}{' *' if i == best else ''}")
+        G.add_edge("NoResearch", leaf, label=f"{p:g} / {1 - p:g}", color=red_if(i == best),
+                   fontcolor=red_if(i == best, "black"))
+        G.add_edge(leaf, "BestNoRes", label="", color=red_if(i == best))
+        skeleton["_NoResearchLevel"].append(leaf)
+
+    # Вспомогательный узел _NoResearchLevel выравнивает проекты без исследования
+    # по одному столбцу с проектами при прогнозах; сам он не рисуется.
+    pos = layout_graph(skeleton, "Start", level_gap=3.0, sibling_gap=2.0)
+    for k in range(len(r["forecast_names"])):
+        pos[f"Max{k}"] = (12.0, pos[f"Forecast{k}"][1])
+    pos["Total"] = (15.0, pos["Research"][1])
+    pos["BestNoRes"] = (12.0, pos.pop("_NoResearchLevel")[1])
+    return G, pos
+
+def draw_graph(G, pos):
+    """Рисует граф на новой фигуре matplotlib (пакетно, см. tree_layout.draw_batched) и возвращает её."""
+    import matplotlib.pyplot as plt
+    from tree_layout import draw_batched
+
+    ys = [y for _, y in pos.values()]
+    fig, ax = plt.subplots(figsize=(18, max(12.0, 0.55 * (max(ys) - min(ys)))))
+
+    edges = list(G.edges())
+    draw_batched(ax, pos, edges,
+                 edge_colors=[G[u][v]['color'] for u, v in edges],
+                 labels=dict(G.nodes(data="label")),
+                 edge_labels={(u, v): d.get("label", "") for u, v, d in G.edges(data=True)},
+                 font_size=9)
+
+    ax.set_title("Дерево решений при дополнительном исследовании рынка", fontsize=16, pad=20)
+    fig.tight_layout()
+    return fig
+
+def render(result, path=None, show=False):
+    """
+    Отрисовка дерева. С path — без дисплея через backend Agg прямо в файл
+    (формат по расширению: .png, .svg, .pdf); с show — в окне matplotlib.
+    """
+    import matplotlib
+    if not show:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    G, pos = build_graph(result)
+    fig = draw_graph(G, pos)
+    if path:
+        fig.savefig(path)
+    if show:
+        plt.show()
+    plt.close(fig)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Дерево решений при дополнительном исследовании рынка")
+    parser.add_argument("data_file", nargs="?", default="data.json")
+    parser.add_argument("--out", help="сохранить дерево в файл (.png / .svg) без открытия окна")
+    parser.add_argument("--no-show", action="store_true", help="не открывать окно (только расчёт)")
+    parser.add_argument("--quiet", action="store_true", help="не печатать расчёты")
+    args = parser.parse_args(argv)
+
+    data = load_data(args.data_file, verbose=not args.quiet, fallback=True)
+    result = compute_tree(data)
+
+    # Вывод расчётов (для обоснования)
+    if not args.quiet:
+        print_report(result)
+
+    # По умолчанию, как и раньше, дерево показывается в окне; --out рисует в файл без дисплея
+    show = not args.out and not args.no_show
+    if args.out or show:
+        render(result, path=args.out, show=show)
+        if args.out and not args.quiet:
+            print(f"Дерево сохранено: {args.out}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
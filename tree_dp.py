@@ -0,0 +1,196 @@
+import sys
+import time
+import argparse
+import numpy as np
+
+from tree import load_data, compute_tree
+from tree_voi import implied_likelihoods
+
+# Многоэтапное исследование рынка: динамическое программирование по состояниям убеждения.
+#
+# Состояние — вероятность b благоприятного рынка (общего для всех проектов, как в tree.py).
+# На каждом этапе можно либо остановиться и выбрать проект (ОДО b·благ_i + (1 - b)·неблаг_i),
+# либо заплатить за очередной раунд исследования и получить прогноз k с вероятностью
+# P(k | b) = b·P(k | благ.) + (1 - b)·P(k | неблаг.), после чего b обновляется по Байесу.
+# Правдоподобия прогноза — tree_voi.implied_likelihoods, априор — data["prior_favorable"]
+# или неявный Σ P(k)·P(благ. | k), стоимость раундов — data["research_costs"] или research_cost.
+# Исключение — остановка до первого раунда: как в ветви «без исследования» tree.py, у каждого
+# проекта своя вероятность probs_favorable_base, поэтому при rounds=1 ОДО совпадает с tree.py.
+#
+# Состояния запоминаются: в точном режиме ключ — число выпадений каждого прогноза
+# (убеждение зависит только от них, а не от порядка), в дискретном — номер точки сетки
+# убеждений. Поэтому H раундов с K исходами дают O(H^(K-1)) состояний вместо K^H путей.
+
+
+def model(data, rounds=None):
+    """
+    Параметры модели: (проекты, благ., неблаг., ОДО проектов без исследования, априор,
+    P(k|благ.), P(k|неблаг.), стоимости по раундам).
+    Число раундов — rounds, иначе len(research_costs), иначе 1.
+    """
+    r = compute_tree(data)
+    l_fav, l_unfav = implied_likelihoods(data)
+    prior = float(data.get("prior_favorable", r["p_forecast"] @ r["p_fav_given"]))
+    costs = data.get("research_costs")
+    if rounds is None:
+        rounds = len(costs) if costs else 1
+    if costs:
+        costs = [float(c) for c in costs] + [float(costs[-1])] * max(0, rounds - len(costs))
+    else:
+        costs = [float(r["cost"])] * rounds
+    if not 0.0 <= prior <= 1.0:
+        raise ValueError(f"Априорная вероятность вне [0, 1]: {prior}")
+    return r["projects"], r["wins_fav"], r["wins_unfav"], r["odos_base"], prior, l_fav, l_unfav, costs[:rounds]
+
+
+def bayes(b, l_fav, l_unfav):
+    """Для массива убеждений (S,): P(прогноз k) и апостериорное убеждение, оба формы (S, K)."""
+    p_k = b[:, None] * l_fav[None, :] + (1 - b[:, None]) * l_unfav[None, :]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        post = np.where(p_k > 0, b[:, None] * l_fav[None, :] / p_k, b[:, None])
+    return p_k, post
+
+
+class SequentialResearch:
+    """
+    Решение задачи с конечным горизонтом обратной индукцией по слоям состояний.
+    grid=None — точные убеждения (ключ — счётчики прогнозов), grid=G — убеждения
+    округляются до сетки из G точек на [0, 1] (приближённо, зато состояний не больше G на этап).
+    """
+
+    def __init__(self, data, rounds=None, grid=None):
+        (self.projects, self.wins_fav, self.wins_unfav, self.base, self.prior,
+         self.l_fav, self.l_unfav, self.costs) = model(data, rounds)
+        self.rounds = len(self.costs)
+        self.grid = grid
+        self.layers = []     # по этапам: {"belief", "p_k", "child", "value", "action"}
+        self.states = 0
+
+    def _key(self, key, k, b):
+        if self.grid is None:
+            return key[:k] + (key[k] + 1,) + key[k + 1:]
+        return int(round(b * (self.grid - 1)))
+
+    def _snap(self, b):
+        return b if self.grid is None else round(b * (self.grid - 1)) / (self.grid - 1)
+
+    def solve(self):
+        """Прямой проход строит слои уникальных состояний, обратный — значения и действия. Возвращает ОДО."""
+        K = len(self.l_fav)
+        keys = [(0,) * K if self.grid is None else self._key(None, 0, self.prior)]
+        belief = np.array([self._snap(self.prior)])
+        self.layers = []
+        for t in range(self.rounds + 1):
+            layer = {"belief": belief}
+            if t < self.rounds:
+                p_k, post = bayes(belief, self.l_fav, self.l_unfav)
+                index = {}
+                next_keys, next_belief = [], []
+                child = np.empty((len(keys), K), dtype=np.int64)
+                for s, key in enumerate(keys):
+                    for k in range(K):
+                        nk = self._key(key, k, post[s, k])
+                        j = index.get(nk)
+                        if j is None:
+                            j = index[nk] = len(next_keys)
+                            next_keys.append(nk)
+                            next_belief.append(self._snap(post[s, k]))
+                        child[s, k] = j
+                layer["p_k"], layer["child"] = p_k, child
+                keys, belief = next_keys, np.array(next_belief)
+            self.layers.append(layer)
+        self.states = sum(len(layer["belief"]) for layer in self.layers)
+
+        # Обратная индукция: действие -1 — провести раунд, i >= 0 — выбрать проект i
+        value = None
+        for t in range(self.rounds, -1, -1):
+            layer = self.layers[t]
+            b = layer["belief"]
+            if t == 0:
+                commit = self.base[None, :]   # до исследования — свои вероятности проектов
+            else:
+                commit = b[:, None] * self.wins_fav[None, :] + (1 - b[:, None]) * self.wins_unfav[None, :]
+            action = commit.argmax(axis=1)
+            best = commit.max(axis=1)
+            if t < self.rounds:
+                cont = np.sum(layer["p_k"] * value[layer["child"]], axis=1) - self.costs[t]
+                research = cont > best
+                action = np.where(research, -1, action)
+                best = np.where(research, cont, best)
+            layer["value"], layer["action"] = best, action
+            value = best
+        return float(value[0])
+
+    def full_tree_size(self):
+        """Число узлов прогноза в полностью развёрнутом дереве (без запоминания)."""
+        K = len(self.l_fav)
+        return sum(K ** t for t in range(self.rounds + 1))
+
+    def action_label(self, a):
+        return "исследование" if a < 0 else f"проект {self.projects[a]}"
+
+    def policy(self):
+        """
+        Оптимальная политика остановки по этапам: список (этап, [(b_от, b_до, действие), ...]) —
+        отсортированные по убеждению посещённые состояния, склеенные в интервалы одного действия.
+        """
+        out = []
+        for t, layer in enumerate(self.layers):
+            order = np.argsort(layer["belief"], kind="stable")
+            b, a = layer["belief"][order], layer["action"][order]
+            cuts = np.flatnonzero(a[1:] != a[:-1]) + 1
+            starts = np.concatenate([[0], cuts])
+            ends = np.concatenate([cuts, [len(a)]]) - 1
+            out.append((t, [(float(b[s]), float(b[e]), self.action_label(int(a[s]))) for s, e in zip(starts, ends)]))
+        return out
+
+    def main_path(self):
+        """Действия вдоль наиболее вероятной последовательности прогнозов: [(этап, b, действие, ОДО)]."""
+        path = []
+        s = 0
+        for t, layer in enumerate(self.layers):
+            a = int(layer["action"][s])
+            path.append((t, float(layer["belief"][s]), self.action_label(a), float(layer["value"][s])))
+            if a >= 0:
+                break
+            s = int(layer["child"][s, int(np.argmax(layer["p_k"][s]))])
+        return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Многоэтапное исследование рынка: ДП по убеждениям")
+    parser.add_argument("data_file", nargs="?", default="data.json")
+    parser.add_argument("--rounds", type=int, help="максимальное число раундов исследования")
+    parser.add_argument("--grid", type=int, help="дискретизация убеждений сеткой из стольких точек")
+    args = parser.parse_args(argv)
+    if args.grid is not None and args.grid < 2:
+        parser.error("--grid должно быть не меньше 2")
+
+    data = load_data(args.data_file, verbose=False)
+    dp = SequentialResearch(data, args.rounds, args.grid)
+    t = time.perf_counter()
+    value = dp.solve()
+    dt = time.perf_counter() - t
+
+    print(f"Априор P(благ. рынок) = {dp.prior:.4f}, раундов не больше {dp.rounds}, "
+          f"стоимости: {', '.join(f'{c:g}' for c in dp.costs)}")
+    print(f"ОДО оптимальной политики: {value:.2f}")
+    if dp.rounds == 1:
+        # Один раунд — то же дерево, что в tree.py: значения обязаны совпасть
+        expected = compute_tree(data)["best_value"]
+        if abs(value - expected) > 1e-6 * max(1.0, abs(expected)):
+            print(f"Расхождение с tree.py: {expected:.2f}", file=sys.stderr)
+            return 1
+        print(f"Совпадает с tree.py ({expected:.2f})")
+    print(f"Посещено состояний: {dp.states} (полное дерево — {dp.full_tree_size()} узлов прогноза), {dt:.3f} с")
+    print("Главный путь (наиболее вероятные прогнозы):")
+    for t, b, label, v in dp.main_path():
+        print(f"  этап {t}: b = {b:.4f} → {label} (ОДО {v:.2f})")
+    print("Политика остановки по этапам:")
+    for t, intervals in dp.policy():
+        print(f"  этап {t}: " + "; ".join(f"b ∈ [{lo:.4f}, {hi:.4f}] → {label}" for lo, hi, label in intervals))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# Автоматическая раскладка деревьев (Reingold–Tilford в варианте Walker / Buchheim — O(n))
+# и пакетная отрисовка больших деревьев в matplotlib.
+#
+# Обходы сделаны итеративными (явный стек), так что глубина дерева не упирается
+# в предел рекурсии Python. matplotlib импортируется только в draw_batched.
+
+
+def tidy_layout(children, root=0, distance=1.0):
+    """
+    Линейная по времени «аккуратная» раскладка дерева.
+    children — список списков детей для узлов 0..n-1 (узлы, недостижимые из root, игнорируются).
+    Возвращает (breadth, depth): координату поперёк уровней и номер уровня для каждого узла
+    (None для недостижимых). Соседние узлы одного уровня разнесены не менее чем на distance,
+    родитель стоит посередине между крайними детьми.
+    """
+    n = len(children)
+    parent = [-1] * n
+    number = [0] * n           # номер среди братьев
+    depth = [None] * n
+    prelim = [0.0] * n
+    mod = [0.0] * n
+    shift = [0.0] * n
+    change = [0.0] * n
+    thread = [-1] * n
+    ancestor = list(range(n))
+
+    # Порядок «дети раньше родителя» (дети в исходном порядке) и глубины
+    order = []
+    depth[root] = 0
+    stack = [(root, 0)]
+    while stack:
+        v, i = stack.pop()
+        if i < len(children[v]):
+            stack.append((v, i + 1))
+            w = children[v][i]
+            parent[w] = v
+            number[w] = i
+            depth[w] = depth[v] + 1
+            stack.append((w, 0))
+        else:
+            order.append(v)
+
+    def left_sibling(v):
+        p = parent[v]
+        return children[p][number[v] - 1] if p >= 0 and number[v] > 0 else -1
+
+    def next_left(v):
+        return children[v][0] if children[v] else thread[v]
+
+    def next_right(v):
+        return children[v][-1] if children[v] else thread[v]
+
+    def move_subtree(wm, wp, s):
+        subtrees = number[wp] - number[wm]
+        change[wp] -= s / subtrees
+        shift[wp] += s
+        change[wm] += s / subtrees
+        prelim[wp] += s
+        mod[wp] += s
+
+    def apportion(v, default_ancestor):
+        w = left_sibling(v)
+        if w < 0:
+            return default_ancestor
+        vip = vop = v
+        vim = w
+        vom = children[parent[v]][0]
+        sip, sop, sim, som = mod[vip], mod[vop], mod[vim], mod[vom]
+        while next_right(vim) >= 0 and next_left(vip) >= 0:
+            vim = next_right(vim)
+            vip = next_left(vip)
+            vom = next_left(vom)
+            vop = next_right(vop)
+            ancestor[vop] = v
+            s = (prelim[vim] + sim) - (prelim[vip] + sip) + distance
+            if s > 0:
+                a = ancestor[vim] if parent[ancestor[vim]] == parent[v] else default_ancestor
+                move_subtree(a, v, s)
+                sip += s
+                sop += s
+            sim += mod[vim]
+            sip += mod[vip]
+            som += mod[vom]
+            sop += mod[vop]
+        if next_right(vim) >= 0 and next_right(vop) < 0:
+            thread[vop] = next_right(vim)
+            mod[vop] += sim - sop
+        if next_left(vip) >= 0 and next_left(vom) < 0:
+            thread[vom] = next_left(vip)
+            mod[vom] += sip - som
+            default_ancestor = v
+        return default_ancestor
+
+    # Первый проход: предварительные координаты, снизу вверх
+    default_anc = {}
+    for v in order:
+        kids = children[v]
+        w = left_sibling(v)
+        if kids:
+            # сдвиги, накопленные при разнесении поддеревьев детей
+            s = c = 0.0
+            for k in reversed(kids):
+                prelim[k] += s
+                mod[k] += s
+                c += change[k]
+                s += shift[k] + c
+            midpoint = (prelim[kids[0]] + prelim[kids[-1]]) / 2
+            if w >= 0:
+                prelim[v] = prelim[w] + distance
+                mod[v] = prelim[v] - midpoint
+            else:
+                prelim[v] = midpoint
+        else:
+            prelim[v] = prelim[w] + distance if w >= 0 else 0.0
+        p = parent[v]
+        if p >= 0:
+            default_anc[p] = apportion(v, default_anc.get(p, children[p][0]))
+
+    # Второй проход: итоговые координаты, сверху вниз с накоплением mod
+    breadth = [None] * n
+    stack = [(root, -prelim[root])]
+    while stack:
+        v, m = stack.pop()
+        breadth[v] = prelim[v] + m
+        for w in children[v]:
+            stack.append((w, m + mod[v]))
+    return breadth, depth
+
+
+def layout_graph(children_map, root, level_gap=3.0, sibling_gap=2.0):
+    """
+    Раскладка дерева, заданного словарём {узел: [дети]}, слева направо:
+    x = уровень · level_gap, y — сверху вниз (первый ребёнок выше). Возвращает {узел: (x, y)}.
+    """
+    names = [root]
+    index = {root: 0}
+    stack = [root]
+    while stack:
+        v = stack.pop()
+        for w in children_map.get(v, ()):
+            if w not in index:
+                index[w] = len(names)
+                names.append(w)
+                stack.append(w)
+    children = [[index[w] for w in children_map.get(v, ())] for v in names]
+    breadth, depth = tidy_layout(children, 0)
+    return {v: (depth[i] * level_gap, -breadth[i] * sibling_gap) for i, v in enumerate(names)}
+
+
+def draw_batched(ax, pos, edges, edge_colors=None, node_colors=None, node_markers=None,
+                 labels=None, edge_labels=None, label_limit=400, node_size=None, font_size=8, arrows=True):
+    """
+    Отрисовка одним пакетом: все рёбра — одна LineCollection, узлы — по одному scatter
+    на вид маркера. Подписи выводятся только если узлов не больше label_limit —
+    иначе тысячи текстовых объектов и есть то, что делает отрисовку медленной.
+    Направление рёбер (arrows): до label_limit узлов — стрелки у границы узла-приёмника, как
+    в nx.draw_networkx_edges; в больших графах — наконечники посередине рёбер одним quiver.
+    """
+    from matplotlib.collections import LineCollection
+    from matplotlib.patches import FancyArrowPatch
+
+    nodes = list(pos)
+    n = len(nodes)
+    if node_size is None:
+        node_size = 4000 if n <= 40 else max(4.0, 40000.0 / n)
+
+    segments = [(pos[u], pos[v]) for u, v in edges]
+    if segments:
+        ax.add_collection(LineCollection(segments, colors=edge_colors or "gray",
+                                         linewidths=2 if n <= 200 else 0.5, zorder=1))
+    if arrows and segments:
+        colors = edge_colors or ["gray"] * len(segments)
+        if n <= label_limit:
+            shrink = node_size ** 0.5 / 2   # полуширина маркера узла в точках
+            for (p0, p1), color in zip(segments, colors):
+                ax.add_patch(FancyArrowPatch(p0, p1, arrowstyle="-|>", mutation_scale=20, color=color,
+                                             linewidth=2 if n <= 200 else 0.5, shrinkA=0, shrinkB=shrink, zorder=1))
+        else:
+            mx, my, ux, uy = [], [], [], []
+            for (x0, y0), (x1, y1) in segments:
+                length = ((x1 - x0) ** 2 + (y1 - y0) ** 2) ** 0.5 or 1.0
+                mx.append((x0 + x1) / 2)
+                my.append((y0 + y1) / 2)
+                ux.append((x1 - x0) / length)
+                uy.append((y1 - y0) / length)
+            ax.quiver(mx, my, ux, uy, color=colors, angles="xy", pivot="mid", scale_units="width", scale=80,
+                      width=0.001, headwidth=5, headlength=6, zorder=1)
+
+    node_colors = node_colors or {}
+    node_markers = node_markers or {}
+    groups = {}
+    for v in nodes:
+        groups.setdefault(node_markers.get(v, "s"), []).append(v)
+    for marker, group in groups.items():
+        ax.scatter([pos[v][0] for v in group], [pos[v][1] for v in group], s=node_size, marker=marker,
+                   c=[node_colors.get(v, "lightblue") for v in group],
+                   edgecolors="black" if n <= 200 else "none", zorder=2)
+
+    if labels and n <= label_limit:
+        for v, text in labels.items():
+            if text:
+                x, y = pos[v]
+                ax.text(x, y, text, ha="center", va="center", fontsize=font_size, fontweight="bold", zorder=3)
+    if edge_labels and n <= label_limit:
+        for (u, v), text in edge_labels.items():
+            if text:
+                (x0, y0), (x1, y1) = pos[u], pos[v]
+                ax.text((x0 + x1) / 2, (y0 + y1) / 2, text, ha="center", va="center", fontsize=font_size - 1,
+                        bbox=dict(boxstyle="round,pad=0.1", fc="white", ec="none", alpha=0.8), zorder=3)
+
+    ax.autoscale_view()
+    ax.axis("off")
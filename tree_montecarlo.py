@@ -0,0 +1,159 @@
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+from tree import load_data, compute_tree
+
+# Монте-Карло распределения выигрыша для дерева решений tree.py.
+#
+# Каждая стратегия сводится к набору ветвей прогноза: ветвь k выпадает с вероятностью p_k,
+# затем рынок благоприятен с вероятностью q_k, выигрыш — fav_k или unfav_k (уже за вычетом
+# стоимости исследования). «Без исследования» — одна ветвь с p = 1.
+# Исходов у стратегии всего 2K, поэтому поток выборок сворачивается в счётчики исходов:
+# память не зависит от числа выборок, а процентили/VaR/CVaR считаются точно по счётчикам.
+
+PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+def build_policies(data):
+    """
+    Стратегии дерева: исследование с оптимальным выбором проекта при каждом прогнозе
+    и «без исследования» для каждого проекта. Возвращает (список стратегий, имя оптимальной).
+    Стратегия: {"name", "p", "q", "fav", "unfav"} — массивы по ветвям прогноза,
+    и "exact" — её аналитическая ОДО из tree.compute_tree (для самопроверки).
+    """
+    r = compute_tree(data)
+    projects = r["projects"]
+    wf, wu, pb, cost = r["wins_fav"], r["wins_unfav"], r["probs_fav_base"], float(r["cost"])
+    choice = r["best_forecast_idx"]
+
+    policies = [{
+        "name": "Исследование (" + " / ".join(projects[i] for i in choice) + ")",
+        "p": r["p_forecast"], "q": r["p_fav_given"], "fav": wf[choice] - cost, "unfav": wu[choice] - cost,
+        "exact": r["odo_net"],
+    }]
+    for i, proj in enumerate(projects):
+        policies.append({
+            "name": f"Без исследования: {proj}",
+            "p": np.array([1.0]), "q": pb[i:i + 1], "fav": wf[i:i + 1], "unfav": wu[i:i + 1],
+            "exact": float(r["odos_base"][i]),
+        })
+    best = policies[0]["name"] if r["research"] else policies[1 + r["best_base_idx"]]["name"]
+    return policies, best
+
+
+def outcome_values(policy):
+    """Выигрыш по индексу исхода 2k + (рынок благоприятен)."""
+    return np.column_stack([policy["unfav"], policy["fav"]]).ravel()
+
+
+def simulate_counts(policy, samples, seed, chunk=1_000_000):
+    """
+    Счётчики исходов для samples выборок, по блокам из chunk штук.
+    Модульная функция, чтобы её можно было отправлять в рабочие процессы.
+    """
+    rng = np.random.default_rng(seed)
+    cum = np.cumsum(policy["p"])
+    cum[-1] = 1.0
+    q = np.asarray(policy["q"])
+    counts = np.zeros(2 * len(cum), dtype=np.int64)
+    left = samples
+    while left > 0:
+        n = min(chunk, left)
+        left -= n
+        forecast = np.searchsorted(cum, rng.random(n), side="right")
+        market = rng.random(n) < q[forecast]
+        counts += np.bincount(2 * forecast + market, minlength=counts.size)
+    return counts
+
+
+def run(policy, samples, seed=0, chunk=1_000_000, workers=1):
+    """Счётчики исходов; при workers > 1 блоки раскладываются по процессам с независимыми потоками."""
+    if samples <= 0:
+        raise ValueError("Число выборок должно быть положительным")
+    if chunk <= 0:
+        raise ValueError("Размер блока выборок должен быть положительным")
+    if workers <= 1:
+        return simulate_counts(policy, samples, seed, chunk)
+    seeds = np.random.SeedSequence(seed).spawn(workers)
+    shares = [samples // workers + (1 if i < samples % workers else 0) for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = pool.map(simulate_counts, [policy] * workers, shares, seeds, [chunk] * workers)
+        return sum(parts)
+
+
+def summarize(values, counts, alpha=0.05):
+    """Статистики дискретного распределения, заданного значениями и счётчиками."""
+    order = np.argsort(values)
+    v = values[order]
+    w = counts[order] / counts.sum()
+    cdf = np.cumsum(w)
+    mean = float(v @ w)
+    std = float(np.sqrt(max(0.0, (v - mean) ** 2 @ w)))
+
+    def quantile(level):
+        return float(v[min(np.searchsorted(cdf, level - 1e-12), len(v) - 1)])
+
+    # CVaR: средний выигрыш в худших alpha долях (атом на границе берётся частично)
+    mass_before = np.concatenate([[0.0], cdf[:-1]])
+    take = np.clip(alpha - mass_before, 0.0, w)
+    tail_mean = float(v @ take / alpha)
+    return {
+        "mean": mean,
+        "std": std,
+        "percentiles": {p: quantile(p / 100) for p in PERCENTILES},
+        "VaR": -quantile(alpha),
+        "CVaR": -tail_mean,
+        "p_loss": float(w[v < 0].sum()),
+    }
+
+
+def self_check(policy, counts, stats, sigmas=4.0):
+    """Встроенная проверка: выборочное среднее должно сходиться к аналитической ОДО (в пределах sigmas·SE)."""
+    exact = policy["exact"]
+    se = stats["std"] / np.sqrt(counts.sum())
+    diff = stats["mean"] - exact
+    return abs(diff) <= sigmas * se + 1e-9 * max(1.0, abs(exact)), exact, se
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Монте-Карло распределения выигрыша дерева решений")
+    parser.add_argument("data_file", nargs="?", default="data.json")
+    parser.add_argument("--samples", type=int, default=10_000_000, help="выборок на стратегию")
+    parser.add_argument("--chunk", type=int, default=1_000_000, help="размер блока выборок")
+    parser.add_argument("--workers", type=int, default=1, help="число процессов")
+    parser.add_argument("--seed", type=int, default=12345)
+    parser.add_argument("--alpha", type=float, default=0.05, help="уровень VaR/CVaR")
+    args = parser.parse_args(argv)
+    if args.samples <= 0:
+        parser.error("--samples должно быть положительным")
+    if args.chunk <= 0:
+        parser.error("--chunk должно быть положительным")
+
+    data = load_data(args.data_file, verbose=False)
+    policies, best = build_policies(data)
+
+    ok_all = True
+    for k, policy in enumerate(policies):
+        t = time.perf_counter()
+        counts = run(policy, args.samples, seed=args.seed + k, chunk=args.chunk, workers=args.workers)
+        dt = time.perf_counter() - t
+        stats = summarize(outcome_values(policy), counts, args.alpha)
+        ok, exact, se = self_check(policy, counts, stats)
+        ok_all &= ok
+
+        mark = "  ← ОПТИМАЛЬНАЯ" if policy["name"] == best else ""
+        print(f"{policy['name']}{mark}")
+        print(f"  выборок: {args.samples} за {dt:.2f} с")
+        print(f"  среднее: {stats['mean']:.2f} (аналитическая ОДО {exact:.2f}, SE {se:.2f}) — "
+              f"{'сходится' if ok else 'НЕ СХОДИТСЯ'}")
+        print(f"  ст. откл.: {stats['std']:.2f}, P(убыток): {stats['p_loss']:.4f}")
+        print("  процентили: " + ", ".join(f"P{p}={v:.0f}" for p, v in stats["percentiles"].items()))
+        print(f"  VaR{args.alpha:.0%}: {stats['VaR']:.2f}, CVaR{args.alpha:.0%}: {stats['CVaR']:.2f}\n")
+    return 0 if ok_all else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+import sys
+import time
+import argparse
+import numpy as np
+
+import tree
+
+# Анализ чувствительности дерева решений tree.py: полная свёртка дерева
+# считается сразу для миллионов наборов вероятностей прогноза и масштабов выигрышей
+# (массивы NumPy с broadcasting), по результатам строятся карты областей
+# оптимальной стратегии и пороги переключения решения.
+
+PARAMS = {
+    "pf": ("p_forecast_favorable", "P(благоприятный прогноз)"),
+    "q1": ("p_fav_given_forecast_fav", "P(благ. рынок | благ. прогноз)"),
+    "q0": ("p_fav_given_forecast_unfav", "P(благ. рынок | неблаг. прогноз)"),
+    "sf": (None, "Масштаб выигрышей (благ.)"),
+    "su": (None, "Масштаб выигрышей (неблаг.)"),
+}
+
+CHUNK = 1_000_000  # точек на один векторный шаг (ограничивает память при большом числе проектов)
+
+
+def load_data(path='data.json'):
+    data = tree.load_data(path, verbose=False)
+    if "forecasts" in data:
+        raise ValueError("Анализ чувствительности поддерживает только пару благоприятный/неблагоприятный прогноз")
+    return data
+
+
+def base_point(data):
+    """Текущие значения параметров из data.json."""
+    return {key: (data[name] if name else 1.0) for key, (name, _) in PARAMS.items()}
+
+
+def evaluate(data, **params):
+    """
+    Свёртка дерева для массивов параметров (pf, q1, q0, sf, su — любые совместимые по
+    broadcasting формы; не заданные берутся из data). Возвращает словарь массивов формы
+    broadcast-результата:
+      advantage — Net ОДО с исследованием минус лучшая ОДО без него (> 0 — проводить),
+      value     — ОДО оптимальной стратегии,
+      policy    — код стратегии: i < N — без исследования, проект i;
+                  N + a*N + b — исследование, проект a при благ. прогнозе и b при неблаг.
+    """
+    wf = np.asarray(data["wins_favorable"], dtype=float)
+    wu = np.asarray(data["wins_unfavorable"], dtype=float)
+    pb = np.asarray(data["probs_favorable_base"], dtype=float)
+    cost = float(data["research_cost"])
+    n = len(wf)
+
+    point = base_point(data)
+    point.update(params)
+    arrays = np.broadcast_arrays(*(np.asarray(point[k], dtype=float) for k in PARAMS))
+    shape = arrays[0].shape
+    pf, q1, q0, sf, su = (a.ravel() for a in arrays)
+
+    m = pf.size
+    advantage = np.empty(m)
+    value = np.empty(m)
+    policy = np.empty(m, dtype=np.int64)
+    for lo in range(0, m, CHUNK):
+        sl = slice(lo, lo + CHUNK)
+        # Выигрыши с учётом масштабов: (M, N)
+        wfs = sf[sl, None] * wf[None, :]
+        wus = su[sl, None] * wu[None, :]
+
+        base = pb[None, :] * wfs + (1 - pb[None, :]) * wus
+        base_idx = base.argmax(axis=1)
+        base_best = np.take_along_axis(base, base_idx[:, None], axis=1)[:, 0]
+
+        fav = q1[sl, None] * wfs + (1 - q1[sl, None]) * wus
+        unfav = q0[sl, None] * wfs + (1 - q0[sl, None]) * wus
+        fav_idx = fav.argmax(axis=1)
+        unfav_idx = unfav.argmax(axis=1)
+        fav_best = np.take_along_axis(fav, fav_idx[:, None], axis=1)[:, 0]
+        unfav_best = np.take_along_axis(unfav, unfav_idx[:, None], axis=1)[:, 0]
+
+        net = pf[sl] * fav_best + (1 - pf[sl]) * unfav_best - cost
+        research = net > base_best
+        advantage[sl] = net - base_best
+        value[sl] = np.where(research, net, base_best)
+        policy[sl] = np.where(research, n + fav_idx * n + unfav_idx, base_idx)
+
+    return {"advantage": advantage.reshape(shape), "value": value.reshape(shape), "policy": policy.reshape(shape)}
+
+
+def policy_label(code, projects):
+    n = len(projects)
+    if code < n:
+        return f"Без исследования: {projects[code]}"
+    a, b = divmod(code - n, n)
+    return f"Исследование: {projects[a]} / {projects[b]}"
+
+
+def grid_sweep(data, x, y, x_range=(0.0, 1.0), y_range=(0.0, 1.0), n=400, **fixed):
+    """Плотная сетка n×n по двум параметрам (остальные — из data или fixed)."""
+    xs = np.linspace(*x_range, n)
+    ys = np.linspace(*y_range, n)
+    params = dict(fixed)
+    params[x] = xs[None, :]
+    params[y] = ys[:, None]
+    return xs, ys, evaluate(data, **params)
+
+
+def random_sweep(data, samples, seed=0, ranges=None):
+    """Случайная выборка параметров (по умолчанию вероятности ~ U[0, 1], масштабы фиксированы)."""
+    rng = np.random.default_rng(seed)
+    ranges = ranges or {"pf": (0.0, 1.0), "q1": (0.0, 1.0), "q0": (0.0, 1.0)}
+    params = {k: rng.uniform(lo, hi, samples) for k, (lo, hi) in ranges.items()}
+    return params, evaluate(data, **params)
+
+
+def thresholds(data, param, lo=0.0, hi=1.0, n=10001, **fixed):
+    """
+    Пороги переключения «проводить / не проводить исследование» по одному параметру:
+    точки смены знака advantage, уточнённые линейной интерполяцией между узлами сетки
+    (по pf advantage линеен, по остальным — кусочно-линеен, так что порог почти точный).
+    """
+    xs = np.linspace(lo, hi, n)
+    adv = evaluate(data, **{**fixed, param: xs})["advantage"]
+    idx = np.nonzero(np.signbit(adv[:-1]) != np.signbit(adv[1:]))[0]
+    out = []
+    for i in idx:
+        a0, a1 = adv[i], adv[i + 1]
+        t = a0 / (a0 - a1) if a0 != a1 else 0.0
+        out.append(float(xs[i] + t * (xs[i + 1] - xs[i])))
+    return out
+
+
+def plot_heatmaps(data, pairs, n, out_prefix):
+    """Для каждой пары параметров — PNG с картой областей стратегии и картой выгоды исследования."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from matplotlib.colors import ListedColormap, TwoSlopeNorm
+
+    projects = data["projects"]
+    point = base_point(data)
+    files = []
+    for x, y in pairs:
+        x_range = (0.0, 2.0) if x in ("sf", "su") else (0.0, 1.0)
+        y_range = (0.0, 2.0) if y in ("sf", "su") else (0.0, 1.0)
+        xs, ys, res = grid_sweep(data, x, y, x_range, y_range, n)
+        extent = (xs[0], xs[-1], ys[0], ys[-1])
+
+        codes, regions = np.unique(res["policy"], return_inverse=True)
+        regions = regions.reshape(res["policy"].shape)
+        cmap = ListedColormap(plt.get_cmap("tab20").colors[:max(len(codes), 1)])
+
+        fig, axes = plt.subplots(1, 2, figsize=(16, 7))
+        ax = axes[0]
+        ax.imshow(regions, origin="lower", extent=extent, aspect="auto", cmap=cmap,
+                  vmin=-0.5, vmax=len(codes) - 0.5, interpolation="nearest")
+        ax.contour(xs, ys, res["advantage"], levels=[0.0], colors="black", linewidths=2)
+        handles = [plt.Rectangle((0, 0), 1, 1, color=cmap(i)) for i in range(len(codes))]
+        ax.legend(handles, [policy_label(int(c), projects) for c in codes], loc="upper left", fontsize=8)
+        ax.set_title("Оптимальная стратегия (чёрная линия — порог исследования)")
+
+        ax = axes[1]
+        adv = res["advantage"]
+        lim = max(float(np.abs(adv).max()), 1.0)
+        im = ax.imshow(adv, origin="lower", extent=extent, aspect="auto", cmap="RdBu",
+                       norm=TwoSlopeNorm(vcenter=0.0, vmin=-lim, vmax=lim))
+        ax.contour(xs, ys, adv, levels=[0.0], colors="black", linewidths=2)
+        fig.colorbar(im, ax=ax, label="Net ОДО исследования − лучшая ОДО без него")
+        ax.set_title("Выгода исследования")
+
+        for ax in axes:
+            ax.plot(point[x], point[y], "k*", markersize=14)
+            ax.set_xlabel(PARAMS[x][1])
+            ax.set_ylabel(PARAMS[y][1])
+        fig.tight_layout()
+        path = f"{out_prefix}_{x}_{y}.png"
+        fig.savefig(path, dpi=100)
+        plt.close(fig)
+        files.append(path)
+    return files
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Чувствительность решения «Проводить исследование» к вероятностям")
+    parser.add_argument("data_file", nargs="?", default="data.json")
+    parser.add_argument("--grid", type=int, default=400, help="размер сетки n×n для карт")
+    parser.add_argument("--pairs", nargs="+", default=["pf:q1", "pf:q0", "q1:q0"],
+                        help="пары параметров x:y из " + ", ".join(PARAMS))
+    parser.add_argument("--samples", type=int, default=0, help="дополнительно: случайная выборка такого размера")
+    parser.add_argument("--out-prefix", default="sweep", help="префикс PNG-файлов")
+    args = parser.parse_args(argv)
+
+    data = load_data(args.data_file)
+    projects = data["projects"]
+    base = evaluate(data)
+    print(f"Текущая стратегия: {policy_label(int(base['policy']), projects)}, "
+          f"выгода исследования {float(base['advantage']):.2f}")
+
+    print("Пороги переключения (остальные параметры — текущие):")
+    for key in PARAMS:
+        lo, hi = (0.0, 5.0) if key in ("sf", "su") else (0.0, 1.0)
+        found = thresholds(data, key, lo, hi)
+        shown = ", ".join(f"{t:.4f}" for t in found) if found else "нет на [{:g}, {:g}]".format(lo, hi)
+        print(f"  {PARAMS[key][1]} (сейчас {base_point(data)[key]:g}): {shown}")
+
+    if args.samples:
+        t = time.perf_counter()
+        params, res = random_sweep(data, args.samples)
+        dt = time.perf_counter() - t
+        share = float((res["advantage"] > 0).mean())
+        print(f"Случайная выборка: {args.samples} точек за {dt:.2f} с ({args.samples / dt / 1e6:.1f} млн/с), "
+              f"исследование выгодно в {share:.1%} случаев")
+
+    pairs = [tuple(p.split(":")) for p in args.pairs]
+    for x, y in pairs:
+        if x not in PARAMS or y not in PARAMS:
+            parser.error(f"Неизвестная пара {x}:{y}")
+    for path in plot_heatmaps(data, pairs, args.grid, args.out_prefix):
+        print(f"Карта сохранена: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+import json
+import sys
+import argparse
+from functools import lru_cache
+import numpy as np
+
+from tree import load_data, parse_forecasts
+
+# Ценность информации (EVPI / EVSI) для задачи выбора проекта из tree.py.
+#
+# Неопределённые факторы — состояние рынка каждого проекта (благоприятный / нет)
+# с априорной вероятностью probs_favorable_base[i]. Исследование — прогноз с K исходами
+# и правдоподобиями P(прогноз k | благ.), P(прогноз k | неблаг.); апостериорные
+# вероятности получаются по формуле Байеса, а не задаются вручную.
+#
+# Правдоподобия берутся из data["forecast_likelihoods"] = {"favorable": [...], "unfavorable": [...]},
+# а если их нет — восстанавливаются из исходов прогноза tree.py (tree.parse_forecasts)
+# через неявный априор π = Σ P(k)·P(благ. | k).
+
+
+def implied_likelihoods(data):
+    """Правдоподобия прогноза: явные или восстановленные из апостериорных вероятностей tree.py."""
+    if "forecast_likelihoods" in data:
+        lk = data["forecast_likelihoods"]
+        return np.asarray(lk["favorable"], dtype=float), np.asarray(lk["unfavorable"], dtype=float)
+    _, p_k, q_k = parse_forecasts(data)
+    prior = float(p_k @ q_k)
+    return p_k * q_k / prior, p_k * (1 - q_k) / (1 - prior)
+
+
+def _frozen(arr):
+    # Результаты из кэша общие для всех вызывающих — защищаем от изменения на месте
+    arr.setflags(write=False)
+    return arr
+
+
+@lru_cache(maxsize=4096)
+def posteriors(prior, l_fav, l_unfav):
+    """
+    Формула Байеса: (P(прогноз k), P(благ. | k)) для априора prior и правдоподобий-кортежей.
+    Кэшируется по параметрам — повторные запросы бесплатны.
+    """
+    l_fav = np.asarray(l_fav)
+    l_unfav = np.asarray(l_unfav)
+    p_k = prior * l_fav + (1 - prior) * l_unfav
+    with np.errstate(invalid="ignore", divide="ignore"):
+        post = np.where(p_k > 0, prior * l_fav / p_k, prior)
+    return _frozen(p_k), _frozen(post)
+
+
+@lru_cache(maxsize=256)
+def ev_table(wins_fav, wins_unfav, priors):
+    """
+    Таблица ОДО без дополнительной информации (кэшируется по параметрам):
+    ОДО каждого проекта, лучшая ОДО и для каждого проекта — лучшая ОДО среди остальных.
+    """
+    wf, wu, pb = (np.asarray(x, dtype=float) for x in (wins_fav, wins_unfav, priors))
+    odos = pb * wf + (1 - pb) * wu
+    n = len(odos)
+    best_other = np.array([np.max(np.delete(odos, i)) if n > 1 else -np.inf for i in range(n)])
+    return _frozen(odos), float(odos.max()), _frozen(best_other)
+
+
+@lru_cache(maxsize=256)
+def evsi_table(wins_fav, wins_unfav, priors, l_fav, l_unfav):
+    """EVSI по каждому фактору для одного предложения (кэшируется, строится на кэшированных posteriors)."""
+    odos, best, best_other = ev_table(wins_fav, wins_unfav, priors)
+    out = []
+    for i in range(len(priors)):
+        p_k, post = posteriors(priors[i], l_fav, l_unfav)
+        odo_post = post * wins_fav[i] + (1 - post) * wins_unfav[i]
+        out.append(float(p_k @ np.maximum(odo_post, best_other[i])) - best)
+    # EVSI >= 0; отрицательные значения — только погрешность округления
+    return _frozen(np.maximum(np.array(out), 0.0))
+
+
+class ValueOfInformation:
+    def __init__(self, data):
+        self.projects = list(data["projects"])
+        self.wins_fav = tuple(float(x) for x in data["wins_favorable"])
+        self.wins_unfav = tuple(float(x) for x in data["wins_unfavorable"])
+        self.priors = tuple(float(x) for x in data["probs_favorable_base"])
+        l_fav, l_unfav = implied_likelihoods(data)
+        self.l_fav = tuple(l_fav)
+        self.l_unfav = tuple(l_unfav)
+        self.research_cost = float(data.get("research_cost", 0.0))
+
+    def table(self):
+        return ev_table(self.wins_fav, self.wins_unfav, self.priors)
+
+    def evpi(self):
+        """
+        EVPI по каждому фактору (точно знаем рынок проекта i до выбора) и по всем сразу
+        (рынки независимы: E[max_i выигрыш_i] через произведение функций распределения).
+        """
+        odos, best, best_other = self.table()
+        wf, wu, pb = (np.asarray(x) for x in (self.wins_fav, self.wins_unfav, self.priors))
+        per_factor = pb * np.maximum(wf, best_other) + (1 - pb) * np.maximum(wu, best_other) - best
+
+        # Все факторы: распределение максимума независимых двухточечных величин
+        values = np.unique(np.concatenate([wf, wu]))
+        cdf = np.ones_like(values)
+        for i in range(len(pb)):
+            cdf *= np.where(values >= wf[i], 1.0, 0.0) * pb[i] + np.where(values >= wu[i], 1.0, 0.0) * (1 - pb[i])
+        pmf = np.diff(np.concatenate([[0.0], cdf]))
+        return per_factor, float(values @ pmf - best)
+
+    def evsi(self, l_fav=None, l_unfav=None):
+        """
+        EVSI по каждому фактору для предложений исследования, векторно.
+        l_fav, l_unfav — правдоподобия формы (K,) или (M, K) для M предложений.
+        Возвращает массив (N,) или (M, N): максимальная разумная цена исследования по фактору.
+        Без аргументов — текущее исследование из data, результат берётся из кэша evsi_table.
+        """
+        if l_fav is None and l_unfav is None:
+            return evsi_table(self.wins_fav, self.wins_unfav, self.priors, self.l_fav, self.l_unfav)
+        l_fav = np.asarray(self.l_fav if l_fav is None else l_fav, dtype=float)
+        l_unfav = np.asarray(self.l_unfav if l_unfav is None else l_unfav, dtype=float)
+        single = l_fav.ndim == 1
+        l_fav = np.atleast_2d(l_fav)[:, None, :]       # (M, 1, K)
+        l_unfav = np.atleast_2d(l_unfav)[:, None, :]
+
+        odos, best, best_other = self.table()
+        wf, wu, pb = (np.asarray(x)[None, :, None] for x in (self.wins_fav, self.wins_unfav, self.priors))
+
+        # Байес сразу для всех предложений M, факторов N и исходов K
+        p_k = pb * l_fav + (1 - pb) * l_unfav
+        with np.errstate(invalid="ignore", divide="ignore"):
+            post = np.where(p_k > 0, pb * l_fav / p_k, pb)
+        odo_post = post * wf + (1 - post) * wu
+        ev_info = np.sum(p_k * np.maximum(odo_post, best_other[None, :, None]), axis=2)
+        out = np.maximum(ev_info - best, 0.0)
+        return out[0] if single else out
+
+    def worth_paying(self, costs, l_fav, l_unfav):
+        """Для M предложений (цена, правдоподобия): EVSI (M, N), лучший фактор и выгодно ли оно."""
+        evsi = self.evsi(l_fav, l_unfav)
+        evsi = np.atleast_2d(evsi)
+        factor = evsi.argmax(axis=1)
+        max_cost = evsi[np.arange(len(evsi)), factor]
+        return evsi, factor, max_cost, np.asarray(costs, dtype=float) < max_cost
+
+
+def symmetric_offers(accuracies):
+    """Предложения-тесты с точностью a: P(прогноз + | благ.) = P(прогноз - | неблаг.) = a."""
+    a = np.asarray(accuracies, dtype=float)
+    return np.column_stack([a, 1 - a]), np.column_stack([1 - a, a])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EVPI / EVSI для задачи выбора проекта")
+    parser.add_argument("data_file", nargs="?", default="data.json")
+    parser.add_argument("--offers", help="JSON со списком предложений "
+                                         "[{name, cost, likelihoods: {favorable, unfavorable}}]")
+    parser.add_argument("--accuracy-grid", type=int, default=0,
+                        help="сколько симметричных тестов с точностью от 0.5 до 1 оценить")
+    args = parser.parse_args(argv)
+
+    data = load_data(args.data_file, verbose=False)
+    voi = ValueOfInformation(data)
+    odos, best, _ = voi.table()
+
+    print("Правдоподобия прогноза (по Байесу):")
+    print("  P(k | благ.):   " + ", ".join(f"{x:.4f}" for x in voi.l_fav))
+    print("  P(k | неблаг.): " + ", ".join(f"{x:.4f}" for x in voi.l_unfav))
+    print(f"Лучшая ОДО без информации: {best:.2f} ({voi.projects[int(np.argmax(odos))]})\n")
+
+    per_factor, evpi_all = voi.evpi()
+    evsi = voi.evsi()
+    print(f"{'Фактор':<20} {'Априор':>8} {'EVPI':>12} {'EVSI':>12}")
+    for i, proj in enumerate(voi.projects):
+        p_k, post = posteriors(voi.priors[i], voi.l_fav, voi.l_unfav)
+        print(f"{'Рынок ' + proj:<20} {voi.priors[i]:>8.3f} {per_factor[i]:>12.2f} {evsi[i]:>12.2f}"
+              f"   апостериорные: " + ", ".join(f"{x:.3f}" for x in post))
+    print(f"EVPI по всем факторам: {evpi_all:.2f}")
+    best_factor = int(np.argmax(evsi))
+    print(f"Максимальная разумная цена исследования: {evsi[best_factor]:.2f} (рынок {voi.projects[best_factor]}); "
+          f"текущая цена {voi.research_cost:.2f} — {'выгодно' if voi.research_cost < evsi[best_factor] else 'невыгодно'}")
+
+    if args.offers:
+        with open(args.offers, 'r', encoding='utf-8') as f:
+            offers = json.load(f)
+        l_fav = [o["likelihoods"]["favorable"] for o in offers]
+        l_unfav = [o["likelihoods"]["unfavorable"] for o in offers]
+        _, factor, max_cost, worth = voi.worth_paying([o["cost"] for o in offers], l_fav, l_unfav)
+        print("\nПредложения исследований:")
+        for o, f_i, mc, w in zip(offers, factor, max_cost, worth):
+            print(f"  {o.get('name', '?'):<20} цена {o['cost']:>10.2f}, предел {mc:>10.2f} "
+                  f"(рынок {voi.projects[f_i]}) — {'брать' if w else 'не брать'}")
+
+    if args.accuracy_grid:
+        acc = np.linspace(0.5, 1.0, args.accuracy_grid)
+        evsi_grid = voi.evsi(*symmetric_offers(acc)).max(axis=1)
+        print("\nПредел цены симметричного теста по точности:")
+        for a, v in zip(acc[::max(1, len(acc) // 10)], evsi_grid[::max(1, len(acc) // 10)]):
+            print(f"  точность {a:.3f}: {v:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())